@@ -0,0 +1,178 @@
+"""
+Admission control and load shedding.
+
+Every request is assigned to a lane by path. Each lane has its own
+concurrency limit and a bounded wait queue, so a burst of ML-heavy calls
+cannot starve login or job actions. Requests that find the queue full, or
+wait longer than the lane allows, are shed with 503 and a Retry-After
+derived from the lane's observed service time.
+"""
+
+import os
+import re
+import math
+import time
+import asyncio
+import collections
+
+import metrics
+
+QUEUE_LENGTH = metrics.Gauge(
+    "servus_admission_queue_length", "Requests waiting for a slot, per lane",
+    fn=lambda: [({"lane": lane.name}, len(lane.waiters)) for lane in LANES.values()])
+IN_FLIGHT = metrics.Gauge(
+    "servus_admission_in_flight", "Requests holding a slot, per lane",
+    fn=lambda: [({"lane": lane.name}, lane.active) for lane in LANES.values()])
+REJECTED = metrics.Counter(
+    "servus_admission_rejected_total", "Requests shed with 503, per lane and reason")
+WAIT_TIME = metrics.Histogram(
+    "servus_admission_wait_seconds", "Time spent queued before admission, per lane")
+SERVICE_TIME = metrics.Histogram(
+    "servus_admission_service_seconds", "Time from admission to response completion, per lane")
+
+
+class Lane:
+    def __init__(self, name: str, concurrency: int, queue_size: int, max_wait: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiters = collections.deque()
+        self.service_time = 1.0  # EWMA seconds, seeded pessimistically
+
+    async def acquire(self):
+        """Wait for a slot; returns None when admitted, or the rejection reason."""
+        if self.active < self.concurrency and not self.waiters:
+            self.active += 1
+            return None
+        if len(self.waiters) >= self.queue_size:
+            return "queue_full"
+
+        fut = asyncio.get_running_loop().create_future()
+        self.waiters.append(fut)
+        try:
+            await asyncio.wait_for(fut, self.max_wait)
+            return None
+        except asyncio.TimeoutError:
+            if fut.done() and not fut.cancelled():
+                # The slot was handed over just as we timed out — give it back
+                self.release()
+            return "timeout"
+        except BaseException:
+            # Cancelled (client went away) or interrupted while waiting — same race as above
+            if fut.done() and not fut.cancelled():
+                self.release()
+            raise
+        finally:
+            try:
+                self.waiters.remove(fut)
+            except ValueError:
+                pass
+
+    def release(self):
+        """Hand the slot to the next live waiter, or free it."""
+        while self.waiters:
+            fut = self.waiters.popleft()
+            if not fut.done():
+                fut.set_result(True)
+                return
+        self.active -= 1
+
+    def record(self, seconds: float):
+        self.service_time = 0.8 * self.service_time + 0.2 * seconds
+
+    def retry_after(self) -> int:
+        """Seconds until the current backlog should have drained."""
+        backlog = (len(self.waiters) + self.active) / max(1, self.concurrency)
+        return max(1, math.ceil(self.service_time * backlog))
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, str(default)))
+
+
+LANES = {
+    # CPU-bound inference plus Gemini calls
+    "ml": Lane("ml", _env_int("ADMISSION_ML_CONCURRENCY", 4), _env_int("ADMISSION_ML_QUEUE", 16),
+               float(os.getenv("ADMISSION_ML_MAX_WAIT", "10"))),
+    # Cheap, latency-sensitive calls that must keep working under an ML burst
+    "priority": Lane("priority", _env_int("ADMISSION_PRIORITY_CONCURRENCY", 64),
+                     _env_int("ADMISSION_PRIORITY_QUEUE", 256), float(os.getenv("ADMISSION_PRIORITY_MAX_WAIT", "5"))),
+    "default": Lane("default", _env_int("ADMISSION_DEFAULT_CONCURRENCY", 32),
+                    _env_int("ADMISSION_DEFAULT_QUEUE", 64), float(os.getenv("ADMISSION_DEFAULT_MAX_WAIT", "5"))),
+}
+
+# Never queued or shed
+UNLIMITED_PATHS = {"/health", "/metrics"}
+
+_ML_PATHS = {"/analyze", "/analyze/stream", "/analyze-image", "/admin/intents", "/admin/intents/remove",
+             "/workers/search"}
+_PRIORITY_PATHS = {"/worker/login"}
+_PRIORITY_PATTERNS = [re.compile(r"^/worker/[^/]+/job-action$")]
+
+
+def lane_for(path: str):
+    if path in UNLIMITED_PATHS:
+        return None
+    if path in _ML_PATHS:
+        return LANES["ml"]
+    if path in _PRIORITY_PATHS or any(p.match(path) for p in _PRIORITY_PATTERNS):
+        return LANES["priority"]
+    return LANES["default"]
+
+
+async def admit(lane: Lane, call_next, request, reject):
+    """Run `call_next(request)` inside `lane`, or return `reject(lane)` when shed."""
+    queued_at = time.perf_counter()
+    reason = await lane.acquire()
+    if reason:
+        REJECTED.inc(lane=lane.name, reason=reason)
+        return reject(lane)
+
+    admitted_at = time.perf_counter()
+    WAIT_TIME.observe(admitted_at - queued_at, lane=lane.name)
+
+    released = False
+
+    def done():
+        nonlocal released
+        if released:
+            return
+        released = True
+        elapsed = time.perf_counter() - admitted_at
+        lane.record(elapsed)
+        SERVICE_TIME.observe(elapsed, lane=lane.name)
+        lane.release()
+
+    try:
+        response = await call_next(request)
+    except BaseException:
+        done()
+        raise
+
+    # Keep the slot until the body has been sent (matters for /analyze/stream)
+    return _SlotResponse(response, done)
+
+
+class _SlotResponse:
+    """
+    ASGI wrapper that releases the lane slot once `response` has been sent,
+    however sending ends: a finished body, a client disconnect, or an error.
+    The admission middleware awaits whatever `admit` returns, so this is the
+    one place the slot is given back; it runs on the event loop, which
+    `Lane.release` needs since it resolves the next waiter's future.
+    """
+
+    def __init__(self, response, release):
+        self.response = response
+        self._release = release
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.response(scope, receive, send)
+        finally:
+            self._release()
@@ -4,37 +4,35 @@ load_dotenv()
 
 
 import os
+import re
 import json
 import math
+import asyncio
+import time
 import hashlib
 import threading
 from datetime import datetime
 
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse, Response
 from pydantic import BaseModel
 
 from fastapi import UploadFile, File
-from fastapi.responses import FileResponse
 import uuid
 
-
-import base64
-import tempfile
-
-import numpy as np
-import cv2
-
-def _resnet50_preprocess(img_array):
-    """ResNet50 preprocess_input (caffe mode): RGB → BGR, subtract ImageNet mean."""
-    x = img_array.astype('float32')
-    x = x[..., ::-1]  # RGB to BGR
-    x[..., 0] -= 103.939
-    x[..., 1] -= 116.779
-    x[..., 2] -= 123.68
-    return x
-from pydantic import BaseModel
+import metrics
+import push
+import admission
+import doc_loader
+import features
+import review_rollup
+import versions
+import worker_analytics
+import session
+from gemini_helper import GeminiClient
+from verhoeff import verhoeff_validate
+from fast_response import FastJSONResponse, CompressionMiddleware, parse_fields, project
 
 # NOTE: Heavy imports (torch, sentence_transformers, pandas, firebase, web3, genai)
 # are deferred to background thread so uvicorn can bind the port immediately on Render.
@@ -42,17 +40,31 @@ from pydantic import BaseModel
 # -------------------------------
 # Global state (loaded in background)
 # -------------------------------
-data = None
-model = None
-torch = None
-util = None
 firestore = None
 gemini_model = None
+gemini_client = None
 db = None
 w3 = None
 blockchain_account = None
 WALLET_ADDRESS = None
-_image_model = None
+tx_submitter = None
+merkle_batcher = None
+worker_search = None
+# Workers + per-worker booking stats: local snapshot at boot, then live from Firestore listeners
+worker_cache = None
+WORKER_SNAPSHOT_PATH = os.getenv("WORKER_SNAPSHOT_PATH", "worker_snapshot.jsonl.gz")
+# Version tokens behind the listing endpoints' ETags (see versions.py)
+listing_versions = versions.VersionTable()
+# ml_models itself, or a model_server.ModelClient when a shared model server owns the models
+models = None
+MODEL_SERVER_SOCKET = os.getenv("MODEL_SERVER_SOCKET")
+# uvicorn processes serving this app (start.sh). With more than one, services that must
+# exist once per deployment (wallet nonce, snapshot writer, push hub) are not started per worker
+API_WORKERS = int(os.getenv("API_WORKERS", "1"))
+# How long an API worker waits for the shared model server before giving up on ML
+MODEL_SERVER_WAIT_SECONDS = float(os.getenv("MODEL_SERVER_WAIT_SECONDS", "300"))
+LEADER_LOCK_PATH = os.getenv("LEADER_LOCK_PATH", WORKER_SNAPSHOT_PATH + ".lock")
+_leader_lock = None
 _image_model_ready = False
 # Two-phase readiness:
 # _ready = True  → Firebase/Gemini/Web3 loaded → login, bookings, etc. work
@@ -61,57 +73,48 @@ _ready = False
 _ml_ready = False
 
 
-
-CLASS_NAMES = [
-    "ac_technician", "appliance_repair", "automobile_mechanic", "carpenter",
-    "cleaning", "computer_repair", "electrician", "gas_technician",
-    "general_contractor", "glazier", "home_automation", "locksmith",
-    "mobile_repair", "painter", "pest_control", "plumber",
-    "solar_technician", "specialized_services", "welder"
-]
-
-
-
 def _init_essential():
-    """Phase 1: Firebase, Gemini, Web3 — lightweight, loads fast."""
-    global firestore, gemini_model, db, w3, blockchain_account, WALLET_ADDRESS
+    """Phase 1: Firebase, plus Gemini and Web3 when their features are enabled — lightweight, loads fast."""
+    global firestore, gemini_model, gemini_client, db, w3, blockchain_account, WALLET_ADDRESS, tx_submitter
+    global merkle_batcher
 
-    import google.generativeai as genai
-    import firebase_admin
-    from firebase_admin import credentials
-    from firebase_admin import firestore as _firestore
-    from web3 import Web3
+    from firebase_setup import init_firestore
 
-    firestore = _firestore
     # Gemini
-    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-    gemini_model = genai.GenerativeModel("models/gemini-2.5-flash")
-    gemini_api_key = os.getenv("GEMINI_API_KEY")
+    if features.is_enabled("gemini"):
+        genai = features.load("google.generativeai", "gemini")
+        genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        gemini_model = genai.GenerativeModel("models/gemini-2.5-flash")
+        gemini_client = GeminiClient(
+            gemini_model,
+            rate_per_minute=float(os.getenv("GEMINI_RATE_PER_MINUTE", "300")),
+            burst=int(os.getenv("GEMINI_BURST", "20")),
+            deadline=float(os.getenv("GEMINI_DEADLINE_SECONDS", "8")),
+            max_concurrency=int(os.getenv("GEMINI_MAX_CONCURRENCY", "8")),
+            failure_threshold=int(os.getenv("GEMINI_BREAKER_FAILURES", "5")),
+            cooldown=float(os.getenv("GEMINI_BREAKER_COOLDOWN", "60")),
+        )
+        gemini_api_key = os.getenv("GEMINI_API_KEY")
 
-    print("Gemini API Key:", gemini_api_key)
-    print("✅ Gemini ready!")
+        print("Gemini API Key:", gemini_api_key)
+        print("✅ Gemini ready!")
+    else:
+        print("⚠️ Gemini disabled — quick fixes and review summaries use fallback text")
 
     # Firebase
-    if not firebase_admin._apps:
-        service_account_json = os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON")
-        service_account_path = os.getenv("FIREBASE_SERVICE_ACCOUNT", "serviceAccountKey.json")
-
-        if service_account_json:
-            cred = credentials.Certificate(json.loads(service_account_json))
-            firebase_admin.initialize_app(cred)
-            print("✅ Firebase initialized with service account from env var")
-        elif os.path.exists(service_account_path):
-            cred = credentials.Certificate(service_account_path)
-            firebase_admin.initialize_app(cred)
-            print("✅ Firebase initialized with service account file")
-        else:
-            firebase_admin.initialize_app()
-            print("⚠️ Firebase initialized without service account")
-
-    db = firestore.client()
+    features.preload("core")
+    firestore, db = init_firestore()
     print("✅ Firestore client ready!")
 
     # Blockchain
+    if not features.is_enabled("blockchain"):
+        print("⚠️ Blockchain disabled — Aadhaar verification is unavailable")
+        return
+    if API_WORKERS > 1:
+        # Each worker would sign from the same wallet with its own nonce and its own pending
+        # verifications; logged at startup and reported by /health (see _multi_process_limits)
+        return
+    Web3 = features.load("web3", "blockchain").Web3
     AMOY_RPC_URL = os.getenv("AMOY_RPC_URL", "https://rpc-amoy.polygon.technology")
     BLOCKCHAIN_PRIVATE_KEY = os.getenv("BLOCKCHAIN_PRIVATE_KEY", "")
 
@@ -120,6 +123,23 @@ def _init_essential():
         blockchain_account = w3.eth.account.from_key(BLOCKCHAIN_PRIVATE_KEY)
         WALLET_ADDRESS = blockchain_account.address
         print(f"✅ Blockchain wallet loaded: {WALLET_ADDRESS}")
+
+        from tx_submitter import TransactionSubmitter
+        tx_submitter = TransactionSubmitter(
+            w3, blockchain_account,
+            chain_id=80002,  # Polygon Amoy
+            min_gas_price_gwei=float(os.getenv("BLOCKCHAIN_MIN_GAS_GWEI", "30")),
+        )
+        tx_submitter.start()
+
+        from merkle import MerkleBatcher
+        merkle_batcher = MerkleBatcher(
+            _anchor_merkle_batch,
+            max_batch=int(os.getenv("MERKLE_BATCH_SIZE", "256")),
+            max_wait=float(os.getenv("MERKLE_BATCH_WINDOW", "60")),
+            on_error=_on_merkle_batch_error,
+        )
+        merkle_batcher.start()
     else:
         blockchain_account = None
         WALLET_ADDRESS = None
@@ -128,155 +148,238 @@ def _init_essential():
 
 def _init_ml():
     """Phase 2: ML model — heavy, may take minutes. Other features work without it."""
-    global data, model, torch, util
+    global models
+
+    if MODEL_SERVER_SOCKET:
+        # Multi-process mode: the model server loads the models, this worker only waits for it
+        from model_server import ModelClient
+        client = ModelClient(MODEL_SERVER_SOCKET)
+        started = next_log = time.time()
+        last_error = None
+        while True:
+            try:
+                if client.ping()["text_ready"]:
+                    break
+                last_error = "text model still loading"
+            except Exception as e:
+                last_error = e
+            waited = time.time() - started
+            if waited >= MODEL_SERVER_WAIT_SECONDS:
+                raise RuntimeError(f"Shared model server at {MODEL_SERVER_SOCKET} not ready after "
+                                   f"{waited:.0f}s ({last_error})")
+            if time.time() >= next_log:
+                print(f"⏳ Waiting for shared model server at {MODEL_SERVER_SOCKET} ({waited:.0f}s: {last_error})")
+                next_log += 30
+            time.sleep(2)
+        models = client
+        print(f"✅ Using shared model server at {MODEL_SERVER_SOCKET}")
+        return
 
-    import pandas as pd
-    import torch as torch_mod
-    from sentence_transformers import SentenceTransformer
-    from sentence_transformers import util as st_util
+    features.preload("text_ml")
+    ml_models = features.load("ml_models", "text_ml")
+    ml_models.load_text_model()
+    models = ml_models
 
-    torch = torch_mod
-    util = st_util
 
-    # Load dataset
-    data = pd.read_csv("service_intents.csv")
-    data['text'] = data['text'].str.lower()
+def _init_image_model():
+    """Load the Keras image classification model at startup."""
+    global _image_model_ready, models
+
+    if MODEL_SERVER_SOCKET:
+        # Image model readiness is reported by the shared model server
+        if models is None:
+            from model_server import ModelClient
+            models = ModelClient(MODEL_SERVER_SOCKET)
+        deadline = time.time() + MODEL_SERVER_WAIT_SECONDS
+        while time.time() < deadline:
+            try:
+                if models.ping()["image_ready"]:
+                    _image_model_ready = True
+                    return
+            except Exception:
+                pass
+            time.sleep(2)
+        print(f"❌ Shared model server never reported the image model as ready "
+              f"within {MODEL_SERVER_WAIT_SECONDS:.0f}s")
+        return
 
-    # Load Sentence Transformer
-    model_name = "all-MiniLM-L6-v2"
-    print("⚡ Loading ML model...")
-    model = SentenceTransformer(model_name)
+    features.preload("image_ml")
+    ml_models = features.load("ml_models", "image_ml")
+    _image_model_ready = ml_models.load_image_model()
+    if models is None:
+        models = ml_models
 
-    print("⚡ Generating embeddings for dataset...")
-    data['embeddings'] = list(model.encode(data['text'], convert_to_tensor=True))
-    print("✅ ML model & embeddings ready!")
 
+def _init_worker_search():
+    """Semantic worker search index — encodes every worker profile once, then follows Firestore."""
+    global worker_search
+    from worker_search import WorkerSearch
 
-def _init_image_model():
-    """Load the Keras image classification model at startup."""
-    global _image_model, _image_model_ready
+    if MODEL_SERVER_SOCKET:
+        # The model server builds and follows the one shared index
+        from model_server import RemoteWorkerSearch
+        worker_search = RemoteWorkerSearch(models)
+        return
     try:
-        print("⚡ Loading image classification model...")
+        search = WorkerSearch(models.encode)
+        worker_search = search
+        search.load(db)
+        search.watch(db)
+    except Exception as e:
+        print(f"⚠️ Worker search index failed to build: {e}")
 
-        model_path = "ServiceClassification.keras"
-        if not os.path.exists(model_path):
-            print(f"❌ Model file not found at: {os.path.abspath(model_path)}")
-            return
 
-        # Patch missing TF internal function required by keras 3.10
-        import tensorflow as tf
-        if not hasattr(tf.__internal__, 'register_load_context_function'):
-            tf.__internal__.register_load_context_function = lambda fn: None
+def _is_leader() -> bool:
+    """Whether this process runs the once-per-deployment background jobs (the only worker always does)."""
+    global _leader_lock
+    if API_WORKERS <= 1:
+        return True
+    if _leader_lock is None:
+        import fcntl
+        lock = open(LEADER_LOCK_PATH, "a")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock.close()
+            return False
+        _leader_lock = lock  # held until the process exits
+    return True
 
-        from keras.models import load_model
-        _image_model = load_model(model_path)
-        _image_model_ready = True
-        print("✅ Image model ready!")
-    except Exception as e:
-        print(f"❌ Image model failed to load: {e}")
-        import traceback
-        traceback.print_exc()
+
+def _multi_process_limits() -> dict:
+    """Features this process turns off because API_WORKERS>1, with the reason for each."""
+    if API_WORKERS <= 1:
+        return {}
+    limits = {
+        "push": "the push hub is per process; /ws connections are closed with 1013",
+    }
+    if features.is_enabled("blockchain"):
+        limits["blockchain"] = "one wallet nonce per deployment; Aadhaar verification needs API_WORKERS=1"
+    return limits
+
+
+def _init_worker_cache():
+    """Phase 0: serve slightly-stale worker reads from the local snapshot before Firebase is up."""
+    global worker_cache
+    from worker_snapshot import WorkerCache
+
+    worker_cache = WorkerCache(versions=listing_versions)
+    if os.getenv("WORKER_CACHE", "1") == "1":
+        worker_cache.load(WORKER_SNAPSHOT_PATH)
 
 
 def _init_in_background():
     global _ready, _ml_ready
 
+    for name, reason in _multi_process_limits().items():
+        print(f"⚠️ {name} DISABLED because API_WORKERS={API_WORKERS} ({reason}); set API_WORKERS=1 to enable it")
+    _init_worker_cache()
+
     # Phase 1: Essential services (fast)
     try:
         _init_essential()
         _ready = True
         print("✅ Essential services ready (Firebase, Gemini, Web3)!")
+        if os.getenv("WORKER_CACHE", "1") == "1":
+            worker_cache.watch(db)
+            if _is_leader():
+                worker_cache.start_writer(WORKER_SNAPSHOT_PATH, float(os.getenv("WORKER_SNAPSHOT_INTERVAL", "300")))
     except Exception as e:
         print(f"❌ Essential init failed: {e}")
         import traceback
         traceback.print_exc()
+        features.print_report()
         return
 
     # Phase 2: ML model (slow — if it fails, login/bookings still work)
-    try:
-        _init_ml()
-        _ml_ready = True
-        print("✅ All services ready!")
-    except Exception as e:
-        print(f"⚠️ ML model failed to load: {e}")
-        import traceback
-        traceback.print_exc()
-
-    _init_image_model()
+    if features.is_enabled("text_ml"):
+        try:
+            _init_ml()
+            _ml_ready = True
+            print("✅ All services ready!")
+            if os.getenv("WORKER_SEARCH", "1") == "1":
+                threading.Thread(target=_init_worker_search, daemon=True).start()
+        except Exception as e:
+            print(f"⚠️ ML model failed to load: {e}")
+            import traceback
+            traceback.print_exc()
 
-      # Phase 3: Image model (runs alongside or after ML)
-      
+    # Phase 3: image model (independent of the text model)
+    if features.is_enabled("image_ml"):
+        _init_image_model()
+    features.print_report()
 
 
-threading.Thread(target=_init_in_background, daemon=True).start()
+_init_thread = threading.Thread(target=_init_in_background, daemon=True)
+_init_thread.start()
 
 
+# -------------------------------
+# FastAPI app
+# -------------------------------
+app = FastAPI(default_response_class=FastJSONResponse)
 
+# Enable CORS
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["ETag"],
+)
 
+# br/gzip for large JSON bodies (worker lists), negotiated per request
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.getenv("COMPRESSION_MIN_BYTES", "1024")))
 
+# Registered before check_ready so it runs inside it (the last registered middleware
+# runs first): disabled features and not-ready answers never take a lane slot
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Per-lane concurrency limits; shed overflow with 503 + Retry-After."""
+    lane = admission.lane_for(request.url.path)
+    if lane is None or request.method == "OPTIONS":
+        return await call_next(request)
 
-# Call this alongside your existing _init_ml() in startup
-# e.g. threading.Thread(target=_init_image_model, daemon=True).start()
+    def reject(lane):
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Server is busy. Please try again shortly.", "lane": lane.name},
+            headers={
+                "Retry-After": str(lane.retry_after()),
+                "Access-Control-Allow-Origin": "*",
+            }
+        )
 
+    return await admission.admit(lane, call_next, request, reject)
 
-# ── Request schema ──────────────────────────────────────────────────────────
-class ImageInput(BaseModel):
-    image: str       # base64 encoded image bytes
-    mime_type: str   # "image/png" or "image/jpeg"
-    problem: str     # optional text context, may be empty
 
-# -------------------------------
-# Verhoeff Checksum Algorithm (Aadhaar validation)
-# -------------------------------
-VERHOEFF_D = [
-    [0,1,2,3,4,5,6,7,8,9],
-    [1,2,3,4,0,6,7,8,9,5],
-    [2,3,4,0,1,7,8,9,5,6],
-    [3,4,0,1,2,8,9,5,6,7],
-    [4,0,1,2,3,9,5,6,7,8],
-    [5,9,8,7,6,0,4,3,2,1],
-    [6,5,9,8,7,1,0,4,3,2],
-    [7,6,5,9,8,2,1,0,4,3],
-    [8,7,6,5,9,3,2,1,0,4],
-    [9,8,7,6,5,4,3,2,1,0],
+# Read endpoints answered from the worker snapshot while Firebase is still initializing
+_STALE_READ_PATTERNS = [
+    re.compile(r"^/workers/category/[^/]+$"),
+    re.compile(r"^/workers/nearby$"),
+    re.compile(r"^/worker/[^/]+/profile$"),
 ]
 
-VERHOEFF_P = [
-    [0,1,2,3,4,5,6,7,8,9],
-    [1,5,7,6,2,8,3,0,9,4],
-    [5,8,0,3,7,9,6,1,4,2],
-    [8,9,1,6,0,4,3,5,2,7],
-    [9,4,5,3,1,2,6,8,7,0],
-    [4,2,8,6,5,7,3,9,0,1],
-    [2,7,9,3,8,0,6,4,1,5],
-    [7,0,4,6,9,1,3,2,5,8],
-]
 
-VERHOEFF_INV = [0,4,3,2,1,5,6,7,8,9]
+def _serves_stale(request: Request) -> bool:
+    return (request.method == "GET" and worker_cache is not None and worker_cache.has_data
+            and any(p.match(request.url.path) for p in _STALE_READ_PATTERNS))
 
-def verhoeff_validate(number: str) -> bool:
-    """Validate a number using Verhoeff checksum (used for Aadhaar)"""
-    try:
-        c = 0
-        digits = [int(d) for d in reversed(number)]
-        for i, digit in enumerate(digits):
-            c = VERHOEFF_D[c][VERHOEFF_P[i % 8][digit]]
-        return c == 0
-    except (ValueError, IndexError):
-        return False
 
-# -------------------------------
-# FastAPI app
-# -------------------------------
-app = FastAPI()
+# Endpoints that only exist when their feature is enabled (SERVUS_FEATURES, see features.py)
+_FEATURE_ROUTES = [
+    (re.compile(r"^/analyze(/stream)?$"), "text_ml"),
+    (re.compile(r"^/admin/intents(/remove)?$"), "text_ml"),
+    (re.compile(r"^/workers/search$"), "text_ml"),
+    (re.compile(r"^/analyze-image$"), "image_ml"),
+    (re.compile(r"^/worker/[^/]+/verify-aadhaar$"), "blockchain"),
+    (re.compile(r"^/verification/[^/]+$"), "blockchain"),
+]
+
+
+def _disabled_feature(path: str):
+    return next((f for p, f in _FEATURE_ROUTES if p.match(path) and not features.is_enabled(f)), None)
 
-# Enable CORS
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
 
 @app.middleware("http")
 async def check_ready(request: Request, call_next):
@@ -291,17 +394,57 @@ async def check_ready(request: Request, call_next):
                 "Access-Control-Allow-Headers": "*",
             }
         )
-    if not _ready and request.url.path != "/health":
+    disabled = _disabled_feature(request.url.path)
+    if disabled:
         return JSONResponse(
-            status_code=503,
-            content={"error": "Server is still starting up. Please try again in a minute."},
+            status_code=501,
+            content={"error": str(features.FeatureDisabled(disabled)), "feature": disabled},
             headers={"Access-Control-Allow-Origin": "*"}
         )
+    if not _ready and request.url.path not in ("/health", "/metrics", "/admin/push/publish") and not _serves_stale(request):
+        return _not_ready_response()
     return await call_next(request)
 
+def _not_ready_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Server is still starting up. Please try again in a minute."},
+        headers={"Access-Control-Allow-Origin": "*"}
+    )
+
+# Request-scoped document loader (see doc_loader.py); DOC_LOADER=0 reads every document directly
+DOC_LOADER = os.getenv("DOC_LOADER", "1") == "1"
+
+
+@app.middleware("http")
+async def request_loader(request: Request, call_next):
+    if not DOC_LOADER or db is None:
+        return await call_next(request)
+    token = doc_loader.use(doc_loader.DocumentLoader(db))
+    try:
+        return await call_next(request)
+    finally:
+        doc_loader.reset(token)
+
 @app.get("/health")
 def health_check():
-    return {"status": "ok", "ready": _ready, "ml_ready": _ml_ready}
+    return {
+        "status": "ok",
+        "ready": _ready,
+        "ml_ready": _ml_ready,
+        "features": sorted(features.enabled),
+        "api_workers": API_WORKERS,
+        # Enabled features this process cannot serve with API_WORKERS>1
+        "disabled": _multi_process_limits(),
+        # Whether this worker runs the once-per-deployment jobs (the snapshot writer)
+        "leader": API_WORKERS <= 1 or _leader_lock is not None,
+        "worker_cache": worker_cache.status() if worker_cache is not None else None,
+    }
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of in-process metrics"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
 # Input model
 class ProblemInput(BaseModel):
@@ -329,9 +472,49 @@ workers_db_fallback = {
     "welder": [{"name": "Ravi", "location": "Bangalore", "rating": 4.7, "hourly_rate": 50, "experience": "8 years exp."}]
 }
 
+# -------------------------------
+# Conditional GETs for the polled listings
+# -------------------------------
+CONDITIONAL_GETS = metrics.Counter(
+    "servus_conditional_get_total",
+    "Listing GETs by endpoint and result: hit (304), miss (stale If-None-Match), unconditional, untracked")
+
+
+def _conditional_get(request: Request, endpoint: str, *keys):
+    """(ETag for the current versions of `keys` or None, a 304 response if the client already has it)"""
+    if worker_cache is None or worker_cache.source != "live":
+        # Versions only cover every write once the cache listeners are live
+        CONDITIONAL_GETS.inc(endpoint=endpoint, result="untracked")
+        return None, None
+    tag = versions.etag(f"{request.url.path}?{request.url.query}", listing_versions.token(keys))
+    if_none_match = request.headers.get("if-none-match")
+    if versions.matches(if_none_match, tag):
+        CONDITIONAL_GETS.inc(endpoint=endpoint, result="hit")
+        return tag, Response(status_code=304, headers=_etag_headers(tag))
+    CONDITIONAL_GETS.inc(endpoint=endpoint, result="miss" if if_none_match else "unconditional")
+    return tag, None
+
+
+def _etag_headers(tag: str):
+    return {"ETag": tag, "Cache-Control": "no-cache"} if tag else None
+
+
+def _bump_worker_versions(worker_id: str, category: str = None):
+    """Invalidate listings showing this worker now; the cache listener bumps again when the write lands"""
+    if category is None and worker_cache is not None:
+        category = (worker_cache.get(worker_id) or {}).get('category')
+    listing_versions.bump(f"worker:{worker_id}", "workers", *([f"category:{category}"] if category else []))
+
+
 # Function to get workers from Firestore
 def get_workers_from_firestore(category: str) -> list:
     """Fetch workers from Firestore by category, fallback to hardcoded data if empty"""
+    if worker_cache is not None and worker_cache.has_data:
+        workers = worker_cache.workers(category)
+        if workers:
+            return workers
+        return workers_db_fallback.get(category, [])
+
     try:
         workers_ref = db.collection('workers').where('category', '==', category)
         docs = workers_ref.stream()
@@ -356,12 +539,11 @@ def get_workers_from_firestore(category: str) -> list:
         return workers_db_fallback.get(category, [])
 
 
+QUICK_FIX_FALLBACK = "• Turn off the main supply and keep the area dry until the professional arrives.\n• Check for visible damage and take photos for reference.\n• Keep children and pets away from the affected area."
 
-def generate_quick_fix(problem: str, category: str) -> str:
-    """Generate quick fix suggestions using Gemini"""
-    print("🧠 Gemini quick fix called:", problem, category)
 
-    prompt = f"""
+def _quick_fix_prompt(problem: str, category: str) -> str:
+    return f"""
     You are a home service expert.
 
     User problem:
@@ -380,39 +562,51 @@ def generate_quick_fix(problem: str, category: str) -> str:
     - Keep response under 100 words
     """
 
+
+def generate_quick_fix(problem: str, category: str) -> str:
+    """Generate quick fix suggestions using Gemini"""
+    print("🧠 Gemini quick fix called:", problem, category)
+
+    if gemini_client is None:
+        return QUICK_FIX_FALLBACK
+    prompt = _quick_fix_prompt(problem, category)
+
+    return gemini_client.generate(prompt, fallback=QUICK_FIX_FALLBACK)
+
+
+def stream_quick_fix(problem: str, category: str):
+    """Yield quick fix text chunks as Gemini generates them (blocking iterator)"""
+    print("🧠 Gemini quick fix stream called:", problem, category)
+
+    if gemini_client is None:
+        yield QUICK_FIX_FALLBACK
+        return
+    yield from gemini_client.stream(_quick_fix_prompt(problem, category), fallback=QUICK_FIX_FALLBACK)
+
+
+def get_review_rollup(worker_id: str) -> dict:
+    """The worker's review rollup (one document get), falling back to their bookings before it is backfilled"""
     try:
-        response = gemini_model.generate_content(prompt)
-        return response.text.strip()
+        rollup = review_rollup.read_rollup(db, worker_id, get=doc_loader.load)
+        return rollup if rollup is not None else review_rollup.build_from_bookings(db, worker_id)
     except Exception as e:
-        print("❌ Gemini Error:", e)
-        return "• Turn off the main supply and keep the area dry until the professional arrives.\n• Check for visible damage and take photos for reference.\n• Keep children and pets away from the affected area."
+        print(f"❌ Error fetching reviews: {e}")
+        return review_rollup.empty_rollup(worker_id)
 
 
-def get_worker_reviews(worker_id: str) -> list:
-    """Fetch completed booking reviews for a worker from Firestore"""
+async def _prefetch_review_rollups(workers: list):
+    """Fetch every worker's rollup in one round trip so attach_review_summary finds them memoized"""
+    if doc_loader.current() is None:
+        return
     try:
-        reviews_ref = db.collection('bookings').where('workerId', '==', worker_id).where('status', '==', 'completed')
-        docs = reviews_ref.stream()
-
-        reviews = []
-        for doc in docs:
-            booking_data = doc.to_dict()
-            if booking_data.get('rating') and booking_data.get('rating') > 0:
-                reviews.append({
-                    'rating': booking_data.get('rating', 0),
-                    'review': booking_data.get('review', ''),
-                    'customerQuery': booking_data.get('customerQuery', '')
-                })
-
-        return reviews
+        await doc_loader.load_many([review_rollup.rollup_ref(db, w['id']) for w in workers if w.get('id')])
     except Exception as e:
-        print(f"❌ Error fetching reviews: {e}")
-        return []
+        print(f"⚠️ Review rollup prefetch failed: {e}")
 
 
 def generate_review_summary(worker_name: str, reviews: list) -> str:
     """Generate AI summary of worker reviews using Gemini"""
-    if not reviews:
+    if not reviews or gemini_client is None:
         return ""
 
     # Build review text for Gemini
@@ -439,57 +633,42 @@ def generate_review_summary(worker_name: str, reviews: list) -> str:
     Summary:
     """
 
-    try:
-        response = gemini_model.generate_content(prompt)
-        return response.text.strip()
-    except Exception as e:
-        print(f"❌ Gemini review summary error: {e}")
-        return ""
-    
-
-def _predict_from_base64(base64_str: str, mime_type: str) -> tuple[str, float]:
-    """
-    Decodes base64 image, runs it through the Keras model,
-    returns (predicted_class, confidence_percentage).
-    """
-    # Decode base64 to raw bytes
-    image_bytes = base64.b64decode(base64_str)
-
-    # Write to a temp file so cv2 can read it
-    ext = "jpg" if "jpeg" in mime_type else mime_type.split("/")[-1]
-    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext}") as tmp:
-        tmp.write(image_bytes)
-        tmp_path = tmp.name
+    return gemini_client.generate(prompt, fallback="")
 
-    try:
-        # Preprocess — same as Jupyter notebook (ResNet50)
-        img = cv2.imread(tmp_path)
-        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-        img = cv2.resize(img, (224, 224))
-        img_array = np.expand_dims(img, axis=0)
-        img_array = _resnet50_preprocess(img_array)
 
-        # Predict
-        prediction = _image_model.predict(img_array)
-        predicted_class = CLASS_NAMES[np.argmax(prediction)]
-        confidence = float(np.max(prediction) * 100)
+def attach_review_summary(worker: dict) -> dict:
+    """Add review_count and ai_review_summary to a worker dict in place"""
+    worker_id = worker.get('id', '')
+    rollup = get_review_rollup(worker_id) if worker_id else review_rollup.empty_rollup(worker_id)
+    reviews = rollup['recent']
+    worker['review_count'] = rollup['count']
+    worker['ai_review_summary'] = generate_review_summary(worker.get('name', 'Worker'), reviews) if reviews else ''
+    return worker
 
-        print(f"📸 Image prediction: {predicted_class} ({confidence:.1f}%)")
-        print("All probabilities:", {k: f"{v*100:.1f}%" for k, v in zip(CLASS_NAMES, prediction[0])})
 
-        return predicted_class, confidence
+# -------------------------------
+# Image analysis endpoint
+# -------------------------------
+class ImageInput(BaseModel):
+    image: str       # base64 encoded image bytes
+    mime_type: str   # "image/png" or "image/jpeg"; OpenCV detects the format itself
+    problem: str     # optional text context, may be empty
 
-    finally:
-        os.unlink(tmp_path)  # always clean up temp file
 
+ANALYZE_IMAGE_SPECULATION = metrics.Counter(
+    "servus_analyze_image_speculation_total",
+    "Whether /analyze-image's final category had a speculative worker fetch in flight (hit / miss)")
+# Weight of the image classifier vs the text classifier when both signals are present
+FUSION_IMAGE_WEIGHT = float(os.getenv("FUSION_IMAGE_WEIGHT", "0.5"))
+SPECULATIVE_CATEGORIES = int(os.getenv("SPECULATIVE_CATEGORIES", "2"))
 
 
+def _leading_categories(scores, n: int) -> list:
+    import numpy as np
+    from ml_models import CLASS_NAMES
+    return [CLASS_NAMES[i] for i in np.argsort(-np.asarray(scores), kind="stable")[:n]]
 
-# -------------------------------
-# API Endpoint
-# -------------------------------
 
-# ── Endpoint ────────────────────────────────────────────────────────────────
 @app.post("/analyze-image")
 async def analyze_image(image_input: ImageInput):
     if not _image_model_ready:
@@ -500,45 +679,79 @@ async def analyze_image(image_input: ImageInput):
             "status": "ml_loading"
         }
 
-    try:
-        best_category, confidence = _predict_from_base64(
-            image_input.image, image_input.mime_type
-        )
-    except Exception as e:
-        print(f"❌ Image prediction failed: {e}")
-        best_category = "general_contractor"
-        confidence = 0.0
+    # Loaded with the image model; image-less roles never import them
+    import numpy as np
+    from ml_models import CLASS_NAMES, fuse_scores
+
+    problem = (image_input.problem or "").strip()
+
+    # Image and text classifiers run side by side; each result speculatively
+    # starts worker fetches for its leading categories
+    fetches = {}
+
+    def speculate(categories: list):
+        for category in categories:
+            if category not in fetches:
+                fetches[category] = asyncio.create_task(asyncio.to_thread(get_workers_from_firestore, category))
+
+    image_task = asyncio.create_task(asyncio.to_thread(models.image_scores, image_input.image))
+    text_task = None
+    if problem and _ml_ready:
+        text_task = asyncio.create_task(asyncio.to_thread(models.category_scores, problem))
+
+    image_probs = text_scores = None
+    pending = {t for t in (image_task, text_task) if t is not None}
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            try:
+                scores = task.result()
+            except Exception as e:
+                print(f"❌ {'Image' if task is image_task else 'Text'} classification failed: {e}")
+                continue
+            if task is image_task:
+                image_probs = scores
+            else:
+                text_scores = scores
+            speculate(_leading_categories(scores, SPECULATIVE_CATEGORIES))
+
+    best_category, fused = fuse_scores(image_probs, text_scores, image_weight=FUSION_IMAGE_WEIGHT)
+    confidence = float(fused.max() * 100)
+    ANALYZE_IMAGE_SPECULATION.inc(outcome="hit" if best_category in fetches else "miss")
+    speculate([best_category])
+
+    async def workers_with_summaries():
+        workers = await fetches[best_category]
+        await _prefetch_review_rollups(workers)
+        await asyncio.gather(*(asyncio.to_thread(attach_review_summary, w) for w in workers))
+        return workers
 
     # Reuse your existing helpers — same as /analyze
-    available_workers = get_workers_from_firestore(best_category)
-    quick_fix = generate_quick_fix(
-        image_input.problem if image_input.problem else f"Issue detected: {best_category}",
-        best_category
+    available_workers, quick_fix = await asyncio.gather(
+        workers_with_summaries(),
+        asyncio.to_thread(generate_quick_fix, problem or f"Issue detected: {best_category}", best_category),
     )
 
-    for worker in available_workers:
-        worker_id = worker.get('id', '')
-        if worker_id:
-            reviews = get_worker_reviews(worker_id)
-            if reviews:
-                worker['review_count'] = len(reviews)
-                worker['ai_review_summary'] = generate_review_summary(worker.get('name', 'Worker'), reviews)
-            else:
-                worker['review_count'] = 0
-                worker['ai_review_summary'] = ''
-        else:
-            worker['review_count'] = 0
-            worker['ai_review_summary'] = ''
+    signals = {}
+    if image_probs is not None:
+        signals["image"] = {"category": CLASS_NAMES[int(np.argmax(image_probs))],
+                            "confidence": round(float(np.max(image_probs) * 100), 1)}
+    if text_scores is not None:
+        signals["text"] = {"category": CLASS_NAMES[int(np.argmax(text_scores))],
+                           "similarity": round(float(np.max(text_scores)), 3)}
 
     return {
         "detected_category": best_category,
         "available_workers": available_workers,
         "quick_fix": quick_fix,
-        "confidence": round(confidence, 1)  # bonus: send confidence back to frontend
+        "confidence": round(confidence, 1),  # bonus: send confidence back to frontend
+        "signals": signals
     }
 
 
-
+def classify_problem(problem: str) -> str:
+    """Map free text to a service category with the MiniLM similarity classifier"""
+    return models.classify_problem(problem)
 
 
 @app.post("/analyze")
@@ -551,46 +764,17 @@ async def analyze(problem_input: ProblemInput):
             "status": "ml_loading"
         }
 
-    query = problem_input.problem.lower().strip()
-
-    # Embed query
-    query_emb = model.encode(query, convert_to_tensor=True)
+    # Inference, Firestore and Gemini all block; keep them off the event loop so other lanes keep moving
+    best_category = await asyncio.to_thread(classify_problem, problem_input.problem)
 
-    # Compute cosine similarity
-    cos_scores = util.cos_sim(query_emb, torch.stack(data['embeddings'].to_list()))[0]
-
-    # Get top-k results
-    top_k = 5
-    threshold = 0.55
-    top_results = torch.topk(cos_scores, k=top_k)
-
-    best_category = None
-    for score, idx in zip(top_results.values, top_results.indices):
-        idx = idx.item()  # convert tensor to integer
-        if score >= threshold:
-            best_category = data.iloc[idx]['category']
-            break
-
-    if best_category is None:
-        best_category = "general_contractor"
-
-    available_workers = get_workers_from_firestore(best_category)
-    quick_fix = generate_quick_fix(problem_input.problem, best_category)
+    available_workers, quick_fix = await asyncio.gather(
+        asyncio.to_thread(get_workers_from_firestore, best_category),
+        asyncio.to_thread(generate_quick_fix, problem_input.problem, best_category),
+    )
 
     # Add AI review summaries for each worker
-    for worker in available_workers:
-        worker_id = worker.get('id', '')
-        if worker_id:
-            reviews = get_worker_reviews(worker_id)
-            if reviews:
-                worker['review_count'] = len(reviews)
-                worker['ai_review_summary'] = generate_review_summary(worker.get('name', 'Worker'), reviews)
-            else:
-                worker['review_count'] = 0
-                worker['ai_review_summary'] = ''
-        else:
-            worker['review_count'] = 0
-            worker['ai_review_summary'] = ''
+    await _prefetch_review_rollups(available_workers)
+    await asyncio.gather(*(asyncio.to_thread(attach_review_summary, w) for w in available_workers))
 
     return {
         "detected_category": best_category,
@@ -598,6 +782,105 @@ async def analyze(problem_input: ProblemInput):
         "quick_fix": quick_fix
     }
 
+# -------------------------------
+# Streaming analyze (Server-Sent Events)
+# -------------------------------
+ANALYZE_STREAM_TTFB = metrics.Histogram(
+    "servus_analyze_stream_ttfb_seconds", "Time until the first event of /analyze/stream is sent")
+ANALYZE_STREAM_TOTAL = metrics.Histogram(
+    "servus_analyze_stream_total_seconds", "Total duration of /analyze/stream responses")
+
+
+def _sse(event: str, payload: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+
+async def _analyze_events(problem: str, started: float):
+    """Yield SSE frames: category → workers → review summaries and quick fix tokens as they land → done"""
+    ttfb = None
+
+    def first_byte():
+        nonlocal ttfb
+        if ttfb is None:
+            ttfb = time.perf_counter() - started
+            ANALYZE_STREAM_TTFB.observe(ttfb)
+
+    try:
+        if not _ml_ready:
+            first_byte()
+            yield _sse("status", {"status": "ml_loading", "message": "AI model is still loading. Please try again in a minute."})
+            return
+
+        best_category = await asyncio.to_thread(classify_problem, problem)
+        first_byte()
+        yield _sse("category", {"detected_category": best_category})
+
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue()
+
+        def produce_quick_fix():
+            parts = []
+            try:
+                for text in stream_quick_fix(problem, best_category):
+                    parts.append(text)
+                    loop.call_soon_threadsafe(queue.put_nowait, ("quick_fix", {"delta": text}))
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, ("quick_fix_done", {"quick_fix": "".join(parts).strip()}))
+
+        # The quick fix streams while workers and their reviews are fetched
+        quick_fix_task = loop.run_in_executor(None, produce_quick_fix)
+
+        available_workers = await asyncio.to_thread(get_workers_from_firestore, best_category)
+        yield _sse("workers", {"available_workers": available_workers, "count": len(available_workers)})
+
+        async def summarize(index: int, worker: dict):
+            try:
+                await asyncio.to_thread(attach_review_summary, worker)
+            finally:
+                queue.put_nowait(("review_summary", {
+                    "index": index,
+                    "worker_id": worker.get('id', ''),
+                    "review_count": worker.get('review_count', 0),
+                    "ai_review_summary": worker.get('ai_review_summary', ''),
+                }))
+
+        await _prefetch_review_rollups(available_workers)
+        review_tasks = [asyncio.create_task(summarize(i, w)) for i, w in enumerate(available_workers)]
+
+        remaining = len(review_tasks) + 1  # every review summary plus the end of the quick fix
+        quick_fix = ""
+        while remaining:
+            event, payload = await queue.get()
+            if event == "quick_fix_done":
+                quick_fix = payload["quick_fix"]
+                remaining -= 1
+                continue
+            if event == "review_summary":
+                remaining -= 1
+            yield _sse(event, payload)
+
+        await quick_fix_task
+        total = time.perf_counter() - started
+        yield _sse("done", {
+            "detected_category": best_category,
+            "quick_fix": quick_fix,
+            "ttfb_ms": round(ttfb * 1000, 1),
+            "total_ms": round(total * 1000, 1),
+        })
+    finally:
+        ANALYZE_STREAM_TOTAL.observe(time.perf_counter() - started)
+
+
+@app.post("/analyze/stream")
+async def analyze_stream(problem_input: ProblemInput):
+    """Server-Sent Events variant of /analyze that sends each result as soon as it is ready"""
+    started = time.perf_counter()
+    return StreamingResponse(
+        _analyze_events(problem_input.problem, started),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 # -------------------------------
 # Seed workers endpoint (run once to populate Firestore)
 # -------------------------------
@@ -610,18 +893,118 @@ async def seed_workers():
         if len(existing) > 0:
             return {"message": "Workers collection already has data", "seeded": False}
 
-        # Seed all workers from fallback data
+        # Seed all workers from fallback data in one batched write
         count = 0
+        batch = db.batch()
         for category, workers in workers_db_fallback.items():
             for worker in workers:
                 worker_data = {**worker, "category": category, "verified": True}
-                db.collection('workers').add(worker_data)
+                batch.set(db.collection('workers').document(), worker_data)
                 count += 1
+        batch.commit()
+        listing_versions.reset()
 
         return {"message": f"Successfully seeded {count} workers to Firestore", "seeded": True}
     except Exception as e:
         return {"error": str(e), "seeded": False}
 
+@app.post("/workers/import")
+async def import_workers_file(request: Request, file: UploadFile = File(...), dry_run: bool = False,
+                              batch_size: int = 500):
+    """Bulk import workers from a CSV, JSON or JSON-lines upload (admin token required)"""
+    denied = _admin_denied(request)
+    if denied:
+        return denied
+    try:
+        from worker_import import import_workers
+
+        # The import blocks on Firestore, so keep it off the event loop
+        report = await asyncio.to_thread(
+            import_workers, db, firestore, file.file, file.filename or "",
+            batch_size=max(1, min(batch_size, 5000)), dry_run=dry_run,
+        )
+        if report['imported']:
+            listing_versions.reset()
+        print(f"✅ Worker import: {report['imported']}/{report['rows']} rows in {report['elapsed_seconds']}s")
+        return {"success": True, **report}
+    except Exception as e:
+        print(f"❌ Error importing workers: {e}")
+        return {"success": False, "error": str(e)}
+
+# -------------------------------
+# Intent corpus admin (runtime add / remove / replace)
+# -------------------------------
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+class IntentRow(BaseModel):
+    text: str
+    category: str
+
+
+class IntentRowsInput(BaseModel):
+    rows: list[IntentRow]
+
+
+class IntentRemoveInput(BaseModel):
+    texts: list[str]
+
+
+def _admin_denied(request: Request):
+    if ADMIN_TOKEN and request.headers.get("x-admin-token") == ADMIN_TOKEN:
+        return None
+    return JSONResponse(status_code=403, content={"success": False, "error": "Admin token required"})
+
+
+async def _update_intents(op: str, *args):
+    if not _ml_ready:
+        return JSONResponse(status_code=503, content={"success": False, "error": "ML model is still loading"})
+    try:
+        # Encoding new rows is CPU-bound; in-flight /analyze calls keep using the old snapshot
+        result = await asyncio.to_thread(getattr(models, op), *args)
+        print(f"✅ Intent corpus {op}: {result}")
+        return {"success": True, **result}
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    except Exception as e:
+        print(f"❌ Error in intent corpus {op}: {e}")
+        return {"success": False, "error": str(e)}
+
+
+@app.get("/admin/intents")
+async def intent_corpus_stats(request: Request):
+    denied = _admin_denied(request)
+    if denied:
+        return denied
+    return await _update_intents("intent_stats")
+
+
+@app.post("/admin/intents")
+async def add_intents(request: Request, payload: IntentRowsInput):
+    """Add intent rows; only texts not already embedded are encoded"""
+    denied = _admin_denied(request)
+    if denied:
+        return denied
+    return await _update_intents("add_intents", [row.model_dump() for row in payload.rows])
+
+
+@app.put("/admin/intents")
+async def replace_intents(request: Request, payload: IntentRowsInput):
+    """Replace all rows of each category present in the payload"""
+    denied = _admin_denied(request)
+    if denied:
+        return denied
+    return await _update_intents("replace_intents", [row.model_dump() for row in payload.rows])
+
+
+@app.post("/admin/intents/remove")
+async def remove_intents(request: Request, payload: IntentRemoveInput):
+    """Remove every intent row whose text matches"""
+    denied = _admin_denied(request)
+    if denied:
+        return denied
+    return await _update_intents("remove_intents", payload.texts)
+
 # -------------------------------
 # Worker Endpoints
 # -------------------------------
@@ -663,7 +1046,9 @@ def create_notification(user_id: str, user_type: str, title: str, body: str, not
         }
 
         # Add to user's notifications subcollection
-        db.collection(collection).document(user_id).collection('notifications').add(notification_data)
+        _, notification_ref = db.collection(collection).document(user_id).collection('notifications').add(notification_data)
+        push.publish_notification(user_type, user_id, notification_ref.id,
+                                  {k: v for k, v in notification_data.items() if k != 'createdAt'})
         print(f"✅ Notification created for {user_type}: {user_id}")
         return True
     except Exception as e:
@@ -694,7 +1079,7 @@ def notify_customer_job_status(booking_id: str, status: str, worker_name: str =
     """Notify customer about job status change"""
     try:
         # Get booking to find customer info
-        booking_doc = db.collection('bookings').document(booking_id).get()
+        booking_doc = doc_loader.load(db.collection('bookings').document(booking_id))
         if not booking_doc.exists:
             print(f"⚠️ Booking not found: {booking_id}")
             return False
@@ -761,12 +1146,14 @@ async def register_worker(worker_input: WorkerRegistrationInput):
         # Add to Firestore
         doc_ref = db.collection('workers').add(worker_data)
         worker_id = doc_ref[1].id
+        _bump_worker_versions(worker_id, worker_input.category)
 
         print(f"✅ New worker registered: {worker_input.name} ({worker_id})")
 
         return {
             "success": True,
             "worker_id": worker_id,
+            "session_token": session.issue("worker", worker_id),
             "message": "Worker registered successfully"
         }
     except Exception as e:
@@ -791,16 +1178,46 @@ async def login_worker(phone: str):
             "success": True,
             "registered": True,
             "worker_id": worker_doc.id,
-            "worker": worker_data
+            "worker": worker_data,
+            "session_token": session.issue("worker", worker_doc.id)
         }
     except Exception as e:
         print(f"❌ Error logging in worker: {e}")
         return {"success": False, "error": str(e)}
 
 @app.get("/worker/{worker_id}/profile")
-async def get_worker_profile(worker_id: str):
+async def get_worker_profile(worker_id: str, request: Request):
     """Get worker profile and stats from Firestore"""
     try:
+        tag, not_modified = _conditional_get(request, "worker_profile", f"worker:{worker_id}", f"jobs:{worker_id}")
+        if not_modified is not None:
+            return not_modified
+        cached = worker_cache.get(worker_id) if worker_cache is not None and worker_cache.has_data else None
+        if cached is not None:
+            stats = worker_cache.stats(worker_id)
+            # Same source as the Firestore path below; until Firebase is up, the worker's
+            # own rating, which rate_booking keeps in step with the rollup
+            rollup = review_rollup.read_rollup(db, worker_id, get=doc_loader.load) if _ready else None
+            avg_rating = review_rollup.average(rollup)
+            if avg_rating is None:
+                avg_rating = cached.get('rating', 0)
+            return FastJSONResponse({
+                "success": True,
+                "worker": cached,
+                "stats": {
+                    "total_jobs": stats['total_jobs'],
+                    "completed_jobs": stats['completed_jobs'],
+                    "pending_jobs": stats['pending_jobs'],
+                    "active_jobs": stats['active_jobs'],
+                    "total_earnings": stats['total_earnings'],
+                    "rating": round(avg_rating, 1)
+                },
+                "stale": worker_cache.stale
+            }, headers=_etag_headers(tag))
+        if not _ready:
+            # Served from the cache while starting up; a miss is not an answer yet
+            return _not_ready_response()
+
         # Get worker document
         worker_doc = db.collection('workers').document(worker_id).get()
 
@@ -827,11 +1244,13 @@ async def get_worker_profile(worker_id: str):
             if b.to_dict().get('status') == 'completed'
         )
 
-        # Calculate average rating from completed bookings with ratings
-        ratings = [b.to_dict().get('rating', 0) for b in bookings if b.to_dict().get('rating', 0) > 0]
-        avg_rating = sum(ratings) / len(ratings) if ratings else worker_data.get('rating', 0)
+        # Average rating from the worker's review rollup
+        avg_rating = review_rollup.average(review_rollup.read_rollup(db, worker_id))
+        if avg_rating is None:
+            ratings = [b.to_dict().get('rating', 0) for b in bookings if b.to_dict().get('rating', 0) > 0]
+            avg_rating = sum(ratings) / len(ratings) if ratings else worker_data.get('rating', 0)
 
-        return {
+        return FastJSONResponse({
             "success": True,
             "worker": worker_data,
             "stats": {
@@ -842,16 +1261,20 @@ async def get_worker_profile(worker_id: str):
                 "total_earnings": total_earnings,
                 "rating": round(avg_rating, 1)
             }
-        }
+        }, headers=_etag_headers(tag))
     except Exception as e:
         print(f"❌ Error fetching worker profile: {e}")
         return {"success": False, "error": str(e)}
 
 
 @app.get("/worker/{worker_id}/jobs")
-async def get_worker_jobs(worker_id: str, status: str = None):
-    """Get jobs/bookings for a worker, optionally filtered by status"""
+async def get_worker_jobs(worker_id: str, request: Request, status: str = None, fields: str = None):
+    """Get jobs/bookings for a worker, optionally filtered by status and projected to `fields`"""
     try:
+        tag, not_modified = _conditional_get(request, "worker_jobs", f"jobs:{worker_id}")
+        if not_modified is not None:
+            return not_modified
+
         # Query bookings for this worker
         bookings_ref = db.collection('bookings').where('workerId', '==', worker_id)
 
@@ -870,16 +1293,31 @@ async def get_worker_jobs(worker_id: str, status: str = None):
         # Sort by createdAt (most recent first)
         bookings.sort(key=lambda x: x.get('createdAt', ''), reverse=True)
 
-        return {
+        return FastJSONResponse({
             "success": True,
-            "jobs": bookings,
+            "jobs": project(bookings, parse_fields(fields)),
             "count": len(bookings)
-        }
+        }, headers=_etag_headers(tag))
     except Exception as e:
         print(f"❌ Error fetching worker jobs: {e}")
         return {"success": False, "error": str(e), "jobs": []}
 
 
+@app.get("/worker/{worker_id}/analytics")
+async def get_worker_analytics(worker_id: str, start: str = None, end: str = None, granularity: str = "day"):
+    """Jobs by event, earnings and ratings per day, week or month between `start` and `end` (YYYY-MM-DD, inclusive)"""
+    try:
+        start_date, end_date = worker_analytics.parse_range(start, end, granularity)
+    except ValueError as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+    try:
+        days = await asyncio.to_thread(worker_analytics.read_days, db, worker_id, start_date, end_date)
+        return {"success": True, **worker_analytics.merge_buckets(days, start_date, end_date, granularity)}
+    except Exception as e:
+        print(f"❌ Error fetching worker analytics: {e}")
+        return {"success": False, "error": str(e)}
+
+
 @app.post("/worker/{worker_id}/job-action")
 async def worker_job_action(worker_id: str, action_input: JobActionInput):
     """Accept or reject a job"""
@@ -887,9 +1325,10 @@ async def worker_job_action(worker_id: str, action_input: JobActionInput):
         job_id = action_input.job_id
         action = action_input.action
 
-        # Get the booking document
+        # The booking and the worker (for the notification's name) in one round trip
         booking_ref = db.collection('bookings').document(job_id)
-        booking_doc = booking_ref.get()
+        worker_ref = db.collection('workers').document(worker_id)
+        booking_doc, worker_doc = await doc_loader.load_many([booking_ref, worker_ref])
 
         if not booking_doc.exists:
             return {"success": False, "error": "Booking not found"}
@@ -900,49 +1339,43 @@ async def worker_job_action(worker_id: str, action_input: JobActionInput):
         if booking_data.get('workerId') != worker_id:
             return {"success": False, "error": "Unauthorized - booking belongs to different worker"}
 
-        # Get worker name for notifications
-        worker_doc = db.collection('workers').document(worker_id).get()
         worker_name = worker_doc.to_dict().get('name', 'Worker') if worker_doc.exists else 'Worker'
 
-        if action == 'accept':
-            booking_ref.update({
+        # action → (day-count event, booking fields, reply message)
+        actions = {
+            'accept': ('accepted', {
                 'status': 'accepted',
                 'acceptedAt': firestore.SERVER_TIMESTAMP
-            })
-            # Notify customer
-            notify_customer_job_status(job_id, 'accepted', worker_name)
-            return {"success": True, "message": "Job accepted successfully"}
-
-        elif action == 'reject':
-            booking_ref.update({
+            }, "Job accepted successfully"),
+            'reject': ('rejected', {
                 'status': 'rejected',
                 'rejectedAt': firestore.SERVER_TIMESTAMP,
                 'rejectionReason': action_input.reason
-            })
-            # Notify customer
-            notify_customer_job_status(job_id, 'rejected', worker_name)
-            return {"success": True, "message": "Job rejected"}
-
-        elif action == 'complete':
-            booking_ref.update({
+            }, "Job rejected"),
+            'complete': ('work_completed', {
                 'status': 'awaiting_confirmation',
                 'workCompletedAt': firestore.SERVER_TIMESTAMP
-            })
-            # Notify customer
-            notify_customer_job_status(job_id, 'awaiting_confirmation', worker_name)
-            return {"success": True, "message": "Job marked as completed, awaiting customer confirmation"}
-
-        elif action == 'start':
-            booking_ref.update({
+            }, "Job marked as completed, awaiting customer confirmation"),
+            'start': ('started', {
                 'status': 'in_progress',
                 'startedAt': firestore.SERVER_TIMESTAMP
-            })
-            # Notify customer
-            notify_customer_job_status(job_id, 'in_progress', worker_name)
-            return {"success": True, "message": "Job started"}
-
-        else:
+            }, "Job started"),
+        }
+        if action not in actions:
             return {"success": False, "error": f"Unknown action: {action}"}
+        event, fields, message = actions[action]
+
+        # The status change and its day count commit together. A repeated action (client
+        # retry) changes nothing, so it also bumps, pushes and notifies nothing
+        changed = await asyncio.to_thread(worker_analytics.record_transition, db, firestore, booking_ref,
+                                          worker_id, event, fields)
+        if changed:
+            status = fields['status']
+            listing_versions.bump(f"jobs:{worker_id}")
+            push.publish_job(worker_id, job_id, status)
+            # Notify customer
+            notify_customer_job_status(job_id, status, worker_name)
+        return {"success": True, "message": message}
 
     except Exception as e:
         print(f"❌ Error processing job action: {e}")
@@ -950,15 +1383,19 @@ async def worker_job_action(worker_id: str, action_input: JobActionInput):
 
 
 @app.get("/workers/category/{category}")
-async def get_workers_by_category(category: str):
-    """Get all workers in a specific category"""
+async def get_workers_by_category(category: str, request: Request, fields: str = None):
+    """Get all workers in a specific category, optionally projected to `fields`"""
     try:
+        tag, not_modified = _conditional_get(request, "workers_category", f"category:{category}")
+        if not_modified is not None:
+            return not_modified
         workers = get_workers_from_firestore(category)
-        return {
+        return FastJSONResponse({
             "success": True,
-            "workers": workers,
-            "count": len(workers)
-        }
+            "workers": project(workers, parse_fields(fields)),
+            "count": len(workers),
+            "stale": worker_cache is not None and worker_cache.has_data and worker_cache.stale
+        }, headers=_etag_headers(tag))
     except Exception as e:
         return {"success": False, "error": str(e), "workers": []}
 
@@ -982,6 +1419,13 @@ async def notify_new_booking(input: BookingNotificationInput):
         booking_data = booking_doc.to_dict()
         booking_data['id'] = input.booking_id
 
+        # The new booking joins the worker's job list
+        listing_versions.bump(f"jobs:{input.worker_id}")
+        if not booking_data.get('analyticsCounted'):
+            worker_analytics.record_created(db, firestore, booking_doc.reference)
+        push.publish_job(input.worker_id, input.booking_id,
+                         booking_data.get('status', 'pending'))
+
         # Send notification to worker
         result = notify_worker_new_booking(input.worker_id, booking_data)
 
@@ -994,6 +1438,69 @@ async def notify_new_booking(input: BookingNotificationInput):
         return {"success": False, "error": str(e)}
 
 
+# -------------------------------
+# Booking Rating Endpoint
+# -------------------------------
+class BookingRatingInput(BaseModel):
+    rating: float
+    review: str = ""
+
+@app.post("/booking/{booking_id}/rate")
+async def rate_booking(booking_id: str, input: BookingRatingInput):
+    """Confirm a booking as completed with the customer's rating; updates the worker's review rollup atomically.
+
+    Only the completion, rating and rollup are written; the app records payments itself.
+    """
+    try:
+        rollup = await asyncio.to_thread(
+            review_rollup.rate_booking, db, firestore, booking_id, input.rating, input.review
+        )
+        listing_versions.bump(f"jobs:{rollup['workerId']}")
+        _bump_worker_versions(rollup['workerId'])
+        push.publish_job(rollup['workerId'], booking_id, 'completed')
+        return {
+            "success": True,
+            "rating": round(review_rollup.average(rollup), 1),
+            "review_count": rollup['count']
+        }
+    except LookupError as e:
+        return {"success": False, "error": str(e)}
+    except ValueError as e:
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+    except Exception as e:
+        print(f"❌ Error rating booking: {e}")
+        return {"success": False, "error": str(e)}
+
+
+# -------------------------------
+# Push channel (WebSocket, see push.py)
+# -------------------------------
+@app.websocket("/ws/worker/{worker_id}")
+async def push_channel(websocket: WebSocket, worker_id: str):
+    """Job status changes and new notifications for one worker, as they happen (needs their session token)"""
+    if API_WORKERS > 1:
+        # The hub is per process: a client would only hear what its own worker publishes
+        await websocket.close(code=push.TRY_AGAIN_LATER)
+        return
+    await push.serve(websocket, "worker", worker_id, authenticate=session.verify)
+
+
+class PushPublishInput(BaseModel):
+    topics: list[str]
+    event: dict
+
+
+@app.post("/admin/push/publish")
+async def publish_push_event(request: Request, payload: PushPublishInput):
+    """Send an event to the connections on each topic (worker:<id> / customer:<id>)"""
+    denied = _admin_denied(request)
+    if denied:
+        return denied
+    listening = push.hub.publish_many(payload.topics, payload.event)
+    return {"success": True, "topics": len(payload.topics), "listening": listening,
+            "connections": push.hub.connections}
+
+
 # -------------------------------
 # Nearby Workers Endpoint
 # -------------------------------
@@ -1011,23 +1518,49 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
 
     return R * c
 
+@app.get("/workers/search")
+async def search_workers(q: str, lat: float = None, lng: float = None, radius: float = None,
+                         category: str = None, limit: int = 20, fields: str = None):
+    """Free-text worker search ranked by profile similarity, rating and (optionally) distance"""
+    if worker_search is None or not worker_search.ready:
+        return JSONResponse(status_code=503, content={
+            "success": False, "status": "indexing", "error": "Worker search index is still building", "workers": []})
+    try:
+        started = time.perf_counter()
+        # Query encoding is CPU-bound; keep it off the event loop
+        workers = await asyncio.to_thread(
+            worker_search.search, q, limit=max(1, min(limit, 100)), lat=lat, lng=lng, radius=radius,
+            category=category)
+        return FastJSONResponse({
+            "success": True,
+            "workers": project(workers, parse_fields(fields)),
+            "count": len(workers),
+            "took_ms": round((time.perf_counter() - started) * 1000, 1),
+        })
+    except Exception as e:
+        print(f"❌ Error searching workers: {e}")
+        return {"success": False, "error": str(e), "workers": []}
+
 @app.get("/workers/nearby")
-async def get_nearby_workers(lat: float = None, lng: float = None, radius: float = 50, category: str = None):
-    """Get all workers with location data, optionally filtered by distance and category"""
+async def get_nearby_workers(request: Request, lat: float = None, lng: float = None, radius: float = 50,
+                             category: str = None, fields: str = None):
+    """Get all workers with location data, optionally filtered by distance and category and projected to `fields`"""
     try:
-        # Build query
-        if category:
-            workers_ref = db.collection('workers').where('category', '==', category)
+        tag, not_modified = _conditional_get(request, "workers_nearby", f"category:{category}" if category else "workers")
+        if not_modified is not None:
+            return not_modified
+        if worker_cache is not None and worker_cache.has_data:
+            candidates = worker_cache.workers(category)
         else:
-            workers_ref = db.collection('workers')
-
-        docs = workers_ref.stream()
+            # Build query
+            if category:
+                workers_ref = db.collection('workers').where('category', '==', category)
+            else:
+                workers_ref = db.collection('workers')
+            candidates = [{**doc.to_dict(), 'id': doc.id} for doc in workers_ref.stream()]
 
         workers = []
-        for doc in docs:
-            worker_data = doc.to_dict()
-            worker_data['id'] = doc.id
-
+        for worker_data in candidates:
             # Calculate distance if user location provided
             if lat is not None and lng is not None:
                 worker_lat = worker_data.get('latitude')
@@ -1056,11 +1589,12 @@ async def get_nearby_workers(lat: float = None, lng: float = None, radius: float
         workers.sort(key=lambda x: x.get('distance_km', 999))
 
         print(f"✅ Found {len(workers)} nearby workers")
-        return {
+        return FastJSONResponse({
             "success": True,
-            "workers": workers,
-            "count": len(workers)
-        }
+            "workers": project(workers, parse_fields(fields)),
+            "count": len(workers),
+            "stale": worker_cache is not None and worker_cache.has_data and worker_cache.stale
+        }, headers=_etag_headers(tag))
     except Exception as e:
         print(f"❌ Error fetching nearby workers: {e}")
         return {"success": False, "error": str(e), "workers": []}
@@ -1069,9 +1603,192 @@ async def get_nearby_workers(lat: float = None, lng: float = None, radius: float
 # -------------------------------
 # Aadhaar Blockchain Verification Endpoint
 # -------------------------------
+BLOCKCHAIN_NETWORK = "Polygon Amoy Testnet"
+
+# verification id → {worker_id, verification_hash, timestamp, batch_id}, plus write_status
+# ('retrying' / 'failed'), write_attempts, fields and error once its worker update has failed
+pending_verifications = {}
+# batch id → MerkleBatch whose root transaction is still unconfirmed
+merkle_batches = {}
+# anchored root → {txHash, ...}; mirror of the merkle_anchors collection
+anchored_roots = {}
+# Worker updates that failed after their batch settled, written again on a timer
+VERIFICATION_RETRY_SECONDS = float(os.getenv("VERIFICATION_RETRY_SECONDS", "30"))
+VERIFICATION_WRITE_ATTEMPTS = int(os.getenv("VERIFICATION_WRITE_ATTEMPTS", "10"))
+_verification_retries = []
+_verification_retry_lock = threading.Lock()
+_verification_retry_timer = None
+
+
+def _anchor_merkle_batch(batch):
+    """Flush-thread callback: send one 0-value self-transaction carrying the batch root."""
+    merkle_batches[batch.id] = batch
+    for item in batch.items:
+        if item['key'] in pending_verifications:
+            pending_verifications[item['key']]['batch_id'] = batch.id
+    return tx_submitter.submit(
+        w3.to_bytes(text=batch.root),
+        on_confirmed=_on_merkle_batch_confirmed,
+        on_failed=_on_merkle_batch_failed,
+        job_id=batch.id,
+    )
+
+
+def _on_merkle_batch_confirmed(job):
+    """Receipt-thread callback: record the anchor and mark every worker in the batch verified."""
+    batch = merkle_batches.pop(job.id, None)
+    if not batch:
+        return
+
+    anchor = {
+        'txHash': job.tx_hash,
+        'network': BLOCKCHAIN_NETWORK,
+        'leafCount': len(batch.items),
+        'blockNumber': job.block_number,
+        'anchoredAt': datetime.utcnow().isoformat(),
+    }
+    db.collection('merkle_anchors').document(batch.root).set(anchor)
+    anchored_roots[batch.root] = anchor
+
+    written = _update_verified_workers([(item, {
+        'verified': True,
+        'verificationStatus': 'confirmed',
+        'blockchainTxHash': job.tx_hash,
+        'blockchainNetwork': BLOCKCHAIN_NETWORK,
+        'verificationHash': item['verification_hash'],
+        'verifiedAt': item['timestamp'],
+        'merkleRoot': batch.root,
+        'merkleProof': batch.proofs[index],
+        'merkleLeafIndex': index,
+    }) for index, item in enumerate(batch.items)])
+
+    print(f"✅ {written}/{len(batch.items)} workers verified under Merkle root {batch.root}: {job.tx_hash}")
+
+
+def _fail_merkle_batch(batch, error: str):
+    _update_verified_workers([(item, {
+        'verificationStatus': 'failed',
+        'verificationError': error,
+    }) for item in batch.items])
+
+
+def _update_verified_workers(updates: list) -> int:
+    """
+    Write (item, fields) updates to the batch's worker documents, 500 per
+    Firestore batch. A chunk whose commit fails is retried one worker at a
+    time, so one bad document cannot keep the others pending. An item
+    leaves pending_verifications only once its worker is written (or no
+    longer exists); a failed one is queued for another attempt
+    (_retry_verification_write). Returns the number written.
+    """
+    from google.api_core.exceptions import NotFound
+
+    written = 0
+
+    def done(item):
+        pending_verifications.pop(item['key'], None)
+        _bump_worker_versions(item['worker_id'])
+
+    for start in range(0, len(updates), 500):
+        chunk = updates[start:start + 500]
+        write_batch = db.batch()
+        for item, fields in chunk:
+            write_batch.update(db.collection('workers').document(item['worker_id']), fields)
+        try:
+            write_batch.commit()
+        except Exception as e:
+            print(f"⚠️ Worker verification batch failed ({e}); writing its {len(chunk)} workers one at a time")
+        else:
+            for item, _ in chunk:
+                done(item)
+            written += len(chunk)
+            continue
+
+        for item, fields in chunk:
+            try:
+                db.collection('workers').document(item['worker_id']).update(fields)
+            except NotFound:
+                print(f"⚠️ Worker {item['worker_id']} no longer exists; dropping its verification")
+                pending_verifications.pop(item['key'], None)
+            except Exception as e:
+                _retry_verification_write(item, fields, e)
+            else:
+                done(item)
+                written += 1
+    return written
+
+
+def _retry_verification_write(item, fields: dict, error: Exception):
+    """
+    Queue a worker update that failed for another try in VERIFICATION_RETRY_SECONDS.
+    After VERIFICATION_WRITE_ATTEMPTS the verification is marked failed, which
+    /verification reports and verify-aadhaar accepts a new submission for.
+    """
+    global _verification_retry_timer
+    entry = pending_verifications.get(item['key'])
+    if entry is None:
+        return
+    entry['write_attempts'] = entry.get('write_attempts', 0) + 1
+    entry['fields'] = fields
+    entry['error'] = f"Could not update worker: {error}"
+    if entry['write_attempts'] >= VERIFICATION_WRITE_ATTEMPTS:
+        entry['write_status'] = 'failed'
+        print(f"❌ Giving up on worker {item['worker_id']} after {entry['write_attempts']} attempts: {error}")
+        return
+    entry['write_status'] = 'retrying'
+    print(f"⚠️ Could not update worker {item['worker_id']} ({error}); retrying in {VERIFICATION_RETRY_SECONDS:g}s")
+    with _verification_retry_lock:
+        _verification_retries.append((item, fields))
+        if _verification_retry_timer is None:
+            _verification_retry_timer = threading.Timer(VERIFICATION_RETRY_SECONDS, _retry_verification_writes)
+            _verification_retry_timer.daemon = True
+            _verification_retry_timer.start()
+
+
+def _retry_verification_writes():
+    global _verification_retry_timer
+    with _verification_retry_lock:
+        updates = list(_verification_retries)
+        _verification_retries.clear()
+        _verification_retry_timer = None
+    # Items resubmitted in the meantime are no longer pending
+    updates = [(item, fields) for item, fields in updates if item['key'] in pending_verifications]
+    if updates:
+        written = _update_verified_workers(updates)
+        print(f"🔁 Retried {len(updates)} worker verification updates, {written} written")
+
+
+def _on_merkle_batch_failed(job):
+    """Receipt-thread callback: clear the pending flag so the workers can retry."""
+    batch = merkle_batches.pop(job.id, None)
+    if batch:
+        _fail_merkle_batch(batch, job.error)
+
+
+def _on_merkle_batch_error(batch, error):
+    merkle_batches.pop(batch.id, None)
+    _fail_merkle_batch(batch, str(error))
+
+
+def _explorer_url(tx_hash: str) -> str:
+    # Hashes stored before they were normalized may lack the 0x prefix
+    return f"https://amoy.polygonscan.com/tx/0x{tx_hash.lower().removeprefix('0x')}"
+
+
+def _get_anchor(root: str):
+    """Look up an anchored Merkle root, caching Firestore reads in memory."""
+    anchor = anchored_roots.get(root)
+    if anchor is None:
+        doc = db.collection('merkle_anchors').document(root).get()
+        if doc.exists:
+            anchor = doc.to_dict()
+            anchored_roots[root] = anchor
+    return anchor
+
+
 @app.post("/worker/{worker_id}/verify-aadhaar")
 async def verify_aadhaar(worker_id: str, input: AadhaarVerificationInput):
-    """Verify worker's Aadhaar number and record hash on Polygon Amoy blockchain"""
+    """Validate worker's Aadhaar number and queue its hash for the Polygon Amoy blockchain"""
     try:
         aadhaar = input.aadhaar_number.strip().replace(" ", "")
 
@@ -1093,55 +1810,54 @@ async def verify_aadhaar(worker_id: str, input: AadhaarVerificationInput):
             return {"success": False, "error": "Worker is already verified"}
 
         # Check blockchain wallet is configured
-        if not blockchain_account or not WALLET_ADDRESS:
+        if not merkle_batcher:
             return {"success": False, "error": "Blockchain verification is not configured on server"}
 
+        # A verification for this worker is already on its way — hand back the same id
+        existing_id = worker_data.get('verificationId')
+        existing = pending_verifications.get(existing_id)
+        if existing is not None and existing.get('write_status') == 'failed':
+            # Its worker update was given up on; this submission replaces it
+            pending_verifications.pop(existing_id, None)
+        elif worker_data.get('verificationStatus') == 'pending' and existing is not None:
+            return {
+                "success": True,
+                "status": "pending",
+                "verification_id": existing_id,
+                "message": "Verification already in progress",
+            }
+
         # Create verification hash: SHA-256(workerId:aadhaar:timestamp)
         timestamp = datetime.utcnow().isoformat()
         raw_string = f"{worker_id}:{aadhaar}:{timestamp}"
         verification_hash = hashlib.sha256(raw_string.encode()).hexdigest()
 
-        # Send 0-value self-transaction on Polygon Amoy with hash in data field
-        try:
-            nonce = w3.eth.get_transaction_count(WALLET_ADDRESS)
-            tx = {
-                'nonce': nonce,
-                'to': WALLET_ADDRESS,  # self-transaction
-                'value': 0,
-                'gas': 25000,
-                'gasPrice': w3.to_wei('30', 'gwei'),
-                'chainId': 80002,  # Polygon Amoy
-                'data': w3.to_bytes(text=verification_hash),
-            }
-
-            signed_tx = w3.eth.account.sign_transaction(tx, os.getenv("BLOCKCHAIN_PRIVATE_KEY", ""))
-            tx_hash = w3.eth.send_raw_transaction(signed_tx.raw_transaction)
-            tx_hash_hex = tx_hash.hex()
-
-            print(f"✅ Blockchain tx sent: {tx_hash_hex}")
-
-        except Exception as e:
-            print(f"❌ Blockchain transaction failed: {e}")
-            return {"success": False, "error": f"Blockchain transaction failed: {str(e)}"}
-
-        # Update worker document in Firestore
+        verification_id = uuid.uuid4().hex
+        pending_verifications[verification_id] = {
+            'worker_id': worker_id,
+            'verification_hash': verification_hash,
+            'timestamp': timestamp,
+            'batch_id': None,
+        }
         db.collection('workers').document(worker_id).update({
-            'verified': True,
-            'blockchainTxHash': tx_hash_hex,
-            'blockchainNetwork': 'Polygon Amoy Testnet',
-            'verificationHash': verification_hash,
-            'verifiedAt': timestamp,
+            'verificationStatus': 'pending',
+            'verificationId': verification_id,
         })
+        _bump_worker_versions(worker_id)
 
-        print(f"✅ Worker {worker_id} verified on blockchain: {tx_hash_hex}")
+        # The hash joins the current Merkle batch; only the batch root goes on-chain
+        merkle_batcher.add(
+            verification_id, verification_hash,
+            worker_id=worker_id, timestamp=timestamp,
+        )
 
         return {
             "success": True,
-            "message": "Aadhaar verified and recorded on blockchain",
-            "tx_hash": tx_hash_hex,
+            "status": "pending",
+            "verification_id": verification_id,
             "verification_hash": verification_hash,
-            "network": "Polygon Amoy Testnet",
-            "explorer_url": f"https://amoy.polygonscan.com/tx/0x{tx_hash_hex}",
+            "network": BLOCKCHAIN_NETWORK,
+            "message": "Aadhaar validated, blockchain record pending",
         }
 
     except Exception as e:
@@ -1149,6 +1865,110 @@ async def verify_aadhaar(worker_id: str, input: AadhaarVerificationInput):
         return {"success": False, "error": str(e)}
 
 
+@app.get("/verification/{verification_id}")
+async def get_verification_status(verification_id: str):
+    """Poll the state of a queued Aadhaar verification"""
+    try:
+        pending = pending_verifications.get(verification_id)
+        if pending and pending.get('write_status'):
+            # The batch has settled but its worker document is not written yet ('retrying') or never was ('failed')
+            fields = pending.get('fields', {})
+            return {
+                "success": True,
+                "verification_id": verification_id,
+                "status": pending['write_status'],
+                "tx_hash": fields.get('blockchainTxHash'),
+                "merkle_root": fields.get('merkleRoot'),
+                "error": pending.get('error'),
+                "network": BLOCKCHAIN_NETWORK,
+            }
+        if pending:
+            batch_id = pending.get('batch_id')
+            job = tx_submitter.status(batch_id) if batch_id else None
+            if not job:
+                # Still waiting for the current Merkle batch to flush
+                return {
+                    "success": True,
+                    "verification_id": verification_id,
+                    "status": "batched",
+                    "tx_hash": None,
+                    "error": None,
+                    "network": BLOCKCHAIN_NETWORK,
+                }
+            batch = merkle_batches.get(batch_id)
+            return {
+                "success": True,
+                "verification_id": verification_id,
+                "status": job['status'],
+                "tx_hash": job['tx_hash'],
+                "merkle_root": batch.root if batch else None,
+                "error": job['error'],
+                "network": BLOCKCHAIN_NETWORK,
+            }
+
+        # Finished (or tracked by another instance) — the worker document has the outcome
+        workers = db.collection('workers').where('verificationId', '==', verification_id).limit(1).get()
+        if len(workers) == 0:
+            return {"success": False, "error": "Verification not found"}
+
+        worker_data = workers[0].to_dict()
+        status = 'confirmed' if worker_data.get('verified') else worker_data.get('verificationStatus', 'unknown')
+        tx_hash = worker_data.get('blockchainTxHash')
+        result = {
+            "success": True,
+            "verification_id": verification_id,
+            "status": status,
+            "tx_hash": tx_hash,
+            "merkle_root": worker_data.get('merkleRoot'),
+            "error": worker_data.get('verificationError'),
+            "network": BLOCKCHAIN_NETWORK,
+        }
+        if tx_hash:
+            result["explorer_url"] = _explorer_url(tx_hash)
+        return result
+    except Exception as e:
+        print(f"❌ Error fetching verification status: {e}")
+        return {"success": False, "error": str(e)}
+
+
+@app.get("/worker/{worker_id}/verify-proof")
+async def verify_worker_proof(worker_id: str):
+    """Check a worker's Merkle proof against the anchored root, without touching the chain"""
+    try:
+        from merkle import verify_proof
+
+        worker_doc = db.collection('workers').document(worker_id).get()
+        if not worker_doc.exists:
+            return {"success": False, "error": "Worker not found"}
+
+        worker_data = worker_doc.to_dict()
+        root = worker_data.get('merkleRoot')
+        proof = worker_data.get('merkleProof')
+        verification_hash = worker_data.get('verificationHash')
+        if not root or proof is None or not verification_hash:
+            return {"success": False, "error": "Worker has no Merkle-anchored verification"}
+
+        anchor = _get_anchor(root)
+        if not anchor:
+            return {"success": True, "valid": False, "error": "Merkle root has not been anchored"}
+
+        tx_hash = anchor.get('txHash')
+        valid = verify_proof(verification_hash, proof, root) and tx_hash == worker_data.get('blockchainTxHash')
+
+        return {
+            "success": True,
+            "valid": valid,
+            "merkle_root": root,
+            "leaf_index": worker_data.get('merkleLeafIndex'),
+            "tx_hash": tx_hash,
+            "network": anchor.get('network', BLOCKCHAIN_NETWORK),
+            "explorer_url": _explorer_url(tx_hash) if tx_hash else None,
+        }
+    except Exception as e:
+        print(f"❌ Error verifying Merkle proof: {e}")
+        return {"success": False, "error": str(e)}
+
+
 # -------------------------------
 # Config Endpoint (for Flutter app to get API keys)
 # -------------------------------
@@ -0,0 +1,149 @@
+"""
+Throughput of the multi-process deployment at 1, 2, 4 and 8 API workers.
+
+Starts one shared model server, then for each worker count starts
+`uvicorn app:app --workers N` against it, waits for /health to report the
+ML model ready, and drives the endpoint with concurrent keep-alive clients.
+Needs the same environment (.env / Firebase credentials) as the service.
+
+Usage:
+    python benchmarks/bench_api_workers.py [--workers 1 2 4 8] [--duration 20]
+        [--clients 32] [--path /analyze] [--body '{"problem": "water leaking from pipe"}']
+"""
+
+import os
+import sys
+import json
+import time
+import signal
+import argparse
+import threading
+import subprocess
+import http.client
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def _rss_mb(pid: int) -> float:
+    """RSS of a process and all its children, in MB (Linux /proc)."""
+    total = 0
+    pids = [pid]
+    while pids:
+        p = pids.pop()
+        try:
+            with open(f"/proc/{p}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total += int(line.split()[1])
+            with open(f"/proc/{p}/task/{p}/children") as f:
+                pids.extend(int(c) for c in f.read().split())
+        except (FileNotFoundError, ProcessLookupError):
+            continue
+    return total / 1024
+
+
+def _wait_ready(port: int, timeout: float = 900):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=5)
+            conn.request("GET", "/health")
+            health = json.loads(conn.getresponse().read())
+            if health.get("ready") and health.get("ml_ready"):
+                return
+        except (OSError, ValueError):
+            pass
+        time.sleep(1)
+    raise TimeoutError("API workers never became ready")
+
+
+def _drive(port: int, path: str, body: bytes, clients: int, duration: float) -> dict:
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.perf_counter() + duration
+
+    def client():
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        local = []
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            try:
+                conn.request("POST" if body else "GET", path, body=body or None,
+                             headers={"Content-Type": "application/json"})
+                response = conn.getresponse()
+                response.read()
+                if response.status != 200:
+                    raise OSError(response.status)
+                local.append(time.perf_counter() - start)
+            except OSError:
+                with lock:
+                    errors[0] += 1
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000 if latencies else float("nan")
+    return {
+        "requests": len(latencies),
+        "errors": errors[0],
+        "rps": len(latencies) / duration,
+        "p50_ms": pick(0.50),
+        "p99_ms": pick(0.99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--duration", type=float, default=20)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--port", type=int, default=7861)
+    parser.add_argument("--path", default="/analyze")
+    parser.add_argument("--body", default='{"problem": "water leaking from pipe"}')
+    args = parser.parse_args()
+
+    socket_path = f"/tmp/servus-bench-{os.getpid()}.sock"
+    env = {**os.environ, "MODEL_SERVER_SOCKET": socket_path}
+    model_server = subprocess.Popen([sys.executable, "model_server.py", "--socket", socket_path],
+                                    cwd=MODEL_DIR, env=env, stdout=subprocess.DEVNULL)
+    results = []
+    try:
+        for n in args.workers:
+            api = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app:app", "--port", str(args.port), "--workers", str(n),
+                 "--log-level", "warning"],
+                cwd=MODEL_DIR, env=env, stdout=subprocess.DEVNULL, start_new_session=True)
+            try:
+                _wait_ready(args.port)
+                _drive(args.port, args.path, args.body.encode(), args.clients, 2)  # warm-up
+                result = _drive(args.port, args.path, args.body.encode(), args.clients, args.duration)
+                result.update(workers=n, api_rss_mb=_rss_mb(api.pid), model_server_rss_mb=_rss_mb(model_server.pid))
+                results.append(result)
+                print(f"workers={n}: {result['rps']:.1f} req/s, p50 {result['p50_ms']:.0f} ms, "
+                      f"p99 {result['p99_ms']:.0f} ms, errors {result['errors']}")
+            finally:
+                os.killpg(api.pid, signal.SIGTERM)
+                api.wait()
+    finally:
+        model_server.terminate()
+        model_server.wait()
+
+    print()
+    print("| API workers | req/s | p50 (ms) | p99 (ms) | errors | API RSS (MB) | model server RSS (MB) |")
+    print("|---:|---:|---:|---:|---:|---:|---:|")
+    for r in results:
+        print(f"| {r['workers']} | {r['rps']:.1f} | {r['p50_ms']:.0f} | {r['p99_ms']:.0f} | {r['errors']} | "
+              f"{r['api_rss_mb']:.0f} | {r['model_server_rss_mb']:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Memory, scan latency and top-1 category agreement of the compact
+embedding stores (float16, int8) against float32.
+
+Agreement is leave-one-out over service_intents.csv: every intent row is
+used as a query against the rest of the corpus and classified with the
+same rule as ml_models.classify_problem (best match, general_contractor
+below the 0.55 threshold). Embeddings come from MiniLM when
+sentence-transformers is installed, else from intent_embeddings.npz.
+
+Usage:
+    python benchmarks/bench_embedding_store.py [--scan-rows 200000] [--repeat 5]
+"""
+
+import os
+import csv
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import embedding_store
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+THRESHOLD = 0.55
+
+
+def load_corpus() -> tuple[list, list, np.ndarray]:
+    with open(os.path.join(MODEL_DIR, "service_intents.csv"), newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    texts = [r["text"].lower() for r in rows]
+    categories = [r["category"] for r in rows]
+    try:
+        from sentence_transformers import SentenceTransformer
+    except ImportError:
+        cache = np.load(os.path.join(MODEL_DIR, "intent_embeddings.npz"))
+        lookup = dict(zip(cache["texts"].tolist(), embedding_store.from_arrays(cache)[:]))
+        print("sentence-transformers not installed — using intent_embeddings.npz")
+        return texts, categories, np.stack([lookup[t] for t in texts])
+    model = SentenceTransformer("all-MiniLM-L6-v2")
+    return texts, categories, model.encode(texts, convert_to_numpy=True, normalize_embeddings=True).astype(np.float32)
+
+
+def leave_one_out(store, queries: np.ndarray, categories: list) -> list:
+    predicted = []
+    for i, q in enumerate(queries):
+        scores = store @ q
+        scores[i] = -np.inf
+        best = int(np.argmax(scores))
+        predicted.append(categories[best] if scores[best] >= THRESHOLD else "general_contractor")
+    return predicted
+
+
+def scan_ms(store, query: np.ndarray, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        store @ query
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scan-rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    texts, categories, matrix = load_corpus()
+    baseline = None
+    rng = np.random.default_rng(0)
+    big = matrix[rng.integers(len(matrix), size=args.scan_rows)]
+    query = matrix[0]
+
+    print()
+    print(f"{len(texts)} intents x {matrix.shape[1]}d; scan over {args.scan_rows} rows")
+    print()
+    print("| store | corpus (KB) | per 1M rows (MB) | top-1 agreement vs float32 | max score error | scan (ms) |")
+    print("|---|---:|---:|---:|---:|---:|")
+    for dtype in ("float32", "float16", "int8"):
+        store = embedding_store.build(dtype, matrix)
+        predicted = leave_one_out(store, matrix, categories)
+        if baseline is None:
+            baseline = predicted
+        agreement = np.mean([a == b for a, b in zip(predicted, baseline)])
+        error = max(float(np.abs((store @ q) - (matrix @ q)).max()) for q in matrix[:200])
+        big_store = embedding_store.build(dtype, big)
+        per_million = big_store.nbytes / len(big_store)  # bytes per row == MB per million rows
+        print(f"| {dtype} | {store.nbytes / 1024:.0f} | {per_million:.0f} | {agreement:.4f} | {error:.5f} | "
+              f"{scan_ms(big_store, query, args.repeat):.1f} |")
+
+
+if __name__ == "__main__":
+    main()
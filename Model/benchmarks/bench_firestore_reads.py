@@ -0,0 +1,247 @@
+"""
+Firestore reads and round trips per request, with and without the
+request-scoped document loader (DOC_LOADER, see doc_loader.py).
+
+The app runs in-process against an in-memory Firestore that counts every
+document it returns and every RPC it would have made: a document get, a
+get_all batch, a query. Both modes replay the same requests against the
+same data:
+
+    job-action   POST /worker/{id}/job-action (booking + worker, the status transaction's booking read,
+                 and the notification's booking re-read)
+    analyze      POST /analyze for a category with --workers workers (one rollup per worker)
+
+No Firebase credentials or ML models are needed; the classifier is stubbed
+to a fixed category and Gemini is off, so only the Firestore traffic differs.
+
+Usage:
+    python benchmarks/bench_firestore_reads.py [--workers 8] [--requests 50]
+"""
+
+import os
+import sys
+import time
+import argparse
+import itertools
+import threading
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+CATEGORY = "plumber"
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, store, path):
+        self._store = store
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    def collection(self, name):
+        return FakeCollection(self._store, f"{self.path}/{name}")
+
+    def get(self, transaction=None):
+        self._store.count(documents=1)
+        return FakeSnapshot(self, self._store.docs.get(self.path))
+
+    def set(self, data, merge=False):
+        if merge:
+            _merge(self._store.docs.setdefault(self.path, {}), data)
+        else:
+            self._store.docs[self.path] = dict(data)
+
+    def update(self, data):
+        self._store.docs.setdefault(self.path, {}).update(data)
+
+
+def _merge(target: dict, data: dict):
+    for key, value in data.items():
+        if isinstance(value, dict):
+            _merge(target.setdefault(key, {}), value)
+        elif isinstance(value, FakeIncrement):
+            target[key] = target.get(key, 0) + value.value
+        else:
+            target[key] = value
+
+
+class FakeTransaction:
+    """Applies its writes directly; the store is only touched by one request at a time here."""
+
+    def update(self, ref, data):
+        ref.update(data)
+
+    def set(self, ref, data, merge=False):
+        ref.set(data, merge=merge)
+
+
+class FakeQuery:
+    def __init__(self, store, path, filters=(), limit=None):
+        self._store = store
+        self._path = path
+        self._filters = filters
+        self._limit = limit
+
+    def where(self, field, op, value):
+        assert op == "==", op
+        return FakeQuery(self._store, self._path, self._filters + ((field, value),), self._limit)
+
+    def limit(self, n):
+        return FakeQuery(self._store, self._path, self._filters, n)
+
+    def select(self, fields):
+        return self
+
+    def stream(self):
+        prefix = self._path + "/"
+        matches = [FakeSnapshot(FakeDocument(self._store, path), data)
+                   for path, data in self._store.docs.items()
+                   if path.startswith(prefix) and "/" not in path[len(prefix):]
+                   and all(data.get(f) == v for f, v in self._filters)]
+        matches = matches[:self._limit] if self._limit is not None else matches
+        self._store.count(documents=len(matches))
+        return iter(matches)
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, store, path):
+        super().__init__(store, path)
+
+    def document(self, doc_id=None):
+        return FakeDocument(self._store, f"{self._path}/{doc_id or next(self._store.ids)}")
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+
+class FakeFirestore:
+    """Just enough of google.cloud.firestore.Client for the endpoints measured here."""
+
+    def __init__(self):
+        self.docs = {}
+        self.ids = (f"auto{i}" for i in itertools.count())
+        self.documents = 0
+        self.round_trips = 0
+        self._lock = threading.Lock()
+
+    def count(self, documents: int):
+        with self._lock:
+            self.documents += documents
+            self.round_trips += 1
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def transaction(self):
+        return FakeTransaction()
+
+    def get_all(self, refs):
+        refs = list(refs)
+        self.count(documents=len(refs))
+        return [FakeSnapshot(ref, self.docs.get(ref.path)) for ref in refs]
+
+
+class FakeIncrement:
+    def __init__(self, value):
+        self.value = value
+
+
+class FakeFirestoreModule:
+    SERVER_TIMESTAMP = "SERVER_TIMESTAMP"
+    Increment = FakeIncrement
+
+    @staticmethod
+    def transactional(fn):
+        return fn
+
+
+class StubModels:
+    def classify_problem(self, problem):
+        return CATEGORY
+
+
+def seed(db: FakeFirestore, workers: int, requests: int):
+    for w in range(workers):
+        worker_id = f"w{w}"
+        db.docs[f"workers/{worker_id}"] = {"name": f"Worker {w}", "category": CATEGORY, "phone": f"9{w:09d}"}
+        db.docs[f"worker_review_rollups/{worker_id}"] = {
+            "workerId": worker_id, "count": 1, "ratingSum": 5.0,
+            "histogram": {"1": 0, "2": 0, "3": 0, "4": 0, "5": 1},
+            "recent": [{"bookingId": f"done{w}", "rating": 5.0, "review": "Great",
+                        "customerQuery": "leak", "ratedAt": "2024-01-01T00:00:00"}],
+        }
+    for b in range(requests):
+        db.docs[f"bookings/b{b}"] = {"workerId": "w0", "customerId": f"c{b}", "status": "pending"}
+
+
+def measure(app, client, method: str, path: str, bodies) -> dict:
+    db = app.db
+    db.documents = db.round_trips = 0
+    started = time.perf_counter()
+    for body in bodies:
+        response = client.request(method, path, json=body)
+        assert response.status_code == 200 and response.json().get("success", True), response.text
+    elapsed = time.perf_counter() - started
+    n = len(bodies)
+    return {"reads": db.documents / n, "round_trips": db.round_trips / n, "ms": elapsed * 1000 / n}
+
+
+def run(app, workers: int, requests: int) -> dict:
+    from fastapi.testclient import TestClient
+
+    app.db = FakeFirestore()
+    seed(app.db, workers, requests)
+    client = TestClient(app.app)
+    return {
+        "job-action": measure(app, client, "POST", "/worker/w0/job-action",
+                              [{"job_id": f"b{b}", "action": "accept"} for b in range(requests)]),
+        "analyze": measure(app, client, "POST", "/analyze",
+                           [{"problem": "water leaking from pipe"}] * requests),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=8, help="Workers in the analyzed category")
+    parser.add_argument("--requests", type=int, default=50, help="Requests per endpoint and mode")
+    args = parser.parse_args()
+
+    # Only the Firestore-backed API and the (stubbed) text classifier; no worker cache, so reads hit "Firestore"
+    os.environ.setdefault("SERVUS_FEATURES", "text_ml")
+    os.environ["WORKER_CACHE"] = "0"
+    os.environ["WORKER_SEARCH"] = "0"
+    sys.path.insert(0, MODEL_DIR)
+    import app
+    app._init_thread.join()
+    app.firestore = FakeFirestoreModule()
+    app.gemini_client = None
+    app.models = StubModels()
+    app._ready = app._ml_ready = True
+
+    results = {}
+    for label, enabled in (("before (DOC_LOADER=0)", False), ("after (DOC_LOADER=1)", True)):
+        app.DOC_LOADER = enabled
+        results[label] = run(app, args.workers, args.requests)
+
+    print(f"\n{'endpoint':<12} {'mode':<22} {'reads/req':>10} {'round trips/req':>16} {'ms/req':>8}")
+    for endpoint in ("job-action", "analyze"):
+        for label, result in results.items():
+            r = result[endpoint]
+            print(f"{endpoint:<12} {label:<22} {r['reads']:>10.1f} {r['round_trips']:>16.1f} {r['ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Parity and cost of the fused image preprocessing path.
+
+Checks that ml_models.preprocess_image is bit-for-bit identical to the
+previous pipeline (temp file → imread → BGR→RGB → resize → float32 →
+RGB→BGR → per-channel mean subtraction) over JPEG/PNG inputs of several
+sizes, including grayscale, alpha and EXIF-rotated images, then reports
+per-image time and bytes allocated (tracemalloc) for both paths.
+Exits non-zero if any output differs.
+
+Usage:
+    python benchmarks/bench_image_preprocess.py [--repeat 200]
+"""
+
+import os
+import sys
+import time
+import struct
+import argparse
+import tempfile
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import ml_models
+
+
+def _resnet50_preprocess(img_array):
+    """ResNet50 preprocess_input (caffe mode): RGB → BGR, subtract ImageNet mean."""
+    x = img_array.astype('float32')
+    x = x[..., ::-1]  # RGB to BGR
+    x[..., 0] -= 103.939
+    x[..., 1] -= 116.779
+    x[..., 2] -= 123.68
+    return x
+
+
+def legacy_preprocess(image_bytes: bytes, mime_type: str) -> np.ndarray:
+    """The pre-fusion pipeline from ml_models._predict_from_base64, verbatim."""
+    ext = "jpg" if "jpeg" in mime_type else mime_type.split("/")[-1]
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{ext}") as tmp:
+        tmp.write(image_bytes)
+        tmp_path = tmp.name
+    try:
+        img = cv2.imread(tmp_path)
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        img = cv2.resize(img, (224, 224))
+        img_array = np.expand_dims(img, axis=0)
+        return _resnet50_preprocess(img_array)
+    finally:
+        os.unlink(tmp_path)
+
+
+def _with_exif_orientation(jpeg: bytes, orientation: int) -> bytes:
+    tiff = b"MM\x00\x2a\x00\x00\x00\x08" + struct.pack(">H", 1)
+    tiff += struct.pack(">HHII", 0x0112, 3, 1, orientation << 16) + struct.pack(">I", 0)
+    app1 = b"Exif\x00\x00" + tiff
+    return jpeg[:2] + b"\xff\xe1" + struct.pack(">H", len(app1) + 2) + app1 + jpeg[2:]
+
+
+def sample_images() -> list:
+    rng = np.random.default_rng(0)
+    samples = []
+    for h, w in [(224, 224), (120, 90), (480, 640), (1080, 1920), (3024, 4032)]:
+        img = cv2.GaussianBlur(rng.integers(0, 256, (h, w, 3), dtype=np.uint8), (5, 5), 0)
+        samples.append((f"jpeg {w}x{h}", cv2.imencode(".jpg", img)[1].tobytes(), "image/jpeg"))
+    img = rng.integers(0, 256, (480, 640), dtype=np.uint8)
+    samples.append(("png gray 640x480", cv2.imencode(".png", img)[1].tobytes(), "image/png"))
+    img = rng.integers(0, 256, (480, 640, 4), dtype=np.uint8)
+    samples.append(("png rgba 640x480", cv2.imencode(".png", img)[1].tobytes(), "image/png"))
+    img = rng.integers(0, 256, (480, 640, 3), dtype=np.uint8)
+    samples.append(("jpeg exif-rotated 640x480",
+                    _with_exif_orientation(cv2.imencode(".jpg", img)[1].tobytes(), 6), "image/jpeg"))
+    return samples
+
+
+def measure(fn, repeat: int) -> tuple[float, float]:
+    """(mean ms per call, mean KB allocated per call)."""
+    fn()  # warm up buffers / codecs
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - start) / repeat
+
+    tracemalloc.start()
+    allocated = 0
+    for _ in range(min(repeat, 20)):
+        tracemalloc.reset_peak()
+        base = tracemalloc.get_traced_memory()[0]
+        fn()
+        allocated += tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return elapsed * 1000, allocated / min(repeat, 20) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    samples = sample_images()
+    failures = 0
+    for name, data, mime in samples:
+        expected = legacy_preprocess(data, mime)
+        actual = ml_models.preprocess_image(data)
+        same = (expected.shape == actual.shape and expected.dtype == actual.dtype
+                and np.array_equal(expected.view(np.uint32), actual.view(np.uint32)))
+        failures += not same
+        print(f"{'✅' if same else '❌'} {name}: {'bit-identical' if same else 'MISMATCH'}")
+
+    print()
+    print("| image | legacy (ms) | fused (ms) | legacy peak alloc (KB) | fused peak alloc (KB) |")
+    print("|---|---:|---:|---:|---:|")
+    for name, data, mime in samples:
+        repeat = max(5, args.repeat // 20) if len(data) > 1_000_000 else args.repeat
+        legacy_ms, legacy_kb = measure(lambda: legacy_preprocess(data, mime), repeat)
+        fused_ms, fused_kb = measure(lambda: ml_models.preprocess_image(data), repeat)
+        print(f"| {name} | {legacy_ms:.2f} | {fused_ms:.2f} | {legacy_kb:.0f} | {fused_kb:.0f} |")
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Load test for the WebSocket push channel (push.py): memory per idle
+connection and event delivery latency.
+
+Starts `uvicorn app:app` with only the core feature, opens --connections
+idle worker connections that answer heartbeats, and reads the server's RSS
+before and after. Each connection signs in with a session token the script
+signs itself from the SESSION_SECRET it gives the server. It then
+publishes --rounds events through /admin/push/publish. Each event goes to
+every connection, or to --fanout of them, and the script measures how long
+each connection takes to receive it. Client and server share the machine,
+so latencies include the client's own scheduling of that many sockets.
+
+Usage:
+    python benchmarks/bench_push_connections.py [--connections 10000] [--rounds 20]
+        [--fanout 0] [--idle 30] [--port 8765]
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import asyncio
+import argparse
+import resource
+import subprocess
+import http.client
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def _rss_mb(pid: int) -> float:
+    with open(f"/proc/{pid}/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def _raise_fd_limit(needed: int):
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    target = hard if hard != resource.RLIM_INFINITY else needed
+    if soft < target:
+        resource.setrlimit(resource.RLIMIT_NOFILE, (target, hard))
+    if target < needed:
+        print(f"⚠️ open file limit {target} is below the {needed} sockets needed; raise ulimit -n")
+
+
+def _http(port: int, method: str, path: str, body=None, headers=None):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+    try:
+        conn.request(method, path, body=json.dumps(body) if body is not None else None,
+                     headers={"Content-Type": "application/json", **(headers or {})})
+        response = conn.getresponse()
+        return response.status, response.read()
+    finally:
+        conn.close()
+
+
+def _wait_healthy(port: int, timeout: float = 120):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            if _http(port, "GET", "/health")[0] == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError("server did not become healthy")
+
+
+def _percentile(values: list, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else float("nan")
+
+
+class Client:
+    __slots__ = ("ws", "user_id", "received", "pings")
+
+    def __init__(self, ws, user_id: str):
+        self.ws = ws
+        self.user_id = user_id
+        self.received = {}  # round → latency in seconds
+        self.pings = 0
+
+    async def read(self):
+        async for raw in self.ws:
+            message = json.loads(raw)
+            if message["type"] == "ping":
+                self.pings += 1
+                await self.ws.send('{"type": "pong"}')
+            elif message["type"] == "bench":
+                self.received[message["round"]] = time.time() - message["sentAt"]
+
+
+async def connect_all(port: int, n: int, concurrency: int = 500) -> list:
+    import websockets
+    import session
+
+    clients = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def connect(i: int):
+        async with semaphore:
+            token = session.issue("worker", f"bench{i}")
+            ws = await websockets.connect(f"ws://127.0.0.1:{port}/ws/worker/bench{i}?token={token}",
+                                          ping_interval=None, max_queue=None)
+            hello = json.loads(await ws.recv())
+            assert hello["type"] == "hello", hello
+            client = Client(ws, f"bench{i}")
+            asyncio.ensure_future(client.read())
+            clients.append(client)
+
+    await asyncio.gather(*(connect(i) for i in range(n)))
+    return clients
+
+
+async def run(args, server_pid: int, token: str) -> dict:
+    warmup = await connect_all(args.port, 10)
+    await asyncio.sleep(1)
+    rss_before = _rss_mb(server_pid)
+
+    started = time.perf_counter()
+    clients = warmup + await connect_all(args.port, args.connections)
+    connect_s = time.perf_counter() - started
+    await asyncio.sleep(2)
+    rss_after = _rss_mb(server_pid)
+
+    print(f"… {len(clients)} connections open, idling {args.idle:.0f}s")
+    await asyncio.sleep(args.idle)
+    rss_idle = _rss_mb(server_pid)
+
+    latencies, expected = [], 0
+    publish_ms = []
+    for r in range(args.rounds):
+        targets = random.sample(clients, args.fanout) if args.fanout else clients
+        topics = [f"worker:{c.user_id}" for c in targets]
+        sent = time.perf_counter()
+        status, _ = await asyncio.to_thread(
+            _http, args.port, "POST", "/admin/push/publish",
+            {"topics": topics, "event": {"type": "bench", "round": r, "sentAt": time.time()}},
+            {"X-Admin-Token": token})
+        publish_ms.append((time.perf_counter() - sent) * 1000)
+        assert status == 200, status
+        expected += len(targets)
+        deadline = time.perf_counter() + 10
+        while time.perf_counter() < deadline and any(r not in c.received for c in targets):
+            await asyncio.sleep(0.05)
+        latencies += [c.received[r] * 1000 for c in targets if r in c.received]
+
+    for client in clients:
+        await client.ws.close()
+    connections = len(clients) - len(warmup)
+    return {
+        "connections": connections,
+        "connect_s": connect_s,
+        "rss_before_mb": rss_before,
+        "rss_after_mb": rss_after,
+        "rss_idle_mb": rss_idle,
+        "kb_per_connection": (rss_after - rss_before) * 1024 / connections if connections else 0,
+        "delivered": len(latencies),
+        "expected": expected,
+        "publish_ms_p50": _percentile(publish_ms, 0.5),
+        "latency_ms_p50": _percentile(latencies, 0.5),
+        "latency_ms_p99": _percentile(latencies, 0.99),
+        "latency_ms_max": max(latencies) if latencies else float("nan"),
+        "pings_answered": sum(c.pings for c in clients),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--connections", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--fanout", type=int, default=0, help="Connections per event (0: all of them)")
+    parser.add_argument("--idle", type=float, default=30, help="Seconds to hold the connections idle")
+    parser.add_argument("--heartbeat", type=float, default=10, help="PUSH_HEARTBEAT_SECONDS for the server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ws", default="auto", help="uvicorn WebSocket implementation (--ws)")
+    args = parser.parse_args()
+
+    _raise_fd_limit(args.connections + 100)
+    token = uuid.uuid4().hex
+    os.environ["SESSION_SECRET"] = uuid.uuid4().hex
+    sys.path.insert(0, MODEL_DIR)
+    env = {**os.environ, "SERVUS_FEATURES": "core", "WORKER_CACHE": "0", "ADMIN_TOKEN": token,
+           "PUSH_HEARTBEAT_SECONDS": str(args.heartbeat),
+           "PUSH_MAX_CONNECTIONS": str(args.connections + 100)}
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app:app", "--port", str(args.port), "--ws", args.ws,
+         "--log-level", "warning", "--backlog", "4096"],
+        cwd=MODEL_DIR, env=env, stdout=subprocess.DEVNULL)
+    try:
+        _wait_healthy(args.port)
+        result = asyncio.run(run(args, server.pid, token))
+    finally:
+        server.terminate()
+        server.wait(30)
+
+    print(f"\nconnections          {result['connections']} (opened in {result['connect_s']:.1f}s)")
+    print(f"server RSS           {result['rss_before_mb']:.0f} MB → {result['rss_after_mb']:.0f} MB "
+          f"({result['rss_idle_mb']:.0f} MB after {args.idle:.0f}s idle)")
+    print(f"memory / connection  {result['kb_per_connection']:.1f} KB")
+    print(f"heartbeats answered  {result['pings_answered']}")
+    print(f"delivered            {result['delivered']}/{result['expected']} events")
+    print(f"publish call p50     {result['publish_ms_p50']:.1f} ms")
+    print(f"delivery latency     p50 {result['latency_ms_p50']:.1f} ms, p99 {result['latency_ms_p99']:.1f} ms, "
+          f"max {result['latency_ms_max']:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
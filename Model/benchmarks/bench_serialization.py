@@ -0,0 +1,109 @@
+"""
+Serialization CPU time for large worker lists.
+
+Compares FastAPI's default path (jsonable_encoder + JSONResponse) with
+FastJSONResponse, and the cost/size of gzip and brotli on the result.
+
+Usage:
+    python benchmarks/bench_serialization.py [--sizes 1000 10000] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from fast_response import FastJSONResponse, compress, brotli
+
+try:
+    from google.api_core.datetime_helpers import DatetimeWithNanoseconds
+    from google.cloud.firestore import GeoPoint
+except ImportError:
+    # Same shapes as the Firestore types, for machines without firebase-admin
+    class DatetimeWithNanoseconds(datetime.datetime):
+        pass
+
+    class GeoPoint:
+        def __init__(self, latitude, longitude):
+            self.latitude = latitude
+            self.longitude = longitude
+
+        def __iter__(self):
+            yield "latitude", self.latitude
+            yield "longitude", self.longitude
+
+
+CATEGORIES = ["plumber", "electrician", "ac_technician", "carpenter", "painter", "cleaning"]
+
+
+def make_workers(n: int) -> list:
+    rng = random.Random(42)
+    now = datetime.datetime.now(datetime.timezone.utc)
+    workers = []
+    for i in range(n):
+        created = now - datetime.timedelta(days=rng.randint(0, 900), seconds=rng.randint(0, 86400))
+        workers.append({
+            "id": f"w{i:07d}",
+            "name": f"Worker {i}",
+            "phone": f"+9198{rng.randint(10000000, 99999999)}",
+            "location": rng.choice(["Mumbai", "Delhi", "Pune", "Chennai", "Bangalore"]),
+            "latitude": 19.0 + rng.random(),
+            "longitude": 72.8 + rng.random(),
+            "geo": GeoPoint(19.0 + rng.random(), 72.8 + rng.random()),
+            "category": rng.choice(CATEGORIES),
+            "experience": f"{rng.randint(1, 20)} years exp.",
+            "hourly_rate": rng.randint(25, 90),
+            "rating": round(rng.uniform(3, 5), 1),
+            "verified": rng.random() < 0.5,
+            "createdAt": DatetimeWithNanoseconds.fromtimestamp(created.timestamp(), datetime.timezone.utc),
+            "distance_km": rng.uniform(0, 50),
+        })
+    return workers
+
+
+def cpu_time(fn, repeat: int) -> float:
+    """Best-of-`repeat` process CPU time in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.process_time()
+        fn()
+        best = min(best, time.process_time() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print("| workers | default (ms) | fast (ms) | speedup | body (KB) | gzip (ms / KB) | br (ms / KB) |")
+    print("|---:|---:|---:|---:|---:|---:|---:|")
+    for n in args.sizes:
+        payload = {"success": True, "workers": make_workers(n), "count": n}
+
+        default_ms = cpu_time(lambda: JSONResponse(jsonable_encoder(payload)), args.repeat)
+        fast_ms = cpu_time(lambda: FastJSONResponse(payload), args.repeat)
+        body = FastJSONResponse(payload).body
+
+        gzip_ms = cpu_time(lambda: compress(body, "gzip"), args.repeat)
+        gzip_kb = len(compress(body, "gzip")) / 1024
+        if brotli is not None:
+            br_ms = cpu_time(lambda: compress(body, "br"), args.repeat)
+            br = f"{br_ms:.1f} / {len(compress(body, 'br')) / 1024:.0f}"
+        else:
+            br = "n/a (brotli not installed)"
+
+        print(f"| {n} | {default_ms:.1f} | {fast_ms:.1f} | {default_ms / fast_ms:.1f}x | "
+              f"{len(body) / 1024:.0f} | {gzip_ms:.1f} / {gzip_kb:.0f} | {br} |")
+
+
+if __name__ == "__main__":
+    main()
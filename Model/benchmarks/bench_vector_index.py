@@ -0,0 +1,110 @@
+"""
+Recall@k versus latency of the vector index backends against exact search.
+
+Uses the cached MiniLM intent embeddings (intent_embeddings.npz) as seeds
+when present, otherwise random unit vectors, and grows them to `--rows`
+with paraphrase-like noise. Queries are noisy copies of random rows.
+
+Usage:
+    python benchmarks/bench_vector_index.py [--rows 100000] [--queries 500] [--k 5]
+        [--nlist 0] [--nprobe 4 8 16 32] [--ef 16 32 64 128]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import vector_index
+import embedding_store
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+
+def _normalize(x: np.ndarray) -> np.ndarray:
+    return (x / np.linalg.norm(x, axis=1, keepdims=True)).astype(np.float32)
+
+
+def make_corpus(rows: int, queries: int, seed: int = 0) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    cache_path = os.path.join(MODEL_DIR, "intent_embeddings.npz")
+    if os.path.exists(cache_path):
+        seeds = embedding_store.from_arrays(np.load(cache_path))[:]
+        print(f"Seeding from {len(seeds)} cached intent embeddings")
+    else:
+        seeds = _normalize(rng.normal(size=(2000, 384)))
+        print("No intent_embeddings.npz — seeding from random unit vectors")
+    dim = seeds.shape[1]
+    corpus = _normalize(seeds[rng.integers(len(seeds), size=rows)] + rng.normal(scale=0.04, size=(rows, dim)))
+    picks = corpus[rng.integers(rows, size=queries)]
+    return corpus, _normalize(picks + rng.normal(scale=0.03, size=(queries, dim)))
+
+
+def run(index, queries: np.ndarray, truth: list, k: int) -> dict:
+    latencies, hits, top1 = [], 0, 0
+    for q, expected in zip(queries, truth):
+        start = time.perf_counter()
+        _, ids = index.search(q, k)
+        latencies.append(time.perf_counter() - start)
+        hits += len(set(ids.tolist()) & expected[1])
+        top1 += bool(len(ids)) and ids[0] == expected[0]
+    latencies.sort()
+    return {
+        "recall": hits / (k * len(queries)),
+        "top1": top1 / len(queries),
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--nlist", type=int, default=0, help="IVF lists (0 = sqrt(rows))")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16, 32])
+    parser.add_argument("--ef", type=int, nargs="+", default=[16, 32, 64, 128])
+    args = parser.parse_args()
+
+    corpus, queries = make_corpus(args.rows, args.queries)
+    exact = vector_index.build("exact", corpus)
+    truth = []
+    for q in queries:
+        _, ids = exact.search(q, args.k)
+        truth.append((ids[0], set(ids.tolist())))
+
+    results = [("exact", 0.0, run(exact, queries, truth, args.k))]
+
+    start = time.perf_counter()
+    ivf = vector_index.build("ivf", corpus, nlist=args.nlist or None)
+    build_s = time.perf_counter() - start
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        results.append((f"ivf nlist={len(ivf.centroids)} nprobe={nprobe}", build_s, run(ivf, queries, truth, args.k)))
+
+    if vector_index.hnswlib is None:
+        print("hnswlib not installed — skipping hnsw")
+    else:
+        start = time.perf_counter()
+        hnsw = vector_index.build("hnsw", corpus)
+        build_s = time.perf_counter() - start
+        for ef in args.ef:
+            hnsw.graph["hnsw"].set_ef(max(ef, args.k))
+            results.append((f"hnsw M=16 ef={ef}", build_s, run(hnsw, queries, truth, args.k)))
+
+    print()
+    print(f"{args.rows} rows x {corpus.shape[1]}d, {args.queries} queries, k={args.k}")
+    print()
+    print(f"| index | build (s) | recall@{args.k} | top-1 agreement | p50 (ms) | p99 (ms) |")
+    print("|---|---:|---:|---:|---:|---:|")
+    for name, build_s, r in results:
+        print(f"| {name} | {build_s:.1f} | {r['recall']:.3f} | {r['top1']:.3f} | {r['p50_ms']:.2f} | {r['p99_ms']:.2f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+Ranking latency of the semantic worker search index.
+
+Indexes synthetic workers (random unit vectors stand in for MiniLM profile
+embeddings, so the model is not needed) spread over Mumbai, then times
+search_vector with no filters, a category filter, and a location + radius.
+Query encoding (one MiniLM call) is not included.
+
+Usage:
+    python benchmarks/bench_worker_search.py [--workers 100000] [--queries 500]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from ml_models import CLASS_NAMES
+from worker_search import WorkerSearch
+
+
+def build(n: int, seed: int = 0) -> WorkerSearch:
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(n, 384)).astype(np.float32)
+    cursor = [0]
+
+    def encode(texts):
+        start = cursor[0]
+        cursor[0] += len(texts)
+        return vectors[start:start + len(texts)]
+
+    search = WorkerSearch(encode)
+    batch = {}
+    for i in range(n):
+        batch[f"w{i}"] = {
+            "name": f"Worker {i}",
+            "category": CLASS_NAMES[i % len(CLASS_NAMES)],
+            "experience": f"{i % 20} years",
+            "location": "Mumbai",
+            "rating": float(rng.integers(0, 51)) / 10,
+            "latitude": 19.0 + rng.random() * 0.3,
+            "longitude": 72.8 + rng.random() * 0.2,
+        }
+        if len(batch) == 5000:
+            search.upsert(batch)
+            batch = {}
+    if batch:
+        search.upsert(batch)
+    return search
+
+
+def timed(search: WorkerSearch, queries: np.ndarray, **kwargs) -> tuple[float, float]:
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        search.search_vector(q, **kwargs)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return latencies[len(latencies) // 2] * 1000, latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=500)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    search = build(args.workers)
+    print(f"Indexed {args.workers} workers in {time.perf_counter() - start:.1f}s")
+
+    rng = np.random.default_rng(1)
+    queries = rng.normal(size=(args.queries, 384)).astype(np.float32)
+    queries /= np.linalg.norm(queries, axis=1, keepdims=True)
+
+    cases = [
+        ("semantic + rating", {}),
+        ("+ category filter", {"category": "plumber"}),
+        ("+ distance, 5 km radius", {"lat": 19.1, "lng": 72.85, "radius": 5}),
+        ("+ category + distance", {"category": "plumber", "lat": 19.1, "lng": 72.85, "radius": 5}),
+    ]
+    print()
+    print("| query | p50 (ms) | p99 (ms) |")
+    print("|---|---:|---:|")
+    for name, kwargs in cases:
+        p50, p99 = timed(search, queries, limit=20, **kwargs)
+        print(f"| {name} | {p50:.2f} | {p99:.2f} |")
+
+
+if __name__ == "__main__":
+    main()
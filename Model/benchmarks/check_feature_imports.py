@@ -0,0 +1,118 @@
+"""
+Import footprint of each deployment role (SERVUS_FEATURES, see features.py).
+
+Every role is started in a fresh interpreter: it imports app, waits for the
+background init to finish, then requests the gated endpoints. It reports
+how long `import app` took, the RSS afterwards, the per-module import
+report, and which heavy modules ended up in sys.modules. The script fails
+if a role imports a module that belongs to a feature it does not enable.
+The core role must never load torch or TensorFlow; tests/test_feature_imports.py
+checks that on every test run.
+
+Usage:
+    python benchmarks/check_feature_imports.py [--roles core text_ml all] [--init-timeout 600]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+# Heavy modules and the feature that is allowed to import them
+HEAVY = {
+    "torch": "text_ml",
+    "sentence_transformers": "text_ml",
+    "pandas": "text_ml",
+    "tensorflow": "image_ml",
+    "keras": "image_ml",
+    "cv2": "image_ml",
+    "web3": "blockchain",
+    "google.generativeai": "gemini",
+}
+GATED_ROUTES = {
+    "/analyze": ("post", "text_ml"),
+    "/workers/search": ("get", "text_ml"),
+    "/analyze-image": ("post", "image_ml"),
+    "/worker/probe/verify-aadhaar": ("post", "blockchain"),
+}
+
+
+def child(init_timeout: float):
+    started = time.perf_counter()
+    import app
+    import_s = time.perf_counter() - started
+    import features
+    rss_after_import = features.rss_mb()
+    app._init_thread.join(init_timeout)
+
+    from fastapi.testclient import TestClient
+    client = TestClient(app.app)
+    statuses = {path: (client.post(path, json={}) if method == "post" else client.get(path)).status_code
+                for path, (method, _) in GATED_ROUTES.items()}
+    print(json.dumps({
+        "import_app_s": import_s,
+        "rss_after_import_mb": rss_after_import,
+        "statuses": statuses,
+        "heavy_loaded": sorted(m for m in HEAVY if m in sys.modules),
+        **features.report(),
+    }))
+
+
+def run_role(role: str, init_timeout: float) -> dict:
+    env = {**os.environ, "SERVUS_FEATURES": role}
+    result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", "--init-timeout", str(init_timeout)],
+                            cwd=MODEL_DIR, env=env, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines or not lines[-1].startswith("{"):
+        raise RuntimeError(f"role {role} failed:\n{result.stderr[-2000:]}")
+    return json.loads(lines[-1])
+
+
+def check(role: str, report: dict) -> list:
+    enabled = set(report["features"])
+    problems = [f"{role}: imported {module} although {feature} is disabled"
+                for module, feature in HEAVY.items()
+                if module in report["heavy_loaded"] and feature not in enabled]
+    for path, (_, feature) in GATED_ROUTES.items():
+        if feature not in enabled and report["statuses"][path] != 501:
+            problems.append(f"{role}: {path} answered {report['statuses'][path]} instead of 501 with {feature} disabled")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--roles", nargs="+", default=["core", "text_ml", "image_ml", "all"])
+    parser.add_argument("--init-timeout", type=float, default=600)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        sys.path.insert(0, MODEL_DIR)
+        child(args.init_timeout)
+        return
+
+    problems = []
+    for role in args.roles:
+        report = run_role(role, args.init_timeout)
+        problems += check(role, report)
+        print(f"## {role}: import app {report['import_app_s']:.2f}s, "
+              f"RSS {report['rss_after_import_mb']:.0f} MB after import / {report['rss_mb']:.0f} MB after init")
+        print(f"   heavy modules loaded: {', '.join(report['heavy_loaded']) or 'none'}")
+        for entry in report["imports"]:
+            print(f"   {entry['module']:<24} {entry['feature']:<10} {entry['seconds']:6.2f}s  {entry['rss_mb']:+7.1f} MB")
+
+    if "core" not in args.roles:
+        problems.append("the core role was not checked")
+    for problem in problems:
+        print(f"❌ {problem}")
+    if problems:
+        sys.exit(1)
+    print("✅ Every role imports only its own features' modules")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""
+Quality and latency of the text classifier backends over service_intents.csv.
+
+Every backend is scored with stratified k-fold cross-validation (accuracy,
+macro-F1, fallback rate), then refit on the whole corpus and timed on
+single queries and batches. Each backend runs in its own subprocess so the
+reported model load time and peak RSS are its own.
+
+    similarity           /analyze's classifier: MiniLM embeddings, top-5 matches,
+                         0.55 threshold (INTENT_INDEX / INTENT_EMBEDDING_DTYPE apply)
+    similarity-centroid  the same rule against one mean embedding per category
+    tfidf-logreg         train_model.ipynb's TF-IDF + LogisticRegression (needs scikit-learn)
+
+"Fallback" is a query the decision rule could not place (the API answers
+general_contractor); "false general_contractor" counts every
+general_contractor answer for a query that belongs to another category.
+
+Usage:
+    python benchmarks/eval_classifier.py [--backends similarity tfidf-logreg] [--folds 5]
+        [--batch-size 32] [--queries 200] [--json classifier_eval.json] [--markdown classifier_eval.md]
+"""
+
+import os
+import re
+import csv
+import sys
+import json
+import time
+import argparse
+import resource
+import subprocess
+
+import numpy as np
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, MODEL_DIR)
+
+import ml_models
+import vector_index
+import embedding_store
+
+
+# -------------------------------
+# Backends
+# -------------------------------
+class SimilarityBackend:
+    """ml_models' nearest-intent rule over an IntentIndex built from the training fold."""
+
+    name = "similarity"
+
+    def load(self):
+        from sentence_transformers import SentenceTransformer
+        ml_models.model = SentenceTransformer(ml_models.MODEL_NAME)
+
+    def fit(self, texts: list, labels: list):
+        embeddings = embedding_store.build(ml_models.EMBEDDING_DTYPE, ml_models._embed(texts))
+        vectors = vector_index.build(ml_models.INDEX_KIND, embeddings, **ml_models.INDEX_PARAMS)
+        self.index = ml_models.IntentIndex(texts, labels, embeddings, vectors)
+
+    def predict(self, texts: list) -> list:
+        """[(category, fell_back)] for each text."""
+        predictions = []
+        for query_emb in ml_models._embed(texts):
+            category = ml_models.match_category(self.index, query_emb)
+            predictions.append((category or ml_models.FALLBACK_CATEGORY, category is None))
+        return predictions
+
+
+class CentroidBackend(SimilarityBackend):
+    """One unit-norm mean embedding per category instead of every intent row."""
+
+    name = "similarity-centroid"
+
+    def fit(self, texts: list, labels: list):
+        embeddings = ml_models._embed(texts)
+        self.categories = sorted(set(labels))
+        labels = np.array(labels)
+        centroids = np.stack([embeddings[labels == c].mean(axis=0) for c in self.categories])
+        self.centroids = centroids / np.linalg.norm(centroids, axis=1, keepdims=True)
+
+    def predict(self, texts: list) -> list:
+        scores = ml_models._embed(texts) @ self.centroids.T
+        best = scores.argmax(axis=1)
+        return [(self.categories[b], False) if s[b] >= ml_models.TEXT_THRESHOLD
+                else (ml_models.FALLBACK_CATEGORY, True) for b, s in zip(best, scores)]
+
+
+class TfidfLogRegBackend:
+    """The notebook model (train_model.ipynb): cleaned text, 1-2 gram TF-IDF, balanced LogisticRegression."""
+
+    name = "tfidf-logreg"
+
+    def load(self):
+        from sklearn.feature_extraction.text import TfidfVectorizer
+        from sklearn.linear_model import LogisticRegression
+        self.vectorizer_cls, self.model_cls = TfidfVectorizer, LogisticRegression
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        text = re.sub(r"[^a-z\s]", "", text.lower())
+        return re.sub(r"\s+", " ", text).strip()
+
+    def fit(self, texts: list, labels: list):
+        self.vectorizer = self.vectorizer_cls(ngram_range=(1, 2), max_df=0.9, min_df=2, sublinear_tf=True)
+        self.model = self.model_cls(max_iter=2000, class_weight="balanced", solver="lbfgs")
+        self.model.fit(self.vectorizer.fit_transform([self._clean(t) for t in texts]), labels)
+
+    def predict(self, texts: list) -> list:
+        labels = self.model.predict(self.vectorizer.transform([self._clean(t) for t in texts]))
+        return [(str(label), False) for label in labels]
+
+
+BACKENDS = {cls.name: cls for cls in (SimilarityBackend, CentroidBackend, TfidfLogRegBackend)}
+
+
+# -------------------------------
+# Data and metrics
+# -------------------------------
+def load_corpus(path: str) -> tuple[list, list]:
+    """Lowercased (texts, labels) with duplicate rows dropped, as the API and the notebook load them."""
+    rows = {}
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            if row.get("text") and row.get("category"):
+                rows.setdefault((row["text"].lower().strip(), row["category"].strip()), None)
+    return [t for t, _ in rows], [c for _, c in rows]
+
+
+def stratified_folds(labels: list, k: int, seed: int = 0) -> np.ndarray:
+    """Fold number per row; every category is spread round-robin over the folds after a shuffle."""
+    rng = np.random.default_rng(seed)
+    labels = np.array(labels)
+    folds = np.empty(len(labels), dtype=np.int64)
+    offset = 0
+    for category in sorted(set(labels)):
+        rows = rng.permutation(np.flatnonzero(labels == category))
+        folds[rows] = (offset + np.arange(len(rows))) % k
+        offset += len(rows)  # keeps small categories from all starting in fold 0
+    return folds
+
+
+def scores(truth: list, predictions: list) -> dict:
+    predicted = [p for p, _ in predictions]
+    f1s = []
+    for category in sorted(set(truth) | set(predicted)):
+        tp = sum(t == category and p == category for t, p in zip(truth, predicted))
+        fp = sum(t != category and p == category for t, p in zip(truth, predicted))
+        fn = sum(t == category and p != category for t, p in zip(truth, predicted))
+        f1s.append(2 * tp / (2 * tp + fp + fn) if tp else 0.0)
+    n = len(truth)
+    return {
+        "accuracy": sum(t == p for t, p in zip(truth, predicted)) / n,
+        "macro_f1": sum(f1s) / len(f1s),
+        "fallback_rate": sum(fell_back for _, fell_back in predictions) / n,
+        "false_general_contractor_rate": sum(
+            p == ml_models.FALLBACK_CATEGORY and t != ml_models.FALLBACK_CATEGORY
+            for t, p in zip(truth, predicted)) / n,
+    }
+
+
+def _percentile(samples: list, q: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+# -------------------------------
+# One backend (runs in a child process)
+# -------------------------------
+def evaluate(name: str, texts: list, labels: list, folds: int, batch_size: int, queries: int) -> dict:
+    backend = BACKENDS[name]()
+    started = time.perf_counter()
+    backend.load()
+    load_s = time.perf_counter() - started
+
+    fold_of = stratified_folds(labels, folds)
+    predictions = [None] * len(texts)
+    fold_accuracy = []
+    for fold in range(folds):
+        train = np.flatnonzero(fold_of != fold)
+        test = np.flatnonzero(fold_of == fold)
+        backend.fit([texts[i] for i in train], [labels[i] for i in train])
+        fold_predictions = backend.predict([texts[i] for i in test])
+        for i, p in zip(test, fold_predictions):
+            predictions[i] = p
+        fold_accuracy.append(float(np.mean([labels[i] == p for i, (p, _) in zip(test, fold_predictions)])))
+
+    # Latency of the model the service would run: trained on the whole corpus
+    started = time.perf_counter()
+    backend.fit(texts, labels)
+    fit_s = time.perf_counter() - started
+    sample = [texts[i] for i in np.random.default_rng(1).permutation(len(texts))[:queries]]
+    backend.predict(sample[:batch_size])  # warm-up
+    single = []
+    for text in sample:
+        started = time.perf_counter()
+        backend.predict([text])
+        single.append(time.perf_counter() - started)
+    batched = []
+    for start in range(0, len(sample), batch_size):
+        chunk = sample[start:start + batch_size]
+        started = time.perf_counter()
+        backend.predict(chunk)
+        batched.append((time.perf_counter() - started) / len(chunk))
+
+    return {
+        "backend": name,
+        **scores(labels, predictions),
+        "fold_accuracy": fold_accuracy,
+        "fold_accuracy_std": float(np.std(fold_accuracy)),
+        "single_p50_ms": _percentile(single, 0.5) * 1000,
+        "single_p99_ms": _percentile(single, 0.99) * 1000,
+        "batched_ms_per_query": float(np.mean(batched)) * 1000,
+        "load_s": load_s,
+        "fit_s": fit_s,
+        # ru_maxrss is reported in KiB on Linux
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def _run_child(name: str, args) -> dict:
+    command = [sys.executable, os.path.abspath(__file__), "--child", name, "--corpus", args.corpus,
+               "--folds", str(args.folds), "--batch-size", str(args.batch_size), "--queries", str(args.queries)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    lines = result.stdout.strip().splitlines()
+    if result.returncode != 0 or not lines:
+        error = (result.stderr.strip().splitlines() or ["exited with status %d" % result.returncode])[-1]
+        return {"backend": name, "error": error}
+    return json.loads(lines[-1])
+
+
+def markdown(results: list, corpus_rows: int, folds: int, batch_size: int) -> str:
+    lines = [
+        f"{corpus_rows} intents, stratified {folds}-fold, batch size {batch_size}",
+        "",
+        "| backend | accuracy | macro-F1 | fallback | false general_contractor | single p50 (ms) "
+        "| single p99 (ms) | batched (ms/query) | load (s) | peak RSS (MB) |",
+        "|---|---:|---:|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for r in results:
+        if "error" in r:
+            lines.append(f"| {r['backend']} | skipped: {r['error']} |" + " |" * 8)
+            continue
+        lines.append(
+            f"| {r['backend']} | {r['accuracy']:.3f} ± {r['fold_accuracy_std']:.3f} | {r['macro_f1']:.3f} "
+            f"| {r['fallback_rate']:.3f} | {r['false_general_contractor_rate']:.3f} | {r['single_p50_ms']:.2f} "
+            f"| {r['single_p99_ms']:.2f} | {r['batched_ms_per_query']:.3f} | {r['load_s']:.1f} "
+            f"| {r['peak_rss_mb']:.0f} |")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backends", nargs="+", choices=list(BACKENDS), default=list(BACKENDS))
+    parser.add_argument("--corpus", default=os.path.join(MODEL_DIR, ml_models.INTENTS_CSV))
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--queries", type=int, default=200, help="Corpus texts timed after the final fit")
+    parser.add_argument("--json", default="classifier_eval.json")
+    parser.add_argument("--markdown", default="classifier_eval.md")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    texts, labels = load_corpus(args.corpus)
+    if args.child:
+        print(json.dumps(evaluate(args.child, texts, labels, args.folds, args.batch_size, args.queries)))
+        return
+
+    results = []
+    for name in args.backends:
+        print(f"⚡ Evaluating {name}...", file=sys.stderr)
+        results.append(_run_child(name, args))
+
+    report = {"corpus": os.path.abspath(args.corpus), "rows": len(texts), "folds": args.folds,
+              "batch_size": args.batch_size, "index": ml_models.INDEX_KIND,
+              "embedding_dtype": ml_models.EMBEDDING_DTYPE, "results": results}
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
+    table = markdown(results, len(texts), args.folds, args.batch_size)
+    with open(args.markdown, "w") as f:
+        f.write(table)
+    print(table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Request-scoped Firestore document loader.
+
+Handlers and the helpers they call often read the same documents more
+than once, one at a time. The loader installed for each request (see the
+request_loader middleware in app.py) changes that in three ways:
+
+    dedupe     a document path is fetched at most once per request
+    coalesce   gets requested during the same event-loop tick go out as one
+               db.get_all round trip
+    memoize    later reads in the request get the first snapshot back
+
+The memo is a snapshot of the document as it was first read. A handler
+that writes a document and then needs the new state must `forget` it first.
+
+    doc = doc_loader.load(ref)                        # sync helpers, any thread
+    a, b = await doc_loader.load_many([ref_a, ref_b])  # async handlers
+
+Without a loader (DOC_LOADER=0, or outside a request) both fall back to
+plain per-document gets.
+"""
+
+import asyncio
+import threading
+import contextvars
+
+import metrics
+
+DOCS_FETCHED = metrics.Counter(
+    "servus_doc_loader_documents_total", "Documents requested through the loader by result (fetched / memoized)")
+ROUND_TRIPS = metrics.Counter(
+    "servus_doc_loader_round_trips_total", "Firestore round trips issued by request-scoped loaders")
+
+_current = contextvars.ContextVar("doc_loader", default=None)
+
+
+class DocumentLoader:
+    def __init__(self, db, loop: asyncio.AbstractEventLoop = None):
+        self.db = db
+        self.loop = loop or asyncio.get_running_loop()
+        self.fetched = 0       # documents read from Firestore
+        self.round_trips = 0
+        self._futures = {}     # document path → future of its snapshot
+        self._pending = {}     # document path → reference waiting for the next batch
+        self._lock = threading.Lock()
+
+    async def get(self, ref):
+        with self._lock:
+            future = self._futures.get(ref.path)
+            if future is None:
+                future = self._futures[ref.path] = self.loop.create_future()
+                if not self._pending:
+                    self.loop.call_soon(self._dispatch)
+                self._pending[ref.path] = ref
+            else:
+                DOCS_FETCHED.inc(result="memoized")
+        return await future
+
+    async def get_many(self, refs: list) -> list:
+        return list(await asyncio.gather(*(self.get(ref) for ref in refs)))
+
+    def get_sync(self, ref):
+        """Snapshot for `ref` from a synchronous caller (a worker thread or code running on the loop)."""
+        with self._lock:
+            future = self._futures.get(ref.path)
+        if future is not None and future.done():
+            DOCS_FETCHED.inc(result="memoized")
+            return future.result()
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if not on_loop:
+            return asyncio.run_coroutine_threadsafe(self.get(ref), self.loop).result()
+        # Blocking code on the loop thread cannot wait for a batch; read directly and remember it
+        snapshot = ref.get()
+        self._count(1)
+        with self._lock:
+            future = self._futures.get(ref.path)
+            if future is None or not future.done():
+                memo = self.loop.create_future()
+                memo.set_result(snapshot)
+                self._futures[ref.path] = memo
+        return snapshot
+
+    def forget(self, ref):
+        with self._lock:
+            self._futures.pop(ref.path, None)
+
+    def _count(self, documents: int):
+        self.fetched += documents
+        self.round_trips += 1
+        DOCS_FETCHED.inc(documents, result="fetched")
+        ROUND_TRIPS.inc()
+
+    def _dispatch(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        futures = {path: self._futures[path] for path in pending}
+        self.loop.create_task(self._fetch(list(pending.values()), futures))
+
+    async def _fetch(self, refs: list, futures: dict):
+        try:
+            snapshots = await asyncio.to_thread(lambda: list(self.db.get_all(refs)))
+        except Exception as e:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self._count(len(refs))
+        # get_all does not keep the order of `refs`
+        for snapshot in snapshots:
+            future = futures.get(snapshot.reference.path)
+            if future is not None and not future.done():
+                future.set_result(snapshot)
+        for path, future in futures.items():
+            if not future.done():
+                future.set_exception(LookupError(f"get_all returned nothing for {path}"))
+
+
+def current():
+    return _current.get()
+
+
+def use(loader):
+    """Install `loader` for the current context; returns the token for `reset`."""
+    return _current.set(loader)
+
+
+def reset(token):
+    _current.reset(token)
+
+
+def load(ref):
+    loader = _current.get()
+    return ref.get() if loader is None else loader.get_sync(ref)
+
+
+async def load_many(refs: list) -> list:
+    loader = _current.get()
+    if loader is None:
+        return await asyncio.to_thread(lambda: [ref.get() for ref in refs])
+    return await loader.get_many(refs)
+
+
+def forget(ref):
+    loader = _current.get()
+    if loader is not None:
+        loader.forget(ref)
@@ -0,0 +1,143 @@
+"""
+Compact storage for the intent embedding matrix.
+
+    float32  the unit-norm MiniLM vectors as produced (4 bytes / dim)
+    float16  half precision (2 bytes / dim)
+    int8     symmetric per-row quantization, codes * scale ≈ vector
+             (1 byte / dim + 4 bytes / row)
+
+Every store behaves like a read-only float32 matrix where the intent code
+touches it: `store @ query` scores all rows, and `store[rows]` returns
+dequantized float32 rows. Scoring walks the matrix in blocks so a compact
+store never materializes a full float32 copy; int8 scores are computed on
+the codes and scaled per row afterwards.
+
+Stores are immutable; `appended` and `subset` return new stores.
+"""
+
+import numpy as np
+
+BLOCK_ROWS = 8192
+
+
+class Float32Store:
+    dtype_name = "float32"
+
+    def __init__(self, matrix: np.ndarray):
+        self.matrix = matrix
+
+    @classmethod
+    def quantize(cls, matrix: np.ndarray):
+        return cls(np.ascontiguousarray(matrix, dtype=np.float32))
+
+    def __len__(self) -> int:
+        return len(self.matrix)
+
+    @property
+    def shape(self) -> tuple:
+        return self.matrix.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.matrix.nbytes
+
+    def __getitem__(self, rows) -> np.ndarray:
+        return self.matrix[rows].astype(np.float32, copy=False)
+
+    def __matmul__(self, query: np.ndarray) -> np.ndarray:
+        return self.matrix @ query
+
+    def appended(self, matrix: np.ndarray):
+        return type(self)(np.concatenate([self.matrix, self.quantize(matrix).matrix]))
+
+    def subset(self, rows: np.ndarray):
+        return type(self)(self.matrix[rows])
+
+    def arrays(self) -> dict:
+        return {"embeddings": self.matrix}
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "Float32Store":
+        return cls(np.asarray(arrays["embeddings"], dtype=cls.dtype_name))
+
+
+class Float16Store(Float32Store):
+    dtype_name = "float16"
+
+    @classmethod
+    def quantize(cls, matrix: np.ndarray):
+        return cls(np.ascontiguousarray(matrix, dtype=np.float16))
+
+    def __matmul__(self, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(self.matrix), dtype=np.float32)
+        for start in range(0, len(self.matrix), BLOCK_ROWS):
+            block = self.matrix[start:start + BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        return scores
+
+
+class Int8Store:
+    dtype_name = "int8"
+
+    def __init__(self, codes: np.ndarray, scales: np.ndarray):
+        self.codes = codes
+        self.scales = scales
+
+    @classmethod
+    def quantize(cls, matrix: np.ndarray):
+        matrix = np.asarray(matrix, dtype=np.float32)
+        scales = (np.abs(matrix).max(axis=1) / 127.0).clip(min=1e-12).astype(np.float32)
+        codes = np.rint(matrix / scales[:, None]).clip(-127, 127).astype(np.int8)
+        return cls(codes, scales)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @property
+    def shape(self) -> tuple:
+        return self.codes.shape
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + self.scales.nbytes
+
+    def __getitem__(self, rows) -> np.ndarray:
+        scales = self.scales[rows]
+        return self.codes[rows].astype(np.float32) * np.expand_dims(scales, -1)
+
+    def __matmul__(self, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(self.codes), dtype=np.float32)
+        for start in range(0, len(self.codes), BLOCK_ROWS):
+            block = self.codes[start:start + BLOCK_ROWS]
+            scores[start:start + len(block)] = block.astype(np.float32) @ query
+        scores *= self.scales
+        return scores
+
+    def appended(self, matrix: np.ndarray):
+        extra = self.quantize(matrix)
+        return Int8Store(np.concatenate([self.codes, extra.codes]), np.concatenate([self.scales, extra.scales]))
+
+    def subset(self, rows: np.ndarray):
+        return Int8Store(self.codes[rows], self.scales[rows])
+
+    def arrays(self) -> dict:
+        return {"codes": self.codes, "scales": self.scales}
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "Int8Store":
+        return cls(np.asarray(arrays["codes"], dtype=np.int8), np.asarray(arrays["scales"], dtype=np.float32))
+
+
+STORES = {cls.dtype_name: cls for cls in (Float32Store, Float16Store, Int8Store)}
+
+
+def build(dtype: str, matrix: np.ndarray):
+    if dtype not in STORES:
+        raise ValueError(f"Unknown embedding dtype: {dtype} (expected one of {', '.join(STORES)})")
+    return STORES[dtype].quantize(matrix)
+
+
+def from_arrays(arrays):
+    """Store saved via `arrays()` (plus a "dtype" entry; caches without one are float32)."""
+    dtype = str(arrays["dtype"]) if "dtype" in arrays else "float32"
+    return STORES[dtype].from_arrays(arrays)
@@ -0,0 +1,174 @@
+"""
+Fast JSON responses and negotiated compression for large worker payloads.
+
+FastJSONResponse serializes with orjson (falling back to the stdlib) and
+handles Firestore values natively: DatetimeWithNanoseconds and other
+datetime subclasses become ISO-8601 strings, GeoPoints become
+{"latitude", "longitude"} objects. Returning one directly from an endpoint
+skips FastAPI's jsonable_encoder pass.
+"""
+
+import json
+import gzip
+import datetime
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is in requirements.txt
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+    # google.cloud.firestore GeoPoint, matched by shape to avoid importing firestore here
+    if hasattr(obj, "latitude") and hasattr(obj, "longitude"):
+        return {"latitude": obj.latitude, "longitude": obj.longitude}
+    if hasattr(obj, "tolist"):  # NumPy scalars and arrays
+        return obj.tolist()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode("utf-8", errors="replace")
+    return str(obj)
+
+
+def dumps(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def parse_fields(fields: str):
+    """Split a `fields=` query parameter into a set, or None to keep everything."""
+    if not fields:
+        return None
+    selected = {f.strip() for f in fields.split(",") if f.strip()}
+    return selected or None
+
+
+def project(items: list, fields: set) -> list:
+    """Keep only `fields` (plus `id`) of each document."""
+    if not fields:
+        return items
+    keep = fields | {"id"}
+    return [{k: v for k, v in item.items() if k in keep} for item in items]
+
+
+# -------------------------------
+# Negotiated compression
+# -------------------------------
+def _accepted_encodings(header: str) -> dict:
+    accepted = {}
+    for part in header.split(","):
+        token, _, params = part.strip().partition(";")
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[token.strip().lower()] = q
+    return accepted
+
+
+def choose_encoding(accept_encoding: str):
+    accepted = _accepted_encodings(accept_encoding or "")
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=4)
+    return gzip.compress(body, compresslevel=5)
+
+
+def _vary_accept_encoding(headers: list) -> list:
+    """`headers` with Accept-Encoding added to their Vary."""
+    vary = [v for k, v in headers if k.lower() == b"vary"]
+    kept = [(k, v) for k, v in headers if k.lower() != b"vary"]
+    if not any(b"accept-encoding" in v.lower() for v in vary):
+        vary.append(b"Accept-Encoding")
+    return kept + [(b"vary", b", ".join(vary))]
+
+
+class CompressionMiddleware:
+    """Compress complete responses above `minimum_size` with br or gzip, per Accept-Encoding.
+
+    Streaming responses (SSE and anything sent in several chunks) and bodies
+    that already carry a Content-Encoding pass through untouched. Every other
+    response carries `Vary: Accept-Encoding`, compressed or not, so a shared
+    cache never hands one client's encoding to another.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        encoding = choose_encoding(headers.get(b"accept-encoding", b"").decode("latin-1"))
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                response_headers = {k.lower(): v for k, v in message.get("headers", [])}
+                if b"content-encoding" in response_headers or \
+                        response_headers.get(b"content-type", b"").startswith(b"text/event-stream"):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = {**message, "headers": _vary_accept_encoding(message.get("headers", []))}
+                if encoding is None:
+                    passthrough = True
+                    await send(start_message)
+                return
+
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            if message.get("more_body", False) or len(body) < self.minimum_size:
+                # Multi-chunk or small body — send as is
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = compress(body, encoding)
+            response_headers = [(k, v) for k, v in start_message["headers"] if k.lower() != b"content-length"]
+            response_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(compressed)).encode()),
+            ]
+            await send({**start_message, "headers": response_headers})
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,119 @@
+"""
+Deployment roles: which optional subsystems this process imports and starts.
+
+    SERVUS_FEATURES=all               every feature (default)
+    SERVUS_FEATURES=text_ml,gemini    any comma-separated subset
+    SERVUS_FEATURES=core              none: only the Firestore-backed API
+
+    text_ml     MiniLM text classifier (/analyze, /analyze/stream, /admin/intents, /workers/search)
+    image_ml    Keras image classifier (/analyze-image)
+    blockchain  web3 + Merkle-anchored Aadhaar verification (/worker/{id}/verify-aadhaar)
+    gemini      Gemini quick fixes and review summaries (static fallback text without it)
+
+A disabled feature's modules are never imported; its endpoints answer 501.
+Modules are imported through `load`, which records each first import's
+wall time and resident-memory growth for the startup report.
+"""
+
+import os
+import sys
+import time
+import resource
+import importlib
+
+import metrics
+
+FEATURES = ("text_ml", "image_ml", "blockchain", "gemini")
+
+# Heavy third-party modules behind each feature, imported in this order so the
+# report attributes shared dependencies (numpy, torch) to the module that pulls them in first
+MODULES = {
+    "core": ("firebase_admin", "firebase_admin.firestore"),
+    "text_ml": ("numpy", "pandas", "torch", "sentence_transformers"),
+    "image_ml": ("numpy", "cv2", "tensorflow", "keras"),
+    "blockchain": ("web3",),
+    "gemini": ("google.generativeai",),
+}
+
+
+class FeatureDisabled(RuntimeError):
+    def __init__(self, feature: str):
+        super().__init__(f"The {feature} feature is disabled on this instance (SERVUS_FEATURES={_setting()})")
+        self.feature = feature
+
+
+def _setting() -> str:
+    return os.getenv("SERVUS_FEATURES", "all")
+
+
+def _parse(setting: str) -> frozenset:
+    names = {name.strip() for name in setting.split(",") if name.strip()}
+    if "all" in names:
+        return frozenset(FEATURES)
+    unknown = names - set(FEATURES) - {"core"}
+    if unknown:
+        raise ValueError(f"Unknown SERVUS_FEATURES entries: {', '.join(sorted(unknown))} "
+                         f"(expected all, core or any of {', '.join(FEATURES)})")
+    return frozenset(names & set(FEATURES))
+
+
+enabled = _parse(_setting())
+_imports = []  # (module, feature, seconds, rss growth in MB), first import only
+
+IMPORT_SECONDS = metrics.Gauge(
+    "servus_import_seconds", "Wall time of each heavy module's first import",
+    fn=lambda: [({"module": m, "feature": f}, round(s, 3)) for m, f, s, _ in _imports])
+IMPORT_RSS = metrics.Gauge(
+    "servus_import_rss_megabytes", "Resident memory growth during each heavy module's first import",
+    fn=lambda: [({"module": m, "feature": f}, round(r, 1)) for m, f, _, r in _imports])
+
+
+def is_enabled(feature: str) -> bool:
+    return feature in enabled
+
+
+def require(feature: str):
+    if feature not in enabled:
+        raise FeatureDisabled(feature)
+
+
+def rss_mb() -> float:
+    """Current resident set size (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def load(module: str, feature: str = None):
+    """Import `module` for `feature` (None: always allowed), timing its first import."""
+    if feature is not None:
+        require(feature)
+    if module in sys.modules:
+        return sys.modules[module]
+    rss_before, started = rss_mb(), time.perf_counter()
+    loaded = importlib.import_module(module)
+    _imports.append((module, feature or "core", time.perf_counter() - started, rss_mb() - rss_before))
+    return loaded
+
+
+def preload(feature: str):
+    """Import every heavy module behind `feature` up front, so its init and the report see them."""
+    for module in MODULES[feature]:
+        load(module, None if feature == "core" else feature)
+
+
+def report() -> dict:
+    return {
+        "features": sorted(enabled),
+        "rss_mb": round(rss_mb(), 1),
+        "imports": [{"module": m, "feature": f, "seconds": round(s, 3), "rss_mb": round(r, 1)}
+                    for m, f, s, r in _imports],
+    }
+
+
+def print_report():
+    print(f"📦 Features: {', '.join(sorted(enabled)) or 'core only'} — RSS {rss_mb():.0f} MB")
+    for module, feature, seconds, rss in _imports:
+        print(f"   {module:<24} {feature:<10} {seconds:6.2f}s  {rss:+7.1f} MB")
@@ -0,0 +1,31 @@
+"""
+Firebase initialisation shared by the API and the maintenance CLIs.
+"""
+
+import os
+import json
+
+
+def init_firestore():
+    """Initialise firebase_admin once and return (firestore module, client)."""
+    import firebase_admin
+    from firebase_admin import credentials
+    from firebase_admin import firestore
+
+    if not firebase_admin._apps:
+        service_account_json = os.getenv("FIREBASE_SERVICE_ACCOUNT_JSON")
+        service_account_path = os.getenv("FIREBASE_SERVICE_ACCOUNT", "serviceAccountKey.json")
+
+        if service_account_json:
+            cred = credentials.Certificate(json.loads(service_account_json))
+            firebase_admin.initialize_app(cred)
+            print("✅ Firebase initialized with service account from env var")
+        elif os.path.exists(service_account_path):
+            cred = credentials.Certificate(service_account_path)
+            firebase_admin.initialize_app(cred)
+            print("✅ Firebase initialized with service account file")
+        else:
+            firebase_admin.initialize_app()
+            print("⚠️ Firebase initialized without service account")
+
+    return firestore, firestore.client()
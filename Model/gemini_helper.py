@@ -0,0 +1,273 @@
+"""
+Gemini client wrapper: singleflight coalescing, token-bucket rate limiting,
+per-call deadlines and a circuit breaker.
+
+Every call takes the static fallback text the caller would have used on
+error; the fallback is returned whenever Gemini is rate limited, slower
+than the deadline, failing, or skipped because the breaker is open.
+Nothing here sleeps: a call over the rate limit gets the fallback at once,
+and only waiting for Gemini itself blocks the calling thread (callers on
+the event loop run these via asyncio.to_thread). Each call reports to the
+breaker once, whether it finishes, fails or misses its deadline first.
+
+A call that misses its deadline keeps its executor thread until Gemini
+answers, so when all `max_concurrency` threads are still busy a new call
+gets the fallback at once rather than queueing behind them.
+"""
+
+import time
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import metrics
+
+GEMINI_CALLS = metrics.Counter(
+    "servus_gemini_calls_total", "Gemini calls by outcome (ok, coalesced, timeout, error, rate_limited, circuit_open, saturated)")
+GEMINI_LATENCY = metrics.Histogram(
+    "servus_gemini_latency_seconds", "Latency of Gemini calls that returned in time")
+
+
+class TokenBucket:
+    """Refill `rate` tokens per second up to `burst`; never blocks."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Take a token if one is available right now."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens < 1:
+                return False
+            self.tokens -= 1
+            return True
+
+
+class CircuitBreaker:
+    """Open after `threshold` consecutive failures; allow one trial call after `cooldown` seconds."""
+
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.cooldown or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True  # half-open
+            return True
+
+    def release(self):
+        """Give up an allowed call that never reached Gemini, so the next caller can be the trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.threshold:
+                if self.opened_at is None:
+                    print(f"⚠️ Gemini circuit open for {self.cooldown:g}s after {self.failures} failures")
+                self.opened_at = time.monotonic()
+
+    def outcome(self) -> "_Outcome":
+        """Reporter for one allowed call; only its first success or failure counts."""
+        return _Outcome(self)
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if time.monotonic() - self.opened_at < self.cooldown else "half_open"
+
+
+class _Outcome:
+    """One call's verdict for the breaker: a late result after a deadline miss is not counted again."""
+
+    __slots__ = ("_breaker", "_reported", "_lock")
+
+    def __init__(self, breaker: CircuitBreaker):
+        self._breaker = breaker
+        self._reported = False
+        self._lock = threading.Lock()
+
+    def _claim(self) -> bool:
+        with self._lock:
+            first = not self._reported
+            self._reported = True
+            return first
+
+    def success(self):
+        if self._claim():
+            self._breaker.success()
+
+    def failure(self):
+        if self._claim():
+            self._breaker.failure()
+
+
+class GeminiClient:
+    def __init__(self, model, rate_per_minute: float = 300, burst: int = 20, deadline: float = 8.0,
+                 max_concurrency: int = 8, failure_threshold: int = 5, cooldown: float = 60.0):
+        self.model = model
+        self.deadline = deadline
+        self.bucket = TokenBucket(rate_per_minute / 60.0, burst)
+        self.breaker = CircuitBreaker(failure_threshold, cooldown)
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="gemini")
+        self._threads = threading.BoundedSemaphore(max_concurrency)  # held until the Gemini call returns
+        self._in_flight = {}  # prompt → Future shared by every caller asking the same thing
+        self._lock = threading.Lock()
+
+    def _admit(self) -> bool:
+        """Take a breaker pass, a free executor thread and a rate token, or count why not."""
+        if not self.breaker.allow():
+            GEMINI_CALLS.inc(outcome="circuit_open")
+            return False
+        if not self._threads.acquire(blocking=False):
+            self.breaker.release()
+            GEMINI_CALLS.inc(outcome="saturated")
+            return False
+        if not self.bucket.acquire():
+            self._threads.release()
+            self.breaker.release()
+            GEMINI_CALLS.inc(outcome="rate_limited")
+            return False
+        return True
+
+    def _call(self, prompt: str, outcome: _Outcome) -> str:
+        started = time.perf_counter()
+        try:
+            text = self.model.generate_content(prompt).text.strip()
+        except Exception:
+            outcome.failure()
+            raise
+        finally:
+            self._threads.release()
+        outcome.success()
+        GEMINI_LATENCY.observe(time.perf_counter() - started)
+        return text
+
+    def generate(self, prompt: str, fallback: str) -> str:
+        """Gemini's answer for `prompt`, or `fallback` within the deadline."""
+        deadline_at = time.monotonic() + self.deadline
+
+        outcome = None
+        with self._lock:
+            future = self._in_flight.get(prompt)
+            coalesced = future is not None
+        if coalesced:
+            GEMINI_CALLS.inc(outcome="coalesced")
+        else:
+            if not self._admit():
+                return fallback
+            with self._lock:
+                # Another caller may have started the same prompt since we looked
+                future = self._in_flight.get(prompt)
+                started = future is None
+                if started:
+                    outcome = self.breaker.outcome()
+                    future = self._executor.submit(self._call, prompt, outcome)
+                    self._in_flight[prompt] = future
+            if not started:
+                # Joining that call instead: hand back what _admit took
+                self._threads.release()
+                self.breaker.release()
+            if started:
+                # Outside the lock: the callback runs inline if the call already finished
+                future.add_done_callback(lambda f, p=prompt: self._forget(p, f))
+
+        try:
+            text = future.result(timeout=max(0.0, deadline_at - time.monotonic()))
+            if not coalesced:
+                GEMINI_CALLS.inc(outcome="ok")
+            return text
+        except FutureTimeout:
+            GEMINI_CALLS.inc(outcome="timeout")
+            print(f"⚠️ Gemini call exceeded {self.deadline:g}s deadline, using fallback")
+            if outcome is not None:
+                outcome.failure()
+            return fallback
+        except Exception as e:
+            GEMINI_CALLS.inc(outcome="error")
+            print("❌ Gemini Error:", e)
+            return fallback
+
+    def _forget(self, prompt: str, future):
+        with self._lock:
+            if self._in_flight.get(prompt) is future:
+                del self._in_flight[prompt]
+
+    def stream(self, prompt: str, fallback: str):
+        """Yield Gemini's answer chunk by chunk; yields `fallback` if nothing arrives in time.
+
+        The deadline bounds the wait for each chunk, not the whole answer.
+        Unlike generate, identical prompts are not coalesced: each stream is
+        one consumer draining its own chunk queue, and the streamed prompts
+        (free-text quick-fix questions) almost never repeat while in flight.
+        """
+        if not self._admit():
+            yield fallback
+            return
+
+        outcome = self.breaker.outcome()
+        chunks = queue.Queue()
+        done = object()
+
+        def produce():
+            try:
+                for chunk in self.model.generate_content(prompt, stream=True):
+                    if chunk.text:
+                        chunks.put(chunk.text)
+                outcome.success()
+            except Exception as e:
+                outcome.failure()
+                chunks.put(e)
+            finally:
+                self._threads.release()
+                chunks.put(done)
+
+        started = time.perf_counter()
+        self._executor.submit(produce)
+        sent_any = False
+        while True:
+            try:
+                item = chunks.get(timeout=self.deadline)
+            except queue.Empty:
+                GEMINI_CALLS.inc(outcome="timeout")
+                print(f"⚠️ Gemini stream stalled for {self.deadline:g}s")
+                outcome.failure()
+                if not sent_any:
+                    yield fallback
+                return
+            if item is done:
+                GEMINI_CALLS.inc(outcome="ok")
+                GEMINI_LATENCY.observe(time.perf_counter() - started)
+                return
+            if isinstance(item, Exception):
+                GEMINI_CALLS.inc(outcome="error")
+                print("❌ Gemini stream error:", item)
+                if not sent_any:
+                    yield fallback
+                return
+            sent_any = True
+            yield item
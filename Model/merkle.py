@@ -0,0 +1,166 @@
+"""
+Merkle batching for on-chain verification anchors.
+
+Verification hashes accumulate in a batch that is flushed on a size or time
+window; only the batch's Merkle root is sent on-chain. Each leaf keeps an
+inclusion proof so it can be checked against the anchored root offline.
+
+Leaves and nodes are domain-separated (0x00 / 0x01 prefixes) and an odd node
+at the end of a level is paired with itself.
+"""
+
+import time
+import uuid
+import hashlib
+import threading
+
+
+def _h(data: bytes) -> bytes:
+    return hashlib.sha256(data).digest()
+
+
+def leaf_hash(verification_hash: str) -> bytes:
+    """Hash a hex verification hash into a Merkle leaf."""
+    return _h(b"\x00" + bytes.fromhex(verification_hash))
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    return _h(b"\x01" + left + right)
+
+
+def build_tree(leaves: list) -> list:
+    """Return every level of the tree, leaves first and the root level last."""
+    if not leaves:
+        raise ValueError("Cannot build a Merkle tree with no leaves")
+    levels = [list(leaves)]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        parents = []
+        for i in range(0, len(level), 2):
+            right = level[i + 1] if i + 1 < len(level) else level[i]
+            parents.append(node_hash(level[i], right))
+        levels.append(parents)
+    return levels
+
+
+def merkle_proof(levels: list, index: int) -> list:
+    """Inclusion proof for leaf `index`: sibling hashes from the leaf up, each with its side."""
+    proof = []
+    for level in levels[:-1]:
+        sibling = index ^ 1
+        if sibling >= len(level):
+            sibling = index
+        proof.append({
+            "hash": level[sibling].hex(),
+            "position": "left" if sibling < index else "right",
+        })
+        index //= 2
+    return proof
+
+
+def verify_proof(verification_hash: str, proof: list, root: str) -> bool:
+    """Recompute the root from a leaf and its proof and compare with `root` (hex)."""
+    try:
+        node = leaf_hash(verification_hash)
+        for step in proof:
+            sibling = bytes.fromhex(step["hash"])
+            if step["position"] == "left":
+                node = node_hash(sibling, node)
+            else:
+                node = node_hash(node, sibling)
+        return node.hex() == root.lower().removeprefix("0x")
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return False
+
+
+class MerkleBatch:
+    """A flushed batch: its root, per-leaf proofs and the anchoring transaction."""
+
+    def __init__(self, batch_id: str, items: list):
+        self.id = batch_id
+        self.items = items            # [{'key': ..., 'verification_hash': ..., ...}]
+        levels = build_tree([leaf_hash(item["verification_hash"]) for item in items])
+        self.root = levels[-1][0].hex()
+        self.proofs = [merkle_proof(levels, i) for i in range(len(items))]
+        self.job_id = None
+        self.created_at = time.time()
+
+
+class MerkleBatcher:
+    """Accumulate verification hashes and anchor each batch's root through `anchor_fn`.
+
+    `anchor_fn(batch)` is called on the flush thread and should return an id
+    that can be used to track the anchoring transaction. If it raises,
+    `on_error(batch, exc)` is called instead.
+    """
+
+    def __init__(self, anchor_fn, max_batch: int = 256, max_wait: float = 60.0, on_error=None):
+        self.anchor_fn = anchor_fn
+        self.on_error = on_error
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._lock = threading.Condition()
+        self._pending = []
+        self._oldest = None
+        self._started = False
+
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        threading.Thread(target=self._flush_loop, name="merkle-batcher", daemon=True).start()
+        print(f"✅ Merkle batcher started (batch ≤ {self.max_batch}, window {self.max_wait:.0f}s)")
+
+    def add(self, key: str, verification_hash: str, **extra):
+        """Queue one verification hash; it is anchored with the next flush."""
+        with self._lock:
+            self._pending.append({"key": key, "verification_hash": verification_hash, **extra})
+            if self._oldest is None:
+                # First item into an empty queue starts the window; wake the
+                # flush thread so it stops waiting without a timeout.
+                self._oldest = time.time()
+                self._lock.notify()
+            elif len(self._pending) >= self.max_batch:
+                self._lock.notify()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Anchor whatever is pending right now."""
+        with self._lock:
+            items = self._take()
+        if items:
+            self._anchor(items)
+
+    def _take(self) -> list:
+        items, self._pending, self._oldest = self._pending, [], None
+        return items
+
+    def _flush_loop(self):
+        while True:
+            with self._lock:
+                while True:
+                    if len(self._pending) >= self.max_batch:
+                        break
+                    if self._oldest is not None:
+                        remaining = self._oldest + self.max_wait - time.time()
+                        if remaining <= 0:
+                            break
+                        self._lock.wait(remaining)
+                    else:
+                        self._lock.wait()
+                items = self._take()
+            self._anchor(items)
+
+    def _anchor(self, items: list):
+        for start in range(0, len(items), self.max_batch):
+            batch = MerkleBatch(uuid.uuid4().hex, items[start:start + self.max_batch])
+            try:
+                batch.job_id = self.anchor_fn(batch)
+                print(f"✅ Anchoring Merkle root {batch.root} for {len(batch.items)} verifications")
+            except Exception as e:
+                print(f"❌ Failed to anchor Merkle batch {batch.id}: {e}")
+                if self.on_error:
+                    self.on_error(batch, e)
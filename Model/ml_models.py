@@ -0,0 +1,531 @@
+"""
+Text and image classifiers behind /analyze and /analyze-image.
+
+Loaded either inside the API process or, in multi-process deployments, once
+in the shared model server (model_server.py) that API workers call over a
+Unix socket.
+"""
+
+import os
+import json
+import time
+import uuid
+import base64
+import threading
+
+import numpy as np
+
+import vector_index
+import embedding_store
+
+# -------------------------------
+# Model state (loaded by load_text_model / load_image_model)
+# -------------------------------
+model = None
+intents = None          # current IntentIndex; swapped wholesale, never mutated
+_image_model = None
+_intents_lock = threading.Lock()  # serializes corpus writers; readers never take it
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+INTENTS_CSV = "service_intents.csv"
+EMBEDDING_CACHE = os.getenv("INTENT_EMBEDDING_CACHE", "intent_embeddings.npz")
+# float32 | float16 | int8 (see embedding_store.py)
+EMBEDDING_DTYPE = os.getenv("INTENT_EMBEDDING_DTYPE", "float32")
+
+# Nearest-neighbour backend over the intent matrix (see vector_index.py)
+INDEX_KIND = os.getenv("INTENT_INDEX", "exact")
+INDEX_PARAMS = json.loads(os.getenv("INTENT_INDEX_PARAMS", "{}"))
+INDEX_PATH = os.getenv("INTENT_INDEX_PATH", "intent_index.npz")
+
+# Runtime corpus updates are appended to a delta log (one small file per change) on
+# top of the corpus file, embedding cache and vector index, which are only rewritten in
+# full (compacted) once the log holds INTENT_LOG_MAX_OPS changes or half as many rows as the base
+EMBEDDING_LOG = os.getenv("INTENT_EMBEDDING_LOG", EMBEDDING_CACHE + ".log")
+LOG_MAX_OPS = int(os.getenv("INTENT_LOG_MAX_OPS", "64"))
+_log = {"generation": None, "ops": 0, "rows": 0, "base_rows": 0}
+
+CLASS_NAMES = [
+    "ac_technician", "appliance_repair", "automobile_mechanic", "carpenter",
+    "cleaning", "computer_repair", "electrician", "gas_technician",
+    "general_contractor", "glazier", "home_automation", "locksmith",
+    "mobile_repair", "painter", "pest_control", "plumber",
+    "solar_technician", "specialized_services", "welder"
+]
+_CLASS_INDEX = {name: i for i, name in enumerate(CLASS_NAMES)}
+
+# Text classifier decision rule: the best of the top-k intent matches wins if it
+# clears the threshold, otherwise the query falls back to a general contractor
+TEXT_TOP_K = 5
+TEXT_THRESHOLD = 0.55
+FALLBACK_CATEGORY = "general_contractor"
+
+
+# -------------------------------
+# Image preprocessing
+#
+# Decode → resize → ResNet50 caffe-mode normalization (BGR, minus ImageNet
+# mean) fused into one pass that writes straight into a reused float32
+# input buffer. OpenCV already decodes to BGR and resizes each channel
+# independently, so no colour conversion is needed.
+# -------------------------------
+IMAGE_SIZE = 224
+_MEAN_BGR = np.array([103.939, 116.779, 123.68], dtype=np.float32)
+_thread_buffers = threading.local()  # per-thread resize scratch + input buffer
+
+
+def _scratch() -> np.ndarray:
+    scratch = getattr(_thread_buffers, "resized", None)
+    if scratch is None:
+        scratch = _thread_buffers.resized = np.empty((IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.uint8)
+    return scratch
+
+
+def preprocess_into(image_bytes: bytes, out: np.ndarray) -> np.ndarray:
+    """Decode, resize and normalize one image into `out` (224, 224, 3) float32."""
+    import cv2  # image-only dependency; text-only roles never load OpenCV
+    img = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Could not decode image")
+    resized = cv2.resize(img, (IMAGE_SIZE, IMAGE_SIZE), dst=_scratch())
+    np.subtract(resized, _MEAN_BGR, out=out)
+    return out
+
+
+def preprocess_image(image_bytes: bytes) -> np.ndarray:
+    """Model input (1, 224, 224, 3) in this thread's reused buffer — valid until the thread's next call."""
+    buffer = getattr(_thread_buffers, "single", None)
+    if buffer is None:
+        buffer = _thread_buffers.single = np.empty((1, IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32)
+    preprocess_into(image_bytes, buffer[0])
+    return buffer
+
+
+class IntentIndex:
+    """Immutable snapshot of the intent corpus: row texts, categories, embedding store and its vector index.
+
+    `texts` are the lowercased keys that are embedded and matched; `originals`
+    holds each row as written in the corpus file, which is what gets saved back.
+    """
+
+    def __init__(self, texts: list, categories: list, embeddings, vectors, originals: list = None):
+        self.texts = texts
+        self.originals = originals if originals is not None else list(texts)
+        self.categories = categories
+        self.embeddings = embeddings
+        self.vectors = vectors
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    def search(self, query_emb: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k cosine scores and row indices, best first."""
+        return self.vectors.search(query_emb, k)
+
+
+def _embed(texts: list) -> np.ndarray:
+    """Unit-norm float32 MiniLM embeddings (dot product == cosine similarity)."""
+    if not texts:
+        return np.zeros((0, model.get_sentence_embedding_dimension()), dtype=np.float32)
+    return np.asarray(model.encode(list(texts), convert_to_numpy=True, normalize_embeddings=True), dtype=np.float32)
+
+
+def _load_embedding_cache() -> tuple[list, object, str]:
+    """(texts, store, generation) from the embedding cache, or ([], None, None)."""
+    if not os.path.exists(EMBEDDING_CACHE):
+        return [], None, None
+    try:
+        cache = np.load(EMBEDDING_CACHE, allow_pickle=False)
+        if str(cache["model_name"]) != MODEL_NAME:
+            return [], None, None
+        generation = str(cache["generation"]) if "generation" in cache else None
+        return cache["texts"].tolist(), embedding_store.from_arrays(cache), generation
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable embedding cache: {e}")
+        return [], None, None
+
+
+def _save_embedding_cache(index: IntentIndex, generation: str):
+    tmp_path = EMBEDDING_CACHE + ".tmp.npz"
+    np.savez(tmp_path, model_name=np.array(MODEL_NAME), texts=np.array(index.texts),
+             dtype=np.array(index.embeddings.dtype_name), generation=np.array(generation),
+             **index.embeddings.arrays())
+    os.replace(tmp_path, EMBEDDING_CACHE)
+
+
+def _load_log(generation: str) -> list:
+    """Delta log entries written on top of the cache `generation`, oldest first (older generations are skipped)."""
+    if generation is None or not os.path.isdir(EMBEDDING_LOG):
+        return []
+    ops = []
+    for name in sorted(os.listdir(EMBEDDING_LOG)):
+        if not name.endswith(".npz") or name.endswith(".tmp.npz"):
+            continue
+        entry = np.load(os.path.join(EMBEDDING_LOG, name), allow_pickle=False)
+        if str(entry["generation"]) != generation:
+            continue
+        if "categories" not in entry:
+            # Written before the log carried corpus rows: the corpus file already has them
+            return []
+        ops.append((str(entry["op"]), entry["removed"], entry["texts"].tolist(), entry["embeddings"],
+                    entry["categories"].tolist(), entry["originals"].tolist()))
+    return ops
+
+
+def _replay(texts: list, embeddings, vectors, ops: list):
+    """Apply logged changes with the same store / index calls the live update made."""
+    for op, removed, added_texts, added, _, _ in ops:
+        if op in ("remove", "replace"):
+            keep = np.setdiff1d(np.arange(len(texts), dtype=np.int64), removed)
+            texts = [texts[i] for i in keep]
+            embeddings = embeddings.subset(keep)
+            vectors = vectors.subset(keep, embeddings) if vectors is not None else None
+        if op in ("add", "replace"):
+            texts = texts + added_texts
+            embeddings = embeddings.appended(added)
+            vectors = vectors.extended(embeddings) if vectors is not None else None
+    return texts, embeddings, vectors
+
+
+def _replay_rows(texts: list, categories: list, originals: list, ops: list):
+    """Apply logged changes to the corpus rows, matching _replay's row order."""
+    for op, removed, added_texts, _, added_categories, added_originals in ops:
+        if op in ("remove", "replace"):
+            drop = set(removed.tolist())
+            keep = [i for i in range(len(texts)) if i not in drop]
+            texts = [texts[i] for i in keep]
+            categories = [categories[i] for i in keep]
+            originals = [originals[i] for i in keep]
+        if op in ("add", "replace"):
+            texts = texts + added_texts
+            categories = categories + added_categories
+            originals = originals + added_originals
+    return texts, categories, originals
+
+
+def _compact(index: IntentIndex):
+    """Write the corpus, embedding cache and vector index as a new generation and drop the delta log."""
+    generation = uuid.uuid4().hex
+    # Corpus first: if we stop before the cache is written, the corpus no longer matches
+    # the old base, so the next load trusts the corpus file and ignores the old log
+    _save_corpus(index)
+    vector_index.save(index.vectors, INDEX_PATH)
+    _save_embedding_cache(index, generation)
+    # Entries left behind by a crash here belong to the old generation and are ignored
+    if os.path.isdir(EMBEDDING_LOG):
+        for name in os.listdir(EMBEDDING_LOG):
+            os.remove(os.path.join(EMBEDDING_LOG, name))
+    _log.update(generation=generation, ops=0, rows=0, base_rows=len(index))
+
+
+def _append_log(op: str, removed: np.ndarray, rows: list, added: np.ndarray):
+    os.makedirs(EMBEDDING_LOG, exist_ok=True)
+    path = os.path.join(EMBEDDING_LOG, f"{_log['ops']:08d}.npz")
+    tmp_path = path + ".tmp.npz"
+    texts = [t for t, _, _ in rows]
+    np.savez(tmp_path, generation=np.array(_log["generation"]), op=np.array(op),
+             removed=np.asarray(removed, dtype=np.int64), texts=np.array(texts, dtype=str),
+             categories=np.array([c for _, c, _ in rows], dtype=str),
+             originals=np.array([o for _, _, o in rows], dtype=str),
+             embeddings=np.asarray(added, dtype=np.float32))
+    os.replace(tmp_path, path)
+    _log["ops"] += 1
+    _log["rows"] += len(removed) + len(texts)
+
+
+def _save_corpus(index: IntentIndex):
+    import csv
+
+    tmp_path = INTENTS_CSV + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["text", "category"])
+        writer.writerows(zip(index.originals, index.categories))
+    os.replace(tmp_path, INTENTS_CSV)
+
+
+def _embeddings_for(texts: list, known_texts: list, known) -> tuple[np.ndarray, int]:
+    """Float32 embeddings for `texts`, reusing rows of `known` (aligned with `known_texts`) and
+    encoding only the rest; returns (matrix, rows encoded)."""
+    positions = {text: i for i, text in enumerate(known_texts)} if known is not None else {}
+    missing = list(dict.fromkeys(t for t in texts if t not in positions))
+    encoded = dict(zip(missing, _embed(missing)))
+
+    matrix = np.empty((len(texts), model.get_sentence_embedding_dimension()), dtype=np.float32)
+    reused = [i for i, t in enumerate(texts) if t in positions]
+    if reused:
+        matrix[reused] = known[np.array([positions[texts[i]] for i in reused])]
+    for i, t in enumerate(texts):
+        if t in encoded:
+            matrix[i] = encoded[t]
+    return matrix, len(missing)
+
+
+def _persist(index: IntentIndex, op: str, removed=(), added_rows: list = (), added=None):
+    """
+    Log a change to the corpus: `removed` row positions, then `added_rows`
+    ((text, category, original) each) with their float32 embeddings `added`.
+    Compacts instead once the log has grown enough.
+    """
+    if (_log["generation"] is None or _log["ops"] >= LOG_MAX_OPS
+            or _log["rows"] + len(removed) + len(added_rows) > max(1, _log["base_rows"]) // 2):
+        _compact(index)
+    else:
+        if added is None:
+            added = np.zeros((0, index.embeddings.shape[1]), dtype=np.float32)
+        _append_log(op, removed, list(added_rows), added)
+
+
+def load_text_model():
+    """MiniLM sentence encoder + intent embeddings — heavy, may take minutes."""
+    global model, intents
+
+    import pandas as pd
+    from sentence_transformers import SentenceTransformer
+
+    # Load dataset
+    data = pd.read_csv(INTENTS_CSV)
+    originals = data['text'].tolist()
+    categories = data['category'].tolist()
+    texts = data['text'].str.lower().tolist()
+
+    # Load Sentence Transformer
+    print("⚡ Loading ML model...")
+    model = SentenceTransformer(MODEL_NAME)
+
+    print("⚡ Generating embeddings for dataset...")
+    base_texts, base, generation = _load_embedding_cache()
+    ops = _load_log(generation) if base is not None else []
+    if ops and texts == base_texts:
+        # The corpus file is the compacted base; the log holds every change since.
+        # A corpus file edited by hand no longer matches the base and wins over the log.
+        texts, categories, originals = _replay_rows(texts, categories, originals, ops)
+    base_vectors = vector_index.load(INDEX_PATH, base, INDEX_KIND, INDEX_PARAMS) if base is not None else None
+    cached_texts, cached, cached_vectors = (_replay(base_texts, base, base_vectors, ops) if ops
+                                            else (base_texts, base, base_vectors))
+    if cached is not None and cached.dtype_name == EMBEDDING_DTYPE and cached_texts == texts:
+        embeddings, encoded, vectors = cached, 0, cached_vectors
+    else:
+        matrix, encoded = _embeddings_for(texts, cached_texts, cached)
+        embeddings = embedding_store.build(EMBEDDING_DTYPE, matrix)
+        vectors = None
+
+    rebuilt = vectors is None
+    if rebuilt:
+        started = time.perf_counter()
+        vectors = vector_index.build(INDEX_KIND, embeddings, **INDEX_PARAMS)
+        print(f"⚡ Built {INDEX_KIND} vector index in {time.perf_counter() - started:.1f}s")
+
+    intents = IntentIndex(texts, categories, embeddings, vectors, originals)
+    if embeddings is cached and not rebuilt:
+        # The cache plus its log is the corpus as loaded; keep appending to that log
+        _log.update(generation=generation, ops=len(ops), rows=sum(len(o[1]) + len(o[2]) for o in ops),
+                    base_rows=len(base))
+    else:
+        _compact(intents)
+    print(f"✅ ML model & embeddings ready! ({len(intents)} intents, {encoded} newly encoded, "
+          f"{EMBEDDING_DTYPE} store {embeddings.nbytes / 1e6:.1f} MB)")
+
+
+# -------------------------------
+# Runtime corpus updates
+#
+# Writers build a new IntentIndex and swap the module reference; searches
+# grab `intents` once and keep using that snapshot, so they never see a
+# half-applied update. Only texts without an embedding are encoded.
+# -------------------------------
+def _normalize_rows(rows: list) -> list:
+    """(text, category, original) per distinct row; `text` is the lowercased match key."""
+    cleaned = {}
+    for row in rows:
+        original = str(row.get("text", "")).strip()
+        category = str(row.get("category", "")).strip()
+        if not original or not category:
+            raise ValueError("Every intent row needs a text and a category")
+        if category not in CLASS_NAMES:
+            raise ValueError(f"Unknown category: {category}")
+        cleaned.setdefault((original.lower(), category), original)
+    return [(text, category, original) for (text, category), original in cleaned.items()]
+
+
+def add_intents(rows: list) -> dict:
+    """Append rows, encoding only texts the current snapshot has no embedding for."""
+    global intents
+    started = time.perf_counter()
+    rows = _normalize_rows(rows)
+    with _intents_lock:
+        current = intents
+        existing = set(zip(current.texts, current.categories))
+        new_rows = [r for r in rows if r[:2] not in existing]
+        added, encoded = _embeddings_for([t for t, _, _ in new_rows], current.texts, current.embeddings)
+
+        if new_rows:
+            embeddings = current.embeddings.appended(added)
+            intents = IntentIndex(current.texts + [t for t, _, _ in new_rows],
+                                  current.categories + [c for _, c, _ in new_rows],
+                                  embeddings, current.vectors.extended(embeddings),
+                                  current.originals + [o for _, _, o in new_rows])
+            _persist(intents, "add", added_rows=new_rows, added=added)
+        total = len(intents)
+    return {"added": len(new_rows), "encoded": encoded, "total": total,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def remove_intents(texts: list) -> dict:
+    """Drop every row whose text is in `texts`; nothing is re-encoded."""
+    global intents
+    started = time.perf_counter()
+    drop = {str(t).lower().strip() for t in texts}
+    with _intents_lock:
+        current = intents
+        dropped = [i for i, t in enumerate(current.texts) if t in drop]
+        keep = [i for i, t in enumerate(current.texts) if t not in drop]
+        removed = len(dropped)
+        if removed:
+            keep = np.array(keep, dtype=np.int64)
+            embeddings = current.embeddings.subset(keep)
+            intents = IntentIndex([current.texts[i] for i in keep], [current.categories[i] for i in keep],
+                                  embeddings, current.vectors.subset(keep, embeddings),
+                                  [current.originals[i] for i in keep])
+            _persist(intents, "remove", removed=dropped)
+        total = len(intents)
+    return {"removed": removed, "encoded": 0, "total": total,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+def replace_intents(rows: list) -> dict:
+    """Replace every row of the categories present in `rows` with `rows`."""
+    global intents
+    started = time.perf_counter()
+    rows = _normalize_rows(rows)
+    categories = {c for _, c, _ in rows}
+    with _intents_lock:
+        current = intents
+        keep = np.array([i for i, c in enumerate(current.categories) if c not in categories], dtype=np.int64)
+        dropped = [i for i, c in enumerate(current.categories) if c in categories]
+        added, encoded = _embeddings_for([t for t, _, _ in rows], current.texts, current.embeddings)
+        kept = current.embeddings.subset(keep)
+        embeddings = kept.appended(added)
+        vectors = current.vectors.subset(keep, kept).extended(embeddings)
+        intents = IntentIndex([current.texts[i] for i in keep] + [t for t, _, _ in rows],
+                              [current.categories[i] for i in keep] + [c for _, c, _ in rows], embeddings, vectors,
+                              [current.originals[i] for i in keep] + [o for _, _, o in rows])
+        _persist(intents, "replace", removed=dropped, added_rows=rows, added=added)
+        total = len(intents)
+    return {"replaced_categories": sorted(categories), "rows": len(rows), "encoded": encoded,
+            "total": total, "seconds": round(time.perf_counter() - started, 3)}
+
+
+def intent_stats() -> dict:
+    current = intents
+    counts = {}
+    for category in current.categories:
+        counts[category] = counts.get(category, 0) + 1
+    return {"total": len(current), "categories": counts}
+
+
+def load_image_model() -> bool:
+    """Load the Keras image classification model; returns whether it is usable."""
+    global _image_model
+    try:
+        print("⚡ Loading image classification model...")
+
+        model_path = "ServiceClassification.keras"
+        if not os.path.exists(model_path):
+            print(f"❌ Model file not found at: {os.path.abspath(model_path)}")
+            return False
+
+        # Patch missing TF internal function required by keras 3.10
+        import tensorflow as tf
+        if not hasattr(tf.__internal__, 'register_load_context_function'):
+            tf.__internal__.register_load_context_function = lambda fn: None
+
+        from keras.models import load_model
+        _image_model = load_model(model_path)
+        print("✅ Image model ready!")
+        return True
+    except Exception as e:
+        print(f"❌ Image model failed to load: {e}")
+        import traceback
+        traceback.print_exc()
+        return False
+
+
+def encode(texts: list) -> np.ndarray:
+    """MiniLM embeddings for `texts` as a float32 (n, 384) array."""
+    return np.asarray(model.encode(texts, convert_to_numpy=True), dtype=np.float32)
+
+
+def match_category(index: IntentIndex, query_emb: np.ndarray):
+    """Category of the best intent match at or above TEXT_THRESHOLD, or None."""
+    scores, indices = index.search(query_emb, TEXT_TOP_K)
+    for score, idx in zip(scores, indices):
+        if score >= TEXT_THRESHOLD:
+            return index.categories[idx]
+    return None
+
+
+def classify_problem(problem: str) -> str:
+    """Map free text to a service category with the MiniLM similarity classifier"""
+    query = problem.lower().strip()
+    index = intents  # one snapshot for the whole call
+
+    # Embed query (unit norm, so the index's dot product is cosine similarity)
+    query_emb = _embed([query])[0]
+
+    return match_category(index, query_emb) or FALLBACK_CATEGORY
+
+
+def category_scores(problem: str, k: int = 20) -> np.ndarray:
+    """Best cosine similarity per CLASS_NAMES entry among the top-k intent matches (-1 where absent)."""
+    index = intents
+    scores, indices = index.search(_embed([problem.lower().strip()])[0], k)
+    best = np.full(len(CLASS_NAMES), -1.0, dtype=np.float32)
+    for score, idx in zip(scores, indices):
+        c = _CLASS_INDEX.get(index.categories[idx])
+        if c is not None and score > best[c]:
+            best[c] = score
+    return best
+
+
+def fuse_scores(image_probs, text_scores, image_weight: float = 0.5, text_threshold: float = TEXT_THRESHOLD,
+                text_temperature: float = 0.05) -> tuple[str, np.ndarray]:
+    """Combine image softmax probabilities and per-category text similarities into one distribution.
+
+    Text scores become a distribution via a temperature softmax; text only counts when
+    its best match clears the same threshold classify_problem uses.
+    """
+    parts = []
+    if image_probs is not None:
+        parts.append((image_weight, np.asarray(image_probs, dtype=np.float32)))
+    if text_scores is not None and np.max(text_scores) >= text_threshold:
+        logits = np.where(text_scores > -1, text_scores / text_temperature, -np.inf)
+        text_probs = np.exp(logits - logits.max())
+        parts.append((1.0 - image_weight, text_probs / text_probs.sum()))
+    if not parts:
+        return FALLBACK_CATEGORY, np.zeros(len(CLASS_NAMES), dtype=np.float32)
+    fused = sum(w * p for w, p in parts) / sum(w for w, _ in parts)
+    return CLASS_NAMES[int(np.argmax(fused))], fused
+
+
+def image_scores(base64_str: str) -> np.ndarray:
+    """Image classifier softmax over CLASS_NAMES."""
+    return np.asarray(_image_model.predict(preprocess_image(base64.b64decode(base64_str)))[0], dtype=np.float32)
+
+
+def _predict_from_base64(base64_str: str) -> tuple[str, float]:
+    """
+    Decodes base64 image, runs it through the Keras model,
+    returns (predicted_class, confidence_percentage).
+    """
+    prediction = image_scores(base64_str)
+    predicted_class = CLASS_NAMES[np.argmax(prediction)]
+    confidence = float(np.max(prediction) * 100)
+
+    print(f"📸 Image prediction: {predicted_class} ({confidence:.1f}%)")
+    print("All probabilities:", {k: f"{v*100:.1f}%" for k, v in zip(CLASS_NAMES, prediction)})
+
+    return predicted_class, confidence
+
+
+def predict_image(base64_str: str) -> tuple[str, float]:
+    return _predict_from_base64(base64_str)
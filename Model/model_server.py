@@ -0,0 +1,279 @@
+"""
+Shared model server for multi-process deployments.
+
+One process owns MiniLM and ServiceClassification.keras and answers encode /
+classify calls over a local Unix socket, so N stateless API workers can
+serve HTTP without each loading torch and TensorFlow. It also owns the
+semantic worker search index (WORKER_SEARCH=1), which follows Firestore
+once here instead of once per API worker.
+
+Wire format, both directions: !II (header length, payload length), a JSON
+header, then a raw payload (float32 array bytes, or base64 image bytes).
+
+Usage:
+    python model_server.py [--socket /tmp/servus-models.sock]
+"""
+
+import os
+import sys
+import json
+import socket
+import struct
+import threading
+import socketserver
+
+import numpy as np
+
+DEFAULT_SOCKET = "/tmp/servus-models.sock"
+_FRAME = struct.Struct("!II")
+
+
+def _recv_exact(sock, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("Model server connection closed")
+        buf.extend(chunk)
+    return bytes(buf)
+
+
+def send_frame(sock, header: dict, payload: bytes = b""):
+    header_bytes = json.dumps(header, default=str).encode("utf-8")
+    sock.sendall(_FRAME.pack(len(header_bytes), len(payload)) + header_bytes + payload)
+
+
+def recv_frame(sock) -> tuple[dict, bytes]:
+    header_len, payload_len = _FRAME.unpack(_recv_exact(sock, _FRAME.size))
+    header = json.loads(_recv_exact(sock, header_len))
+    payload = _recv_exact(sock, payload_len) if payload_len else b""
+    return header, payload
+
+
+# -------------------------------
+# Server
+# -------------------------------
+_state = {"text_ready": False, "image_ready": False, "search_ready": False}
+_search = None
+
+
+def _handle(header: dict, payload: bytes) -> tuple[dict, bytes]:
+    import ml_models
+
+    op = header.get("op")
+    if op == "ping":
+        return {**_state, "search_ready": _search is not None and _search.ready}, b""
+    if op == "search_workers":
+        if _search is None or not _search.ready:
+            return {"error": "Worker search index is still building"}, b""
+        return {"workers": _search.search(header["q"], **header.get("options", {}))}, b""
+    if op == "classify_text":
+        if not _state["text_ready"]:
+            return {"error": "Text model is still loading"}, b""
+        return {"category": ml_models.classify_problem(header["problem"])}, b""
+    if op == "encode":
+        if not _state["text_ready"]:
+            return {"error": "Text model is still loading"}, b""
+        embeddings = ml_models.encode(header["texts"])
+        return {"shape": list(embeddings.shape)}, embeddings.tobytes()
+    if op in ("add_intents", "remove_intents", "replace_intents", "intent_stats"):
+        if not _state["text_ready"]:
+            return {"error": "Text model is still loading"}, b""
+        args = [header[k] for k in ("rows", "texts") if k in header]
+        return getattr(ml_models, op)(*args), b""
+    if op == "category_scores":
+        if not _state["text_ready"]:
+            return {"error": "Text model is still loading"}, b""
+        return {}, ml_models.category_scores(header["problem"]).tobytes()
+    if op == "image_scores":
+        if not _state["image_ready"]:
+            return {"error": "Image model is still loading"}, b""
+        return {}, ml_models.image_scores(payload.decode("utf-8")).tobytes()
+    if op == "predict_image":
+        if not _state["image_ready"]:
+            return {"error": "Image model is still loading"}, b""
+        category, confidence = ml_models.predict_image(payload.decode("utf-8"))
+        return {"category": category, "confidence": confidence}, b""
+    return {"error": f"Unknown op: {op}"}, b""
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        while True:
+            try:
+                header, payload = recv_frame(self.request)
+            except (ConnectionError, OSError):
+                return
+            try:
+                response, body = _handle(header, payload)
+            except Exception as e:
+                print(f"❌ Model server error in {header.get('op')}: {e}")
+                response, body = {"error": str(e)}, b""
+            send_frame(self.request, response, body)
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def _load_models():
+    import features
+    import ml_models
+
+    if features.is_enabled("text_ml"):
+        try:
+            features.preload("text_ml")
+            ml_models.load_text_model()
+            _state["text_ready"] = True
+        except Exception as e:
+            print(f"⚠️ ML model failed to load: {e}")
+    if features.is_enabled("image_ml"):
+        features.preload("image_ml")
+        _state["image_ready"] = ml_models.load_image_model()
+    features.print_report()
+    if _state["text_ready"] and os.getenv("WORKER_SEARCH", "1") == "1":
+        _load_worker_search()
+
+
+def _load_worker_search():
+    global _search
+    from firebase_setup import init_firestore
+    from worker_search import WorkerSearch
+    import ml_models
+
+    try:
+        _, db = init_firestore()
+        search = WorkerSearch(ml_models.encode)
+        _search = search
+        search.load(db)
+        search.watch(db)
+    except Exception as e:
+        print(f"⚠️ Worker search index failed to build: {e}")
+
+
+def serve(socket_path: str = DEFAULT_SOCKET):
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    server = _Server(socket_path, _Handler)
+    os.chmod(socket_path, 0o600)
+    # Bind first so API workers can connect (and see "loading") while models load
+    threading.Thread(target=_load_models, daemon=True).start()
+    print(f"🚀 Model server listening on {socket_path}")
+    server.serve_forever()
+
+
+# -------------------------------
+# Client (used by API workers)
+# -------------------------------
+class ModelClient:
+    """Drop-in for ml_models' classify/encode/predict and intent-corpus functions, backed by the model server."""
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 60.0):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()  # one persistent connection per thread
+
+    def _connection(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _drop_connection(self):
+        sock = getattr(self._local, "sock", None)
+        self._local.sock = None
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def _call(self, header: dict, payload: bytes = b"") -> tuple[dict, bytes]:
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                send_frame(sock, header, payload)
+                response, body = recv_frame(sock)
+                break
+            except (ConnectionError, OSError):
+                # Stale connection (e.g. model server restarted) — reconnect once
+                self._drop_connection()
+                if attempt:
+                    raise
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response, body
+
+    def ping(self) -> dict:
+        return self._call({"op": "ping"})[0]
+
+    def classify_problem(self, problem: str) -> str:
+        return self._call({"op": "classify_text", "problem": problem})[0]["category"]
+
+    def encode(self, texts: list) -> np.ndarray:
+        response, body = self._call({"op": "encode", "texts": list(texts)})
+        return np.frombuffer(body, dtype=np.float32).reshape(response["shape"])
+
+    def add_intents(self, rows: list) -> dict:
+        return self._call({"op": "add_intents", "rows": rows})[0]
+
+    def remove_intents(self, texts: list) -> dict:
+        return self._call({"op": "remove_intents", "texts": texts})[0]
+
+    def replace_intents(self, rows: list) -> dict:
+        return self._call({"op": "replace_intents", "rows": rows})[0]
+
+    def intent_stats(self) -> dict:
+        return self._call({"op": "intent_stats"})[0]
+
+    def category_scores(self, problem: str) -> np.ndarray:
+        return np.frombuffer(self._call({"op": "category_scores", "problem": problem})[1], dtype=np.float32)
+
+    def image_scores(self, base64_str: str) -> np.ndarray:
+        body = self._call({"op": "image_scores"}, base64_str.encode("utf-8"))[1]
+        return np.frombuffer(body, dtype=np.float32)
+
+    def predict_image(self, base64_str: str) -> tuple[str, float]:
+        response, _ = self._call({"op": "predict_image"}, base64_str.encode("utf-8"))
+        return response["category"], response["confidence"]
+
+    def search_workers(self, q: str, **options) -> list:
+        return self._call({"op": "search_workers", "q": q, "options": options})[0]["workers"]
+
+
+class RemoteWorkerSearch:
+    """The model server's worker search index behind WorkerSearch's `ready` / `search` interface."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+        self._ready = False
+
+    @property
+    def ready(self) -> bool:
+        if not self._ready:
+            try:
+                self._ready = bool(self.client.ping().get("search_ready"))
+            except Exception:
+                return False
+        return self._ready
+
+    def search(self, text: str, **kwargs) -> list:
+        return self.client.search_workers(text, **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+    from dotenv import load_dotenv
+
+    parser = argparse.ArgumentParser(description="Serve MiniLM and the image classifier over a Unix socket")
+    parser.add_argument("--socket", default=os.getenv("MODEL_SERVER_SOCKET", DEFAULT_SOCKET))
+    args = parser.parse_args()
+
+    load_dotenv()
+    try:
+        serve(args.socket)
+    except KeyboardInterrupt:
+        sys.exit(0)
@@ -0,0 +1,279 @@
+"""
+WebSocket push channel for job and notification events.
+
+Workers connect to /ws/worker/{workerId} and receive a JSON message per
+event, instead of polling /worker/{id}/jobs and their notification
+subcollection. A connection must prove it is that worker: it passes the
+session token from /worker/login (see session.py) as ?token=..., or sends
+{"type": "auth", "token": ...} as its first frame within PUSH_AUTH_TIMEOUT
+seconds, and the token's user type and id must equal the path's. Otherwise
+it is closed before it is subscribed. PUSH_AUTH=0 turns the check off for
+local testing. Customers have no session token yet, so they have no route
+and keep polling.
+
+    {"type": "hello", "topic": "worker:w1", "heartbeat": 25}
+    {"type": "job", "jobId": ..., "status": "accepted"}
+    {"type": "notification", "notification": {"id", "title", "body", "type", "jobId", "createdAt"}}
+    {"type": "ping"}                  heartbeat; any frame from the client counts as its pong
+    {"type": "resync"}                events were dropped; refetch jobs and notifications
+
+`publish` fans an event out to every connection on its topic. It can be
+called from the event loop or any thread, and serializes the event once
+for all of them. Each connection has a bounded queue (PUSH_QUEUE_SIZE).
+A consumer that falls that far behind loses its backlog and gets a single
+resync message instead, so a slow client costs at most one full queue.
+A send that blocks for PUSH_SEND_TIMEOUT seconds closes the connection.
+One hub-wide timer sends the heartbeats, spread over the interval in
+HEARTBEAT_SLICES groups so 10k connections do not all ping (and pong) at
+once, and closes connections that have been silent for two heartbeats.
+
+The hub is per process: with several API worker processes a client would
+only hear the events published by the process that handles the write, so
+the app refuses push connections (close code 1013) when API_WORKERS>1
+until the channel gets a shared broker.
+"""
+
+import os
+import json
+import time
+import asyncio
+from datetime import datetime, timezone
+
+import metrics
+
+QUEUE_SIZE = int(os.getenv("PUSH_QUEUE_SIZE", "64"))
+HEARTBEAT_SECONDS = float(os.getenv("PUSH_HEARTBEAT_SECONDS", "25"))
+SEND_TIMEOUT = float(os.getenv("PUSH_SEND_TIMEOUT", "10"))
+MAX_CONNECTIONS = int(os.getenv("PUSH_MAX_CONNECTIONS", "20000"))
+AUTH_REQUIRED = os.getenv("PUSH_AUTH", "1") != "0"
+AUTH_TIMEOUT = float(os.getenv("PUSH_AUTH_TIMEOUT", "10"))
+HEARTBEAT_SLICES = 10
+USER_TYPES = ("worker",)  # who can subscribe; customers once they get a session token
+
+# WebSocket close codes
+POLICY_VIOLATION = 1008
+TRY_AGAIN_LATER = 1013
+
+_PING = json.dumps({"type": "ping"})
+_RESYNC = json.dumps({"type": "resync"})
+_CLOSE = object()  # queue sentinel: close the connection
+
+EVENTS = metrics.Counter(
+    "servus_push_events_total", "Push events by result (published / delivered / dropped)")
+DISCONNECTS = metrics.Counter(
+    "servus_push_disconnects_total", "Push connections closed by reason")
+DELIVERY_SECONDS = metrics.Histogram(
+    "servus_push_delivery_seconds", "Time from publish until the event is written to the socket")
+
+
+def topic(user_type: str, user_id: str) -> str:
+    return f"{user_type}:{user_id}"
+
+
+class Subscriber:
+    __slots__ = ("topic", "queue", "last_seen", "slot")
+
+    def __init__(self, topic: str, now: float, slot: int):
+        self.topic = topic
+        self.queue = asyncio.Queue(QUEUE_SIZE)
+        self.last_seen = now
+        self.slot = slot  # heartbeat group
+
+    def offer(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            # Backpressure: drop the backlog, keep one resync (or the close) so the client refetches
+            dropped = self.queue.qsize()
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(item if item is _CLOSE else (_RESYNC, None))
+            EVENTS.inc(dropped, result="dropped")
+
+
+class Hub:
+    def __init__(self):
+        self.loop = None
+        self._topics = {}  # topic → set of Subscriber
+        self.connections = 0
+        self._heartbeat = None
+        self._next_slot = 0
+
+    def subscribe(self, topic: str) -> Subscriber:
+        """Register a connection on `topic`; must be called on the event loop."""
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+        if self._heartbeat is None or self._heartbeat.done():
+            self._heartbeat = self.loop.create_task(self._heartbeats())
+        sub = Subscriber(topic, self.loop.time(), self._next_slot)
+        self._next_slot = (self._next_slot + 1) % HEARTBEAT_SLICES
+        self._topics.setdefault(topic, set()).add(sub)
+        self.connections += 1
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        subs = self._topics.get(sub.topic)
+        if subs is not None and sub in subs:
+            subs.discard(sub)
+            self.connections -= 1
+            if not subs:
+                del self._topics[sub.topic]
+
+    def publish(self, topic: str, event: dict) -> bool:
+        """Send `event` to every connection on `topic` (from any thread). False when nobody listens here."""
+        return self.publish_many([topic], event) > 0
+
+    def publish_many(self, topics: list, event: dict) -> int:
+        """Send one `event` to the connections on each of `topics`; returns how many topics have listeners."""
+        topics = [t for t in topics if t in self._topics] if self.loop is not None else []
+        if not topics:
+            return 0
+        item = (json.dumps(event, default=str), time.perf_counter())
+        EVENTS.inc(len(topics), result="published")
+        try:
+            on_loop = asyncio.get_running_loop() is self.loop
+        except RuntimeError:
+            on_loop = False
+        if on_loop:
+            self._deliver(topics, item)
+        else:
+            self.loop.call_soon_threadsafe(self._deliver, topics, item)
+        return len(topics)
+
+    def _deliver(self, topics: list, item):
+        for topic in topics:
+            for sub in self._topics.get(topic, ()):
+                sub.offer(item)
+
+    async def _heartbeats(self):
+        slot = 0
+        while self.connections:
+            await asyncio.sleep(HEARTBEAT_SECONDS / HEARTBEAT_SLICES)
+            silent_since = self.loop.time() - 2 * HEARTBEAT_SECONDS
+            for subs in list(self._topics.values()):
+                for sub in list(subs):
+                    if sub.slot != slot:
+                        continue
+                    if sub.last_seen < silent_since:
+                        DISCONNECTS.inc(reason="heartbeat")
+                        sub.offer(_CLOSE)
+                    elif sub.queue.empty():
+                        sub.offer((_PING, None))
+            slot = (slot + 1) % HEARTBEAT_SLICES
+
+
+hub = Hub()
+
+CONNECTIONS = metrics.Gauge(
+    "servus_push_connections", "Open push WebSocket connections", fn=lambda: [({}, hub.connections)])
+
+
+def publish(topic: str, event: dict) -> bool:
+    return hub.publish(topic, event)
+
+
+def publish_job(worker_id: str, job_id: str, status: str):
+    """A booking changed status: tell its worker."""
+    if worker_id:
+        hub.publish(topic("worker", worker_id), {"type": "job", "jobId": job_id, "status": status})
+
+
+def publish_notification(user_type: str, user_id: str, notification_id: str, notification: dict):
+    if user_type not in USER_TYPES:
+        return
+    hub.publish(topic(user_type, user_id), {
+        "type": "notification",
+        "notification": {**notification, "id": notification_id,
+                         "createdAt": datetime.now(timezone.utc).isoformat()},
+    })
+
+
+async def _send(websocket, sub: Subscriber):
+    while True:
+        item = await sub.queue.get()
+        if item is _CLOSE:
+            await websocket.close(code=POLICY_VIOLATION)
+            return
+        payload, published_at = item
+        try:
+            await asyncio.wait_for(websocket.send_text(payload), SEND_TIMEOUT)
+        except asyncio.TimeoutError:
+            DISCONNECTS.inc(reason="slow_consumer")
+            return
+        if published_at is not None:
+            EVENTS.inc(result="delivered")
+            DELIVERY_SECONDS.observe(time.perf_counter() - published_at)
+
+
+async def _receive(websocket, sub: Subscriber):
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            DISCONNECTS.inc(reason="client")
+            return
+        sub.last_seen = hub.loop.time()
+
+
+async def _auth_token(websocket):
+    """The token from ?token=, else from an {"type": "auth"} first frame; None if there is neither."""
+    token = websocket.query_params.get("token")
+    if token:
+        return token
+    try:
+        message = await asyncio.wait_for(websocket.receive(), AUTH_TIMEOUT)
+    except asyncio.TimeoutError:
+        return None
+    if message["type"] == "websocket.disconnect":
+        raise ConnectionResetError
+    try:
+        message = json.loads(message.get("text") or "")
+    except ValueError:
+        return None
+    if isinstance(message, dict) and message.get("type") == "auth" and isinstance(message.get("token"), str):
+        return message["token"]
+    return None
+
+
+async def serve(websocket, user_type: str, user_id: str, authenticate=None):
+    """
+    Run one push connection until either side closes it. `authenticate`
+    maps a session token to its (user_type, user_id), or None; it is
+    required unless PUSH_AUTH=0.
+    """
+    if user_type not in USER_TYPES:
+        await websocket.close(code=POLICY_VIOLATION)
+        return
+    if hub.connections >= MAX_CONNECTIONS:
+        DISCONNECTS.inc(reason="full")
+        await websocket.close(code=TRY_AGAIN_LATER)
+        return
+
+    await websocket.accept()
+    if AUTH_REQUIRED:
+        try:
+            token = await _auth_token(websocket)
+        except ConnectionResetError:
+            DISCONNECTS.inc(reason="client")
+            return
+        caller = authenticate(token) if token and authenticate is not None else None
+        if caller != (user_type, user_id):
+            DISCONNECTS.inc(reason="unauthorized")
+            await websocket.close(code=POLICY_VIOLATION)
+            return
+    sub = hub.subscribe(topic(user_type, user_id))
+    try:
+        await websocket.send_text(json.dumps({"type": "hello", "topic": sub.topic, "heartbeat": HEARTBEAT_SECONDS}))
+        tasks = [asyncio.ensure_future(_send(websocket, sub)), asyncio.ensure_future(_receive(websocket, sub))]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # Whichever side ended first (or a server shutdown) ends the other
+            for task in tasks:
+                task.cancel()
+            await asyncio.wait(tasks)
+        if any(not task.cancelled() and task.exception() is not None for task in tasks):
+            DISCONNECTS.inc(reason="error")
+    except Exception:
+        DISCONNECTS.inc(reason="error")
+    finally:
+        hub.unsubscribe(sub)
@@ -0,0 +1,231 @@
+"""
+Per-worker review rollups.
+
+One `worker_review_rollups/{workerId}` document per worker holds everything
+the review summaries and the profile rating need, so they cost one document
+get instead of a query over the worker's bookings:
+
+    {"workerId": ..., "count": 12, "ratingSum": 55.0,
+     "histogram": {"1": 0, "2": 0, "3": 1, "4": 3, "5": 8},
+     "recent": [{"bookingId", "rating", "review", "customerQuery", "ratedAt"}, ...],  # newest first
+     "updatedAt": <server timestamp>}
+
+`rate_booking` rates a booking and updates its rollup (and the worker's
+rating / totalRatings) in one transaction. A worker rated before rollups
+existed gets theirs built from their completed bookings inside that same
+transaction; `backfill` builds every rollup up front.
+
+Usage:
+    python review_rollup.py [--batch-size 500] [--dry-run]
+"""
+
+import sys
+import json
+import heapq
+from datetime import datetime, timezone
+
+import worker_analytics
+
+ROLLUP_COLLECTION = "worker_review_rollups"
+RECENT_REVIEWS = 20
+
+
+def empty_rollup(worker_id: str) -> dict:
+    return {"workerId": worker_id, "count": 0, "ratingSum": 0.0,
+            "histogram": {str(stars): 0 for stars in range(1, 6)}, "recent": []}
+
+
+def average(rollup: dict):
+    """Mean rating, or None for a worker without ratings."""
+    return rollup["ratingSum"] / rollup["count"] if rollup and rollup.get("count") else None
+
+
+def _bucket(rating: float) -> str:
+    return str(min(5, max(1, int(round(rating)))))
+
+
+def _rating(booking: dict) -> float:
+    return float(booking.get("rating") or 0)
+
+
+def _timestamp(value) -> str:
+    # Firestore timestamps come back as datetimes; ISO strings sort chronologically
+    return value.isoformat() if hasattr(value, "isoformat") else str(value or "")
+
+
+def review_entry(booking_id: str, booking: dict, rated_at=None) -> dict:
+    return {"bookingId": booking_id, "rating": _rating(booking), "review": booking.get("review", ""),
+            "customerQuery": booking.get("customerQuery", ""),
+            "ratedAt": _timestamp(rated_at or booking.get("completedAt") or booking.get("updatedAt"))}
+
+
+def apply_rating(rollup: dict, entry: dict, old_rating: float = 0) -> dict:
+    """Count `entry` in `rollup` in place, replacing the booking's earlier rating `old_rating` if it had one."""
+    if old_rating > 0:
+        rollup["count"] -= 1
+        rollup["ratingSum"] -= old_rating
+        rollup["histogram"][_bucket(old_rating)] -= 1
+    rollup["count"] += 1
+    rollup["ratingSum"] += entry["rating"]
+    rollup["histogram"][_bucket(entry["rating"])] += 1
+    recent = [r for r in rollup["recent"] if r.get("bookingId") != entry["bookingId"]]
+    rollup["recent"] = [entry] + recent[:RECENT_REVIEWS - 1]
+    return rollup
+
+
+class RollupBuilder:
+    """Rollup for one worker built from their bookings in any order, keeping only the newest reviews."""
+
+    def __init__(self, worker_id: str):
+        self.rollup = empty_rollup(worker_id)
+        self._recent = []  # min-heap of (ratedAt, bookingId, entry)
+
+    def add(self, booking_id: str, booking: dict):
+        if booking.get("status") != "completed" or _rating(booking) <= 0:
+            return
+        entry = review_entry(booking_id, booking)
+        self.rollup["count"] += 1
+        self.rollup["ratingSum"] += entry["rating"]
+        self.rollup["histogram"][_bucket(entry["rating"])] += 1
+        item = (entry["ratedAt"], booking_id, entry)
+        if len(self._recent) < RECENT_REVIEWS:
+            heapq.heappush(self._recent, item)
+        else:
+            heapq.heappushpop(self._recent, item)
+
+    def finish(self) -> dict:
+        self.rollup["recent"] = [entry for _, _, entry in sorted(self._recent, reverse=True)]
+        return self.rollup
+
+
+def _bookings_query(db, worker_id: str):
+    return db.collection("bookings").where("workerId", "==", worker_id).where("status", "==", "completed")
+
+
+def build_from_bookings(db, worker_id: str, transaction=None, exclude: str = None) -> dict:
+    """Rollup computed from the worker's completed bookings (the pre-rollup query)."""
+    builder = RollupBuilder(worker_id)
+    query = _bookings_query(db, worker_id)
+    docs = transaction.get(query) if transaction is not None else query.stream()
+    for doc in docs:
+        if doc.id != exclude:
+            builder.add(doc.id, doc.to_dict())
+    return builder.finish()
+
+
+def rollup_ref(db, worker_id: str):
+    return db.collection(ROLLUP_COLLECTION).document(worker_id)
+
+
+def read_rollup(db, worker_id: str, get=None):
+    """The worker's rollup document, or None if it has not been built yet (`get` fetches a reference)."""
+    ref = rollup_ref(db, worker_id)
+    doc = get(ref) if get is not None else ref.get()
+    return doc.to_dict() if doc.exists else None
+
+
+def rate_booking(db, firestore, booking_id: str, rating: float, review: str = "") -> dict:
+    """
+    Mark a booking completed with `rating` / `review` and update the worker's
+    rollup, rating and day analytics in one transaction. Only work awaiting
+    confirmation is completed; a completed booking can be re-rated. Payment
+    fields are never written here. Raises LookupError for an unknown booking
+    and ValueError for one in the wrong state. Returns the updated rollup.
+    """
+    if not 1 <= rating <= 5:
+        raise ValueError("rating must be between 1 and 5")
+
+    @firestore.transactional
+    def run(transaction):
+        booking_ref = db.collection("bookings").document(booking_id)
+        booking_doc = booking_ref.get(transaction=transaction)
+        if not booking_doc.exists:
+            raise LookupError("Booking not found")
+        booking = booking_doc.to_dict()
+        status = booking.get("status")
+        if status not in ("awaiting_confirmation", "completed"):
+            raise ValueError(f"Booking is {status or 'not started'}; only finished work can be confirmed")
+        worker_id = booking.get("workerId")
+        if not worker_id:
+            raise ValueError("Booking has no worker")
+
+        # All reads happen before the first write
+        rollup_doc_ref = rollup_ref(db, worker_id)
+        rollup_doc = rollup_doc_ref.get(transaction=transaction)
+        worker_ref = db.collection("workers").document(worker_id)
+        worker_doc = worker_ref.get(transaction=transaction)
+        if rollup_doc.exists:
+            rollup = rollup_doc.to_dict()
+            old_rating = _rating(booking) if status == "completed" else 0
+        else:
+            rollup = build_from_bookings(db, worker_id, transaction, exclude=booking_id)
+            old_rating = 0
+
+        rated = {**booking, "rating": float(rating), "review": review or ""}
+        apply_rating(rollup, review_entry(booking_id, rated, datetime.now(timezone.utc)), old_rating)
+
+        transaction.update(booking_ref, {
+            "status": "completed",
+            "rating": float(rating),
+            "review": review or "",
+            "completedAt": booking.get("completedAt") or firestore.SERVER_TIMESTAMP,
+            "updatedAt": firestore.SERVER_TIMESTAMP,
+        })
+        transaction.set(rollup_doc_ref, {**rollup, "updatedAt": firestore.SERVER_TIMESTAMP})
+        day, analytics = worker_analytics.completion_update(firestore, booking, float(rating))
+        worker_analytics.record(transaction, db, worker_id, day, analytics)
+        if worker_doc.exists:
+            transaction.update(worker_ref, {"rating": round(average(rollup), 1), "totalRatings": rollup["count"]})
+        return rollup
+
+    return run(db.transaction())
+
+
+def backfill(db, firestore, batch_size: int = 500, dry_run: bool = False) -> dict:
+    """Rebuild every worker's rollup from the completed bookings in one pass over them."""
+    builders = {}
+    scanned = 0
+    query = db.collection("bookings").where("status", "==", "completed")
+    for doc in query.select(["workerId", "status", "rating", "review", "customerQuery",
+                             "completedAt", "updatedAt"]).stream():
+        scanned += 1
+        booking = doc.to_dict()
+        worker_id = booking.get("workerId")
+        if worker_id:
+            if worker_id not in builders:
+                builders[worker_id] = RollupBuilder(worker_id)
+            builders[worker_id].add(doc.id, booking)
+
+    rollups = [b.finish() for b in builders.values() if b.rollup["count"]]
+    written = 0
+    if not dry_run:
+        batch_size = max(1, min(batch_size, 500))
+        for start in range(0, len(rollups), batch_size):
+            batch = db.batch()
+            for rollup in rollups[start:start + batch_size]:
+                batch.set(rollup_ref(db, rollup["workerId"]),
+                          {**rollup, "updatedAt": firestore.SERVER_TIMESTAMP})
+            batch.commit()
+            written += len(rollups[start:start + batch_size])
+    return {"bookings_scanned": scanned, "workers_rated": len(rollups),
+            "ratings": sum(r["count"] for r in rollups), "written": written, "dry_run": dry_run}
+
+
+def main(argv: list) -> int:
+    import argparse
+    from dotenv import load_dotenv
+    from firebase_setup import init_firestore
+
+    parser = argparse.ArgumentParser(description="Build worker review rollups from existing bookings")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Compute the rollups without writing them")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    firestore, db = init_firestore()
+    print(json.dumps(backfill(db, firestore, batch_size=args.batch_size, dry_run=args.dry_run), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
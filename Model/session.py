@@ -0,0 +1,98 @@
+"""
+Signed session tokens for the identities the app already has.
+
+Workers and customers sign in with their phone number. From then on they are
+known by their Firestore document id; no Firebase Auth account stands behind
+them. /worker/login and /worker/register answer with a session token that binds
+the caller's user type and id (nothing issues customer tokens yet):
+
+    <base64url payload>.<base64url HMAC-SHA256 of the payload>
+
+The payload is {"t": user type, "u": user id, "exp": unix seconds}. Any API
+process checks a token without a lookup, as long as they all share the secret.
+That is SESSION_SECRET, or else a random secret written once to
+SESSION_SECRET_PATH and read by every process after that.
+"""
+
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import secrets
+import threading
+
+SECRET_PATH = os.getenv("SESSION_SECRET_PATH", "session_secret")
+TTL_SECONDS = float(os.getenv("SESSION_TTL_DAYS", "30")) * 86400
+
+_secret = None
+_lock = threading.Lock()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _load_secret() -> bytes:
+    configured = os.getenv("SESSION_SECRET")
+    if configured:
+        return configured.encode()
+    if not os.path.exists(SECRET_PATH):
+        # Linking a finished file into place means a racing process reads either nothing or all of it
+        tmp = f"{SECRET_PATH}.{os.getpid()}"
+        fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(secrets.token_hex(32))
+            os.link(tmp, SECRET_PATH)
+        except FileExistsError:
+            pass
+        finally:
+            os.unlink(tmp)
+    with open(SECRET_PATH) as f:
+        return f.read().strip().encode()
+
+
+def _key() -> bytes:
+    global _secret
+    if _secret is None:
+        with _lock:
+            if _secret is None:
+                _secret = _load_secret()
+    return _secret
+
+
+def _sign(payload: str) -> str:
+    return _b64encode(hmac.new(_key(), payload.encode("ascii"), hashlib.sha256).digest())
+
+
+def issue(user_type: str, user_id: str, ttl: float = None) -> str:
+    """A session token for `user_type` / `user_id`, valid for `ttl` seconds (SESSION_TTL_DAYS by default)."""
+    expires = int(time.time() + (TTL_SECONDS if ttl is None else ttl))
+    payload = _b64encode(json.dumps({"t": user_type, "u": user_id, "exp": expires},
+                                    separators=(",", ":")).encode())
+    return f"{payload}.{_sign(payload)}"
+
+
+def verify(token: str):
+    """(user_type, user_id) of a valid, unexpired token, or None."""
+    if not token or token.count(".") != 1:
+        return None
+    payload, signature = token.split(".")
+    try:
+        if not hmac.compare_digest(_sign(payload), signature):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, UnicodeError):
+        return None
+    if not isinstance(claims, dict) or not isinstance(claims.get("exp"), int) or claims["exp"] < time.time():
+        return None
+    user_type, user_id = claims.get("t"), claims.get("u")
+    if not isinstance(user_type, str) or not isinstance(user_id, str):
+        return None
+    return user_type, user_id
@@ -0,0 +1,25 @@
+#!/bin/sh
+# API_WORKERS=1 (default): one uvicorn process that loads the models itself.
+# API_WORKERS>1: one shared model server owns MiniLM + the Keras model and the
+#                worker search index, and N stateless API workers reach it over
+#                a Unix socket. One worker (the leader) writes the worker snapshot.
+#
+#                WARNING: API_WORKERS>1 turns OFF Aadhaar verification (the
+#                blockchain feature: one wallet nonce per deployment) and the
+#                /ws/worker push channel (the push hub is per process;
+#                connections are refused with close code 1013). Keep
+#                API_WORKERS=1 if you need either.
+#                Every worker logs this at boot; /health lists it under "disabled".
+set -e
+
+PORT="${PORT:-7860}"
+export API_WORKERS="${API_WORKERS:-1}"
+
+if [ "$API_WORKERS" -gt 1 ]; then
+    echo "⚠️ API_WORKERS=$API_WORKERS: Aadhaar verification (blockchain) and the /ws push channel are disabled; set API_WORKERS=1 to use them" >&2
+    export MODEL_SERVER_SOCKET="${MODEL_SERVER_SOCKET:-/tmp/servus-models.sock}"
+    python model_server.py --socket "$MODEL_SERVER_SOCKET" &
+    exec uvicorn app:app --host 0.0.0.0 --port "$PORT" --workers "$API_WORKERS"
+fi
+
+exec uvicorn app:app --host 0.0.0.0 --port "$PORT"
@@ -0,0 +1,52 @@
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+MODEL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy modules a core-only role must never import, whatever the init path does
+HEAVY = ("torch", "sentence_transformers", "pandas", "tensorflow", "keras", "cv2",
+         "web3", "google.generativeai")
+GATED_ROUTES = {
+    "/analyze": "post",
+    "/analyze/stream": "post",
+    "/workers/search": "get",
+    "/analyze-image": "post",
+    "/worker/probe/verify-aadhaar": "post",
+}
+
+CHILD = """
+import sys, json
+import app
+app._init_thread.join(120)
+from fastapi.testclient import TestClient
+client = TestClient(app.app)
+routes = json.loads(sys.argv[1])
+statuses = {path: (client.post(path, json={}) if method == "post" else client.get(path)).status_code
+            for path, method in routes.items()}
+heavy = json.loads(sys.argv[2])
+print(json.dumps({"loaded": sorted(m for m in heavy if m in sys.modules), "statuses": statuses}))
+"""
+
+
+def run_role(role: str) -> dict:
+    env = {**os.environ, "SERVUS_FEATURES": role, "WORKER_CACHE": "0", "API_WORKERS": "1"}
+    env.pop("MODEL_SERVER_SOCKET", None)
+    result = subprocess.run([sys.executable, "-c", CHILD, json.dumps(GATED_ROUTES), json.dumps(HEAVY)],
+                            cwd=MODEL_DIR, env=env, capture_output=True, text=True, timeout=300)
+    lines = result.stdout.strip().splitlines()
+    assert result.returncode == 0 and lines, f"role {role} failed:\n{result.stderr[-2000:]}"
+    return json.loads(lines[-1])
+
+
+def test_core_role_never_imports_heavy_modules():
+    for module in ("fastapi", "httpx", "firebase_admin", "dotenv"):
+        pytest.importorskip(module)
+
+    report = run_role("core")
+
+    assert report["loaded"] == [], f"core role imported {', '.join(report['loaded'])}"
+    assert report["statuses"] == {path: 501 for path in GATED_ROUTES}
@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks"))
+
+import ml_models  # noqa: E402
+from bench_image_preprocess import legacy_preprocess, sample_images  # noqa: E402
+
+SAMPLES = sample_images()
+
+
+@pytest.mark.parametrize("name,data,mime", SAMPLES, ids=[name for name, _, _ in SAMPLES])
+def test_fused_preprocess_matches_legacy(name, data, mime):
+    expected = legacy_preprocess(data, mime)
+    actual = ml_models.preprocess_image(data)
+
+    assert actual.shape == expected.shape == (1, ml_models.IMAGE_SIZE, ml_models.IMAGE_SIZE, 3)
+    assert actual.dtype == expected.dtype == np.float32
+    # Bit-for-bit: compare the raw float32 words, not values within a tolerance
+    assert np.array_equal(expected.view(np.uint32), actual.view(np.uint32))
+
+
+def test_preprocess_into_writes_the_given_buffer():
+    _, data, _ = SAMPLES[0]
+    out = np.empty((ml_models.IMAGE_SIZE, ml_models.IMAGE_SIZE, 3), dtype=np.float32)
+
+    assert ml_models.preprocess_into(data, out) is out
+    assert np.array_equal(out, legacy_preprocess(data, "image/jpeg")[0])
+
+
+def test_undecodable_image_is_rejected():
+    with pytest.raises(ValueError):
+        ml_models.preprocess_image(b"not an image")
@@ -0,0 +1,48 @@
+import time
+import threading
+
+from merkle import MerkleBatcher, verify_proof
+
+
+def _hash(i: int) -> str:
+    return f"{i:064x}"
+
+
+def test_lone_item_flushes_within_window():
+    anchored = []
+    done = threading.Event()
+
+    def anchor(batch):
+        anchored.append(batch)
+        done.set()
+        return "job"
+
+    batcher = MerkleBatcher(anchor, max_batch=256, max_wait=0.5)
+    batcher.start()
+    batcher.add("worker-1", _hash(1))
+
+    assert done.wait(2.0), "a single verification was never anchored"
+    assert batcher.pending_count() == 0
+    assert len(anchored) == 1 and len(anchored[0].items) == 1
+
+
+def test_full_batch_flushes_before_window():
+    anchored = []
+    done = threading.Event()
+
+    def anchor(batch):
+        anchored.append(batch)
+        done.set()
+        return "job"
+
+    batcher = MerkleBatcher(anchor, max_batch=4, max_wait=60.0)
+    batcher.start()
+    started = time.time()
+    for i in range(4):
+        batcher.add(f"worker-{i}", _hash(i))
+
+    assert done.wait(2.0)
+    assert time.time() - started < 2.0
+    batch = anchored[0]
+    for item, proof in zip(batch.items, batch.proofs):
+        assert verify_proof(item["verification_hash"], proof, batch.root)
@@ -0,0 +1,262 @@
+"""
+Background transaction submitter for the Polygon Amoy wallet.
+
+One submitter owns the wallet nonce locally, so concurrent requests never
+race on get_transaction_count. Signing is serialized on a single thread and
+receipts are polled off the request path; stuck transactions are replaced
+with the same nonce at a bumped gas price.
+"""
+
+import time
+import uuid
+import queue
+import threading
+
+
+def hex_hash(tx_hash) -> str:
+    """A transaction hash as 0x-prefixed hex, whichever way this web3/hexbytes version renders it."""
+    text = tx_hash.hex() if isinstance(tx_hash, (bytes, bytearray)) else str(tx_hash)
+    return "0x" + text.lower().removeprefix("0x")
+
+
+class TxJob:
+    """State of one queued transaction (and any replacements of it)."""
+
+    def __init__(self, job_id: str, data: bytes, on_confirmed=None, on_failed=None):
+        self.id = job_id
+        self.data = data
+        self.on_confirmed = on_confirmed
+        self.on_failed = on_failed
+        self.status = "queued"  # queued → submitted → confirmed | failed
+        self.nonce = None
+        self.gas_price = None
+        self.tx_hash = None
+        self.tx_hashes = []     # every raw hash broadcast for this nonce
+        self.replacements = 0
+        self.error = None
+        self.created_at = time.time()
+        self.submitted_at = None
+        self.confirmed_at = None
+        self.block_number = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "status": self.status,
+            "tx_hash": self.tx_hash,
+            "nonce": self.nonce,
+            "replacements": self.replacements,
+            "block_number": self.block_number,
+            "error": self.error,
+            "created_at": self.created_at,
+            "submitted_at": self.submitted_at,
+            "confirmed_at": self.confirmed_at,
+        }
+
+
+class TransactionSubmitter:
+    """Queue 0-value self-transactions carrying `data` and track them to a receipt."""
+
+    def __init__(self, w3, account, chain_id: int = 80002, min_gas_price_gwei: float = 30,
+                 receipt_poll_interval: float = 3.0, stuck_after: float = 90.0,
+                 max_replacements: int = 3, gas_bump_percent: int = 15,
+                 max_job_age: float = 6 * 3600):
+        self.w3 = w3
+        self.account = account
+        self.address = account.address
+        self.chain_id = chain_id
+        self.min_gas_price = w3.to_wei(min_gas_price_gwei, "gwei")
+        self.receipt_poll_interval = receipt_poll_interval
+        self.stuck_after = stuck_after
+        self.max_replacements = max_replacements
+        self.gas_bump_percent = gas_bump_percent
+        self.max_job_age = max_job_age
+
+        self._queue = queue.Queue()
+        self._sign_lock = threading.Lock()   # nonce allocation + signing
+        self._jobs_lock = threading.Lock()
+        self._jobs = {}                      # job id → TxJob
+        self._in_flight = {}                 # nonce → TxJob awaiting receipt
+        self._nonce = None
+        self._started = False
+
+    # ── Public API ──────────────────────────────────────────────────────────
+    def start(self):
+        if self._started:
+            return
+        self._started = True
+        threading.Thread(target=self._sign_loop, name="tx-signer", daemon=True).start()
+        threading.Thread(target=self._receipt_loop, name="tx-receipts", daemon=True).start()
+        print(f"✅ Transaction submitter started for {self.address}")
+
+    def submit(self, data: bytes, on_confirmed=None, on_failed=None, job_id: str = None) -> str:
+        """Queue a transaction and return its job id immediately."""
+        job = TxJob(job_id or uuid.uuid4().hex, data, on_confirmed, on_failed)
+        with self._jobs_lock:
+            self._jobs[job.id] = job
+        self._queue.put(job)
+        return job.id
+
+    def status(self, job_id: str):
+        with self._jobs_lock:
+            job = self._jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def stats(self) -> dict:
+        with self._jobs_lock:
+            in_flight = len(self._in_flight)
+        return {"queued": self._queue.qsize(), "in_flight": in_flight, "next_nonce": self._nonce}
+
+    # ── Nonce management ────────────────────────────────────────────────────
+    def _next_nonce(self) -> int:
+        """Return the next local nonce, syncing from the node's pending count when unknown."""
+        if self._nonce is None:
+            self._nonce = self.w3.eth.get_transaction_count(self.address, "pending")
+        nonce = self._nonce
+        self._nonce += 1
+        return nonce
+
+    def _resync_nonce(self):
+        self._nonce = None
+
+    # ── Signing / broadcasting ──────────────────────────────────────────────
+    def _gas_price(self) -> int:
+        try:
+            return max(self.w3.eth.gas_price, self.min_gas_price)
+        except Exception:
+            return self.min_gas_price
+
+    def _broadcast(self, job: TxJob, nonce: int, gas_price: int):
+        tx = {
+            "nonce": nonce,
+            "to": self.address,  # self-transaction
+            "value": 0,
+            "gasPrice": gas_price,
+            "chainId": self.chain_id,
+            "data": job.data,
+        }
+        try:
+            tx["gas"] = self.w3.eth.estimate_gas({
+                "from": self.address, "to": self.address, "value": 0, "data": job.data,
+            })
+        except Exception:
+            tx["gas"] = 21000 + 16 * len(job.data) + 5000
+
+        signed_tx = self.account.sign_transaction(tx)
+        tx_hash = self.w3.eth.send_raw_transaction(signed_tx.raw_transaction)
+
+        job.nonce = nonce
+        job.gas_price = gas_price
+        job.tx_hash = hex_hash(tx_hash)
+        job.tx_hashes.append(tx_hash)
+        job.submitted_at = time.time()
+        job.status = "submitted"
+
+    def _sign_loop(self):
+        while True:
+            job = self._queue.get()
+            with self._sign_lock:
+                self._submit_new(job)
+
+    def _submit_new(self, job: TxJob):
+        for attempt in range(2):
+            try:
+                nonce = self._next_nonce()
+            except Exception as e:
+                self._fail(job, f"Could not fetch nonce: {e}")
+                return
+            try:
+                self._broadcast(job, nonce, self._gas_price())
+                with self._jobs_lock:
+                    self._in_flight[nonce] = job
+                print(f"✅ Blockchain tx sent: {job.tx_hash} (nonce {nonce})")
+                return
+            except Exception as e:
+                # The nonce was not consumed — re-read it from the node and retry once
+                self._resync_nonce()
+                if attempt == 0 and "nonce" in str(e).lower():
+                    continue
+                self._fail(job, f"Blockchain transaction failed: {e}")
+                return
+
+    def _replace(self, job: TxJob):
+        """Rebroadcast a stuck transaction with the same nonce and a higher gas price."""
+        bumped = job.gas_price * (100 + self.gas_bump_percent) // 100 + 1
+        gas_price = max(bumped, self._gas_price())
+        with self._sign_lock:
+            try:
+                self._broadcast(job, job.nonce, gas_price)
+                job.replacements += 1
+                print(f"⚠️ Replaced stuck tx for nonce {job.nonce}: {job.tx_hash}")
+            except Exception as e:
+                # "nonce too low" here means one of the earlier hashes was mined
+                print(f"⚠️ Replacement for nonce {job.nonce} not sent: {e}")
+                job.submitted_at = time.time()
+
+    # ── Receipt polling ─────────────────────────────────────────────────────
+    def _receipt_loop(self):
+        while True:
+            time.sleep(self.receipt_poll_interval)
+            with self._jobs_lock:
+                in_flight = list(self._in_flight.values())
+            for job in in_flight:
+                try:
+                    self._check_job(job)
+                except Exception as e:
+                    print(f"⚠️ Receipt check failed for {job.tx_hash}: {e}")
+            self._evict_old_jobs()
+
+    def _check_job(self, job: TxJob):
+        for tx_hash in reversed(job.tx_hashes):
+            receipt = self._get_receipt(tx_hash)
+            if receipt is None:
+                continue
+            with self._jobs_lock:
+                self._in_flight.pop(job.nonce, None)
+            job.tx_hash = hex_hash(tx_hash)
+            job.block_number = receipt.get("blockNumber")
+            if receipt.get("status", 1) == 1:
+                job.status = "confirmed"
+                job.confirmed_at = time.time()
+                self._run_callback(job.on_confirmed, job)
+            else:
+                self._fail(job, "Transaction reverted")
+            return
+
+        if time.time() - job.submitted_at > self.stuck_after:
+            if job.replacements < self.max_replacements:
+                self._replace(job)
+            else:
+                with self._jobs_lock:
+                    self._in_flight.pop(job.nonce, None)
+                with self._sign_lock:
+                    self._resync_nonce()
+                self._fail(job, "Transaction not mined after replacements")
+
+    def _get_receipt(self, tx_hash):
+        try:
+            return self.w3.eth.get_transaction_receipt(tx_hash)
+        except Exception:
+            # web3 raises TransactionNotFound while the tx is still pending
+            return None
+
+    def _fail(self, job: TxJob, error: str):
+        job.status = "failed"
+        job.error = error
+        print(f"❌ {error}")
+        self._run_callback(job.on_failed, job)
+
+    def _run_callback(self, callback, job: TxJob):
+        if not callback:
+            return
+        try:
+            callback(job)
+        except Exception as e:
+            print(f"❌ Transaction callback error for {job.id}: {e}")
+
+    def _evict_old_jobs(self):
+        cutoff = time.time() - self.max_job_age
+        with self._jobs_lock:
+            for job_id in [j.id for j in self._jobs.values()
+                           if j.status in ("confirmed", "failed") and j.created_at < cutoff]:
+                del self._jobs[job_id]
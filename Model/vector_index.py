@@ -0,0 +1,274 @@
+"""
+Nearest-neighbour indexes over unit-norm intent embeddings (inner product
+== cosine similarity).
+
+    exact  brute-force matrix product over every row (the original behavior)
+    ivf    inverted file: spherical k-means centroids, search the `nprobe`
+           closest lists exactly
+    hnsw   HNSW graph via the optional `hnswlib` package
+
+Indexes are immutable. `extended` and `subset` return a new index for the
+grown / filtered embedding matrix, so a corpus update can build the next
+index while searches keep using the current one. Indexes do not own a copy
+of the embeddings (a NumPy matrix or an embedding_store store); `save` /
+`load` persist only the structure on top of them.
+
+Configured from the environment by ml_models:
+    INTENT_INDEX=exact|ivf|hnsw
+    INTENT_INDEX_PARAMS='{"nlist": 1024, "nprobe": 16}'
+"""
+
+import os
+import json
+import hashlib
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+def _top_k(scores: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Positions of the k highest scores, best first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, np.float32), np.zeros(0, np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top], kind="stable")]
+    return scores[top], top
+
+
+def fingerprint(embeddings, rows: int, block: int = 65536) -> str:
+    """Content hash of the first `rows` rows, used to tell whether a saved index still matches the corpus."""
+    digest = hashlib.blake2b(digest_size=16)
+    for start in range(0, rows, block):
+        digest.update(np.ascontiguousarray(embeddings[start:min(rows, start + block)]).tobytes())
+    return digest.hexdigest()
+
+
+class ExactIndex:
+    kind = "exact"
+
+    def __init__(self, embeddings: np.ndarray):
+        self.embeddings = embeddings
+        self.params = {}
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        return _top_k(self.embeddings @ query, k)
+
+    def extended(self, embeddings: np.ndarray):
+        return ExactIndex(embeddings)
+
+    def subset(self, keep: np.ndarray, embeddings: np.ndarray):
+        return ExactIndex(embeddings)
+
+    def _state(self) -> dict:
+        return {}
+
+    @classmethod
+    def _restore(cls, embeddings, params, state, path):
+        return cls(embeddings)
+
+
+class IVFIndex:
+    """Inverted file over spherical k-means centroids; exact scoring inside the probed lists."""
+
+    kind = "ivf"
+
+    def __init__(self, embeddings: np.ndarray, nlist: int = None, nprobe: int = 8, train_iters: int = 10,
+                 train_sample: int = 64, seed: int = 0, centroids: np.ndarray = None, assign: np.ndarray = None):
+        self.embeddings = embeddings
+        n = len(embeddings)
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        self.params = {"nlist": nlist, "nprobe": nprobe, "train_iters": train_iters,
+                       "train_sample": train_sample, "seed": seed}
+        self.nprobe = nprobe
+        self.centroids = centroids if centroids is not None else self._train(embeddings, nlist)
+        self.assign = assign if assign is not None else self._assign(embeddings)
+        self.lists = self._lists(self.assign, len(self.centroids))
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def _train(self, embeddings: np.ndarray, nlist: int) -> np.ndarray:
+        rng = np.random.default_rng(self.params["seed"])
+        nlist = min(nlist, len(embeddings))
+        sample_size = min(len(embeddings), nlist * self.params["train_sample"])
+        sample = embeddings[np.sort(rng.choice(len(embeddings), sample_size, replace=False))].astype(np.float32)
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.params["train_iters"]):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, sample)
+            counts = np.bincount(assign, minlength=nlist)
+            empty = counts == 0
+            # Re-seed empty clusters from random sample rows
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True).clip(min=1e-12)
+        return centroids.astype(np.float32)
+
+    def _assign(self, embeddings: np.ndarray, block: int = 65536) -> np.ndarray:
+        assign = np.empty(len(embeddings), dtype=np.int32)
+        for start in range(0, len(embeddings), block):
+            chunk = embeddings[start:start + block].astype(np.float32, copy=False)
+            assign[start:start + block] = np.argmax(chunk @ self.centroids.T, axis=1)
+        return assign
+
+    @staticmethod
+    def _lists(assign: np.ndarray, nlist: int) -> list:
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(nlist + 1))
+        return [order[bounds[i]:bounds[i + 1]] for i in range(nlist)]
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        _, probe = _top_k(self.centroids @ query, self.nprobe)
+        candidates = np.concatenate([self.lists[c] for c in probe])
+        scores, top = _top_k(self.embeddings[candidates] @ query, k)
+        return scores, candidates[top]
+
+    def _derived(self, embeddings: np.ndarray, assign: np.ndarray, lists: list):
+        index = object.__new__(IVFIndex)
+        index.embeddings = embeddings
+        index.params = self.params
+        index.nprobe = self.nprobe
+        index.centroids = self.centroids
+        index.assign = assign
+        index.lists = lists
+        return index
+
+    def extended(self, embeddings: np.ndarray):
+        """Index over `embeddings`, whose first len(self) rows are unchanged; only new rows are assigned."""
+        start = len(self)
+        new_assign = self._assign(embeddings[start:])
+        lists = list(self.lists)  # untouched lists are shared with the current index
+        for c in np.unique(new_assign):
+            lists[c] = np.concatenate([lists[c], start + np.flatnonzero(new_assign == c)])
+        return self._derived(embeddings, np.concatenate([self.assign, new_assign]), lists)
+
+    def subset(self, keep: np.ndarray, embeddings: np.ndarray):
+        """Index over the rows `keep` (now renumbered 0..len(keep)-1), without retraining."""
+        assign = self.assign[keep]
+        return self._derived(embeddings, assign, self._lists(assign, len(self.centroids)))
+
+    def _state(self) -> dict:
+        return {"centroids": self.centroids, "assign": self.assign}
+
+    @classmethod
+    def _restore(cls, embeddings, params, state, path):
+        return cls(embeddings, centroids=state["centroids"], assign=state["assign"], **params)
+
+
+class HNSWIndex:
+    """hnswlib graph over the first `base_rows` rows; rows added later are searched exactly until the next rebuild."""
+
+    kind = "hnsw"
+
+    def __init__(self, embeddings: np.ndarray, M: int = 16, ef_construction: int = 200, ef: int = 64,
+                 rebuild_ratio: float = 0.1, num_threads: int = -1, seed: int = 0, graph: dict = None,
+                 base_rows: int = None):
+        if hnswlib is None:
+            raise RuntimeError("The hnsw index needs the hnswlib package (pip install hnswlib)")
+        self.embeddings = embeddings
+        self.params = {"M": M, "ef_construction": ef_construction, "ef": ef, "rebuild_ratio": rebuild_ratio,
+                       "num_threads": num_threads, "seed": seed}
+        if graph is None:
+            base_rows = len(embeddings)
+            hnsw = hnswlib.Index(space="ip", dim=embeddings.shape[1])
+            hnsw.init_index(max_elements=max(1, base_rows), ef_construction=ef_construction, M=M, random_seed=seed)
+            for start in range(0, base_rows, 65536):
+                block = embeddings[start:start + 65536]
+                hnsw.add_items(np.asarray(block, dtype=np.float32), np.arange(start, start + len(block)),
+                               num_threads=num_threads)
+            hnsw.set_ef(ef)
+            # Shared by every index derived from this graph; never mutated after build
+            graph = {"hnsw": hnsw, "saved_to": None}
+        self.graph = graph
+        self.base_rows = base_rows
+
+    def __len__(self) -> int:
+        return len(self.embeddings)
+
+    def search(self, query: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray]:
+        scores, ids = np.zeros(0, np.float32), np.zeros(0, np.int64)
+        if self.base_rows:
+            labels, distances = self.graph["hnsw"].knn_query(query.astype(np.float32, copy=False), k=min(k, self.base_rows))
+            scores, ids = 1.0 - distances[0], labels[0].astype(np.int64)
+        if len(self) > self.base_rows:
+            tail_scores, tail_ids = _top_k(self.embeddings[self.base_rows:] @ query, k)
+            scores = np.concatenate([scores, tail_scores])
+            ids = np.concatenate([ids, self.base_rows + tail_ids])
+        scores, top = _top_k(scores, k)
+        return scores, ids[top]
+
+    def extended(self, embeddings: np.ndarray):
+        tail = len(embeddings) - self.base_rows
+        if tail > self.params["rebuild_ratio"] * max(1, self.base_rows):
+            return HNSWIndex(embeddings, **self.params)
+        return HNSWIndex(embeddings, graph=self.graph, base_rows=self.base_rows, **self.params)
+
+    def subset(self, keep: np.ndarray, embeddings: np.ndarray):
+        # Graph labels are row positions, which a removal renumbers — rebuild
+        return HNSWIndex(embeddings, **self.params)
+
+    def _state(self) -> dict:
+        return {"base_rows": self.base_rows}
+
+    def save_graph(self, path: str):
+        if self.graph["saved_to"] != path:
+            self.graph["hnsw"].save_index(path + ".hnsw")
+            self.graph["saved_to"] = path
+
+    @classmethod
+    def _restore(cls, embeddings, params, state, path):
+        base_rows = int(state["base_rows"])
+        hnsw = hnswlib.Index(space="ip", dim=embeddings.shape[1])
+        hnsw.load_index(path + ".hnsw", max_elements=max(1, base_rows))
+        hnsw.set_ef(params.get("ef", 64))
+        return cls(embeddings, graph={"hnsw": hnsw, "saved_to": path}, base_rows=base_rows, **params)
+
+
+BACKENDS = {cls.kind: cls for cls in (ExactIndex, IVFIndex, HNSWIndex)}
+
+
+def build(kind: str, embeddings: np.ndarray, **params):
+    if kind not in BACKENDS:
+        raise ValueError(f"Unknown vector index: {kind} (expected one of {', '.join(BACKENDS)})")
+    return BACKENDS[kind](embeddings, **params)
+
+
+def save(index, path: str):
+    """Persist the index structure next to (not including) its embeddings."""
+    if isinstance(index, HNSWIndex):
+        index.save_graph(path)
+    covered = index.base_rows if isinstance(index, HNSWIndex) else len(index)
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, kind=np.array(index.kind), params=np.array(json.dumps(index.params)),
+             rows=np.array(covered), fingerprint=np.array(fingerprint(index.embeddings, covered)),
+             **index._state())
+    os.replace(tmp_path, path)
+
+
+def load(path: str, embeddings: np.ndarray, kind: str, params: dict):
+    """Saved index for `embeddings`, or None when missing or built for a different corpus/config."""
+    if not os.path.exists(path):
+        return None
+    try:
+        saved = np.load(path, allow_pickle=False)
+        saved_params = json.loads(str(saved["params"]))
+        if str(saved["kind"]) != kind or any(saved_params.get(k) != v for k, v in params.items()):
+            return None
+        rows = int(saved["rows"])
+        # HNSW may cover only a prefix (later rows are its exact tail); the others cover every row
+        if rows > len(embeddings) or (kind != "hnsw" and rows != len(embeddings)):
+            return None
+        if str(saved["fingerprint"]) != fingerprint(embeddings, rows):
+            return None
+        return BACKENDS[kind]._restore(embeddings, saved_params, saved, path)
+    except Exception as e:
+        print(f"⚠️ Ignoring unreadable vector index {path}: {e}")
+        return None
@@ -0,0 +1,62 @@
+"""
+Version tokens for conditional GETs on the worker and job listings.
+
+Every cacheable read depends on a few keys:
+
+    worker:<id>      the worker document
+    jobs:<id>        the set of bookings assigned to the worker
+    category:<name>  the workers in a category
+    workers          every worker
+
+Writes bump the keys they touch. The API's own writes bump right away, and
+the worker cache's Firestore listeners bump for every change, including
+writes made by the Flutter client or another process. A response's ETag is
+a hash of its URL and the current versions of its keys. A client that sends
+that ETag back in If-None-Match gets a 304 for as long as none of the keys
+moved, without a Firestore read or a serialization.
+
+Versions are per process and start from zero at boot. The random epoch in
+every token keeps a restarted process, or another worker process, from
+matching an ETag it did not issue.
+"""
+
+import uuid
+import hashlib
+import threading
+
+
+class VersionTable:
+    def __init__(self):
+        self.epoch = uuid.uuid4().hex[:12]
+        self._versions = {}
+        self._lock = threading.Lock()
+
+    def bump(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._versions[key] = self._versions.get(key, 0) + 1
+
+    def reset(self):
+        """Invalidate every token issued so far (bulk writes that touch too many keys to list)."""
+        with self._lock:
+            self.epoch = uuid.uuid4().hex[:12]
+            self._versions = {}
+
+    def token(self, keys) -> str:
+        with self._lock:
+            return self.epoch + ":" + ".".join(str(self._versions.get(key, 0)) for key in keys)
+
+
+def etag(url: str, token: str) -> str:
+    # Weak: the same representation may be sent with different content encodings
+    return 'W/"' + hashlib.blake2b(f"{url}|{token}".encode(), digest_size=12).hexdigest() + '"'
+
+
+def matches(if_none_match: str, tag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = tag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == opaque for candidate in if_none_match.split(","))
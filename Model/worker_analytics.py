@@ -0,0 +1,346 @@
+"""
+Per-worker daily job and earnings rollups.
+
+One document per worker and day, `worker_analytics/{workerId}/days/{YYYY-MM-DD}`,
+counts what happened to the worker's bookings that day:
+
+    {"date": "2024-05-06",
+     "jobs": {"created": 3, "accepted": 2, "rejected": 1, "started": 2, "work_completed": 2, "completed": 1},
+     "earnings": 450, "ratingSum": 9.0, "ratingCount": 2}
+
+The worker's own `worker_analytics/{workerId}` document holds the same
+counters summed over all time (without "date"), which is what the worker
+cache and profile stats read.
+
+A booking's events land on the day of their timestamp field (EVENT_FIELDS).
+Earnings and ratings land on its completion day, so a re-rating corrects
+the day it was first counted on. Days follow ANALYTICS_TIMEZONE.
+
+The API bumps the counters with Firestore increments as bookings move
+(`record_created`, `record_transition` and `completion_update` run inside
+the transaction that also writes the booking, so a retry never counts twice), so
+a range query reads one small document per day instead of the worker's
+whole booking history. Day buckets are merged into weeks or months with
+`merge_buckets`. Transitions the API does not see, such as bookings
+written directly by a client, are picked up by `recompute`, which rebuilds
+the rollups from the raw bookings. Run it when nothing is being
+rated, since it replaces the day and totals documents it rewrites.
+
+Usage:
+    python worker_analytics.py [--worker WORKER_ID] [--batch-size 500] [--dry-run]
+"""
+
+import os
+import sys
+import json
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+ANALYTICS_COLLECTION = "worker_analytics"
+DAYS_COLLECTION = "days"
+
+# Booking event → the booking field holding when it happened
+EVENT_FIELDS = {
+    "created": "createdAt",
+    "accepted": "acceptedAt",
+    "rejected": "rejectedAt",
+    "started": "startedAt",
+    "work_completed": "workCompletedAt",
+    "completed": "completedAt",
+}
+EVENTS = tuple(EVENT_FIELDS)
+GRANULARITIES = ("day", "week", "month")
+MAX_RANGE_DAYS = int(os.getenv("ANALYTICS_MAX_RANGE_DAYS", "731"))
+
+try:
+    TIMEZONE = ZoneInfo(os.getenv("ANALYTICS_TIMEZONE", "Asia/Kolkata"))
+except ZoneInfoNotFoundError as e:
+    print(f"⚠️ {e}; analytics days fall back to UTC")
+    TIMEZONE = timezone.utc
+
+
+def empty_bucket(day: str = None) -> dict:
+    return {"date": day, "jobs": {event: 0 for event in EVENTS}, "earnings": 0, "ratingSum": 0.0, "ratingCount": 0}
+
+
+def day_key(value) -> str:
+    """YYYY-MM-DD of a Firestore timestamp, datetime or ISO string in ANALYTICS_TIMEZONE, or None."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(TIMEZONE).date().isoformat()
+
+
+def today() -> str:
+    return day_key(datetime.now(timezone.utc))
+
+
+def day_ref(db, worker_id: str, day: str):
+    return db.collection(ANALYTICS_COLLECTION).document(worker_id).collection(DAYS_COLLECTION).document(day)
+
+
+def totals_ref(db, worker_id: str):
+    """The worker's all-time totals: the parent document of their day buckets."""
+    return db.collection(ANALYTICS_COLLECTION).document(worker_id)
+
+
+def record(transaction, db, worker_id: str, day: str, fields: dict):
+    """Merge the increments `fields` into the worker's `day` bucket and into their all-time totals."""
+    transaction.set(day_ref(db, worker_id, day), fields, merge=True)
+    totals = {k: v for k, v in fields.items() if k != "date"}
+    if totals:
+        transaction.set(totals_ref(db, worker_id), totals, merge=True)
+
+
+def _earnings(booking: dict):
+    """totalPrice, else the hourlyRate fixed at booking time (as the worker earnings page counts it), else 0."""
+    for field in ("totalPrice", "hourlyRate"):
+        value = booking.get(field)
+        if isinstance(value, (int, float)) and not isinstance(value, bool) and value:
+            return value
+    return 0
+
+
+def _increments(firestore, day: str, jobs: dict = None, earnings=0, rating_sum=0.0, rating_count=0) -> dict:
+    fields = {"date": day}
+    if jobs:
+        fields["jobs"] = {event: firestore.Increment(n) for event, n in jobs.items()}
+    if earnings:
+        fields["earnings"] = firestore.Increment(earnings)
+    if rating_sum:
+        fields["ratingSum"] = firestore.Increment(rating_sum)
+    if rating_count:
+        fields["ratingCount"] = firestore.Increment(rating_count)
+    return fields
+
+
+def record_created(db, firestore, booking_ref) -> bool:
+    """
+    Count a new booking once for its worker: flip its `analyticsCounted` flag
+    and bump the day's "created" counter in one transaction. False when it was
+    already counted (or has no worker), so repeated notifications never double count.
+    """
+    @firestore.transactional
+    def run(transaction):
+        booking_doc = booking_ref.get(transaction=transaction)
+        if not booking_doc.exists:
+            return False
+        booking = booking_doc.to_dict()
+        worker_id = booking.get("workerId")
+        if booking.get("analyticsCounted") or not worker_id:
+            return False
+        day = day_key(booking.get("createdAt")) or today()
+        transaction.update(booking_ref, {"analyticsCounted": True})
+        record(transaction, db, worker_id, day, _increments(firestore, day, jobs={"created": 1}))
+        return True
+
+    return run(db.transaction())
+
+
+def record_transition(db, firestore, booking_ref, worker_id: str, event: str, fields: dict) -> bool:
+    """
+    Move a booking to `fields["status"]` (writing the other `fields` too) and
+    count `event` for today in the same transaction. A booking already in
+    that status is left alone and counted nothing, so retries and concurrent
+    repeats of one action count once. Raises LookupError for a missing booking.
+    """
+    if event not in EVENT_FIELDS:
+        raise ValueError(f"Unknown booking event: {event}")
+
+    @firestore.transactional
+    def run(transaction):
+        booking_doc = booking_ref.get(transaction=transaction)
+        if not booking_doc.exists:
+            raise LookupError("Booking not found")
+        if booking_doc.to_dict().get("status") == fields["status"]:
+            return False
+        day = today()
+        transaction.update(booking_ref, fields)
+        record(transaction, db, worker_id, day, _increments(firestore, day, jobs={event: 1}))
+        return True
+
+    return run(db.transaction())
+
+
+def completion_update(firestore, booking: dict, rating: float):
+    """
+    (day, fields) to merge into the worker's day document when `booking` is
+    rated `rating`. A first completion counts the job, its earnings and the
+    rating; a re-rating only moves the rating on the day the booking was completed.
+    """
+    day = day_key(booking.get("completedAt")) or today()
+    if booking.get("status") != "completed":
+        return day, _increments(firestore, day, jobs={"completed": 1}, earnings=_earnings(booking),
+                                rating_sum=rating, rating_count=1)
+    old_rating = float(booking.get("rating") or 0)
+    return day, _increments(firestore, day, rating_sum=rating - old_rating,
+                            rating_count=0 if old_rating > 0 else 1)
+
+
+def add_booking(buckets: dict, booking: dict):
+    """Count `booking` into `buckets` (day → bucket), the way the live updates would have."""
+    completed = booking.get("status") == "completed"
+    for event, field in EVENT_FIELDS.items():
+        day = day_key(booking.get(field))
+        if day is None or (event == "completed" and not completed):
+            continue
+        bucket = buckets.setdefault(day, empty_bucket(day))
+        bucket["jobs"][event] += 1
+        if event == "completed":
+            bucket["earnings"] += _earnings(booking)
+            rating = float(booking.get("rating") or 0)
+            if rating > 0:
+                bucket["ratingSum"] += rating
+                bucket["ratingCount"] += 1
+
+
+def parse_range(start: str = None, end: str = None, granularity: str = "day"):
+    """Validated (start, end) dates; the last 30 days by default. Raises ValueError."""
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    try:
+        end_date = date.fromisoformat(end) if end else date.fromisoformat(today())
+        start_date = date.fromisoformat(start) if start else end_date - timedelta(days=29)
+    except ValueError:
+        raise ValueError("start and end must be dates (YYYY-MM-DD)")
+    if start_date > end_date:
+        raise ValueError("start must not be after end")
+    if (end_date - start_date).days >= MAX_RANGE_DAYS:
+        raise ValueError(f"ranges are limited to {MAX_RANGE_DAYS} days")
+    return start_date, end_date
+
+
+def read_days(db, worker_id: str, start: date, end: date) -> list:
+    """The worker's day buckets from `start` to `end` inclusive (days without activity have no document)."""
+    query = (db.collection(ANALYTICS_COLLECTION).document(worker_id).collection(DAYS_COLLECTION)
+             .where("date", ">=", start.isoformat()).where("date", "<=", end.isoformat()))
+    return [doc.to_dict() for doc in query.stream()]
+
+
+def _period_start(day: date, granularity: str) -> date:
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())  # weeks start on Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start: date, granularity: str) -> date:
+    if granularity == "week":
+        return start + timedelta(days=7)
+    if granularity == "month":
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _add(total: dict, bucket: dict):
+    for event in EVENTS:
+        total["jobs"][event] += (bucket.get("jobs") or {}).get(event, 0)
+    total["earnings"] += bucket.get("earnings", 0)
+    total["ratingSum"] += bucket.get("ratingSum", 0.0)
+    total["ratingCount"] += bucket.get("ratingCount", 0)
+
+
+def _summary(bucket: dict) -> dict:
+    return {
+        "jobs": bucket["jobs"],
+        "earnings": bucket["earnings"],
+        "rating": round(bucket["ratingSum"] / bucket["ratingCount"], 2) if bucket["ratingCount"] else None,
+        "rating_count": bucket["ratingCount"],
+    }
+
+
+def merge_buckets(days: list, start: date, end: date, granularity: str = "day") -> dict:
+    """
+    Merge day buckets into one entry per day, week or month overlapping
+    start..end (zero-filled), plus the totals for the whole range. Partial
+    first and last periods only contain the days inside the range.
+    """
+    periods = {}
+    period = _period_start(start, granularity)
+    while period <= end:
+        periods[period] = empty_bucket()
+        period = _next_period(period, granularity)
+
+    totals = empty_bucket()
+    for bucket in days:
+        day = date.fromisoformat(bucket["date"])
+        if start <= day <= end:
+            _add(periods[_period_start(day, granularity)], bucket)
+            _add(totals, bucket)
+
+    return {
+        "granularity": granularity,
+        "start": start.isoformat(),
+        "end": end.isoformat(),
+        "totals": _summary(totals),
+        "buckets": [{"period": p.isoformat(), **_summary(b)} for p, b in periods.items()],
+    }
+
+
+def recompute(db, worker_id: str = None, batch_size: int = 500, dry_run: bool = False) -> dict:
+    """Rebuild the day rollups of every worker (or one) from their bookings, deleting days that no longer have any."""
+    workers = {}
+    scanned = 0
+    query = db.collection("bookings")
+    if worker_id:
+        query = query.where("workerId", "==", worker_id)
+    for doc in query.select(["workerId", "status", "rating", "totalPrice", "hourlyRate", *EVENT_FIELDS.values()]).stream():
+        scanned += 1
+        booking = doc.to_dict()
+        if booking.get("workerId"):
+            add_booking(workers.setdefault(booking["workerId"], {}), booking)
+    if worker_id:
+        workers.setdefault(worker_id, {})
+
+    writes, deletes = [], []
+    for wid, buckets in workers.items():
+        days = db.collection(ANALYTICS_COLLECTION).document(wid).collection(DAYS_COLLECTION)
+        deletes += [doc.reference for doc in days.select(["date"]).stream() if doc.id not in buckets]
+        writes += [(day_ref(db, wid, day), bucket) for day, bucket in buckets.items()]
+        totals = empty_bucket()
+        for bucket in buckets.values():
+            _add(totals, bucket)
+        del totals["date"]
+        writes.append((totals_ref(db, wid), totals))
+
+    if not dry_run:
+        batch_size = max(1, min(batch_size, 500))
+        ops = [("set", ref, bucket) for ref, bucket in writes] + [("delete", ref, None) for ref in deletes]
+        for offset in range(0, len(ops), batch_size):
+            batch = db.batch()
+            for op, ref, bucket in ops[offset:offset + batch_size]:
+                if op == "set":
+                    batch.set(ref, bucket)
+                else:
+                    batch.delete(ref)
+            batch.commit()
+    return {"bookings_scanned": scanned, "workers": len(workers), "days_written": len(writes) - len(workers),
+            "days_deleted": len(deletes), "dry_run": dry_run}
+
+
+def main(argv: list) -> int:
+    import argparse
+    from dotenv import load_dotenv
+    from firebase_setup import init_firestore
+
+    parser = argparse.ArgumentParser(description="Rebuild worker analytics day rollups from the bookings")
+    parser.add_argument("--worker", help="Only rebuild this worker's rollups")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Compute the rollups without writing them")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    _, db = init_firestore()
+    print(json.dumps(recompute(db, args.worker, batch_size=args.batch_size, dry_run=args.dry_run), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,351 @@
+"""
+Bulk worker onboarding import.
+
+Streams CSV, JSON-lines or JSON (a list of workers, or workers.json's
+category → list shape) without loading the whole file into memory, dedupes
+phone numbers against an index built in one pass over Firestore, validates
+Aadhaar numbers a batch at a time and commits through Firestore's BulkWriter.
+
+Usage:
+    python worker_import.py workers.json [--dry-run] [--batch-size 500]
+"""
+
+import io
+import os
+import csv
+import sys
+import json
+import time
+import threading
+
+from verhoeff import verhoeff_validate_batch
+
+MAX_REPORTED_ERRORS = 1000
+MAX_WRITE_ATTEMPTS = 5
+
+
+# -------------------------------
+# Streaming readers
+# -------------------------------
+class _JsonStream:
+    """Incrementally decode the elements of a top-level JSON container."""
+
+    def __init__(self, stream, chunk_size: int = 1 << 16):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        # Drop what has already been consumed so the buffer stays chunk-sized
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at end of input."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, chars: str) -> str:
+        ch = self.peek()
+        if not ch or ch not in chars:
+            raise ValueError(f"Expected one of {chars!r} at offset {self.pos}, found {ch or 'end of file'!r}")
+        self.pos += 1
+        return ch
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                # A number at the very end of the buffer may continue in the next chunk
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            if not self._fill():
+                value, self.pos = self.decoder.raw_decode(self.buf, self.pos)
+                return value
+
+    def array(self):
+        """Yield elements of the array starting at the cursor."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.expect(",]") == "]":
+                return
+
+
+def _iter_json(stream):
+    """Yield (record, category) from a JSON list or a category → list object."""
+    reader = _JsonStream(stream)
+    first = reader.peek()
+    if first == "[":
+        for record in reader.array():
+            yield record, None
+        return
+
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        category = reader.value()
+        reader.expect(":")
+        for record in reader.array():
+            yield record, category
+        if reader.expect(",}") == "}":
+            return
+
+
+def _iter_json_lines(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line), None
+
+
+def _iter_csv(stream):
+    for row in csv.DictReader(stream):
+        yield {k.strip(): v for k, v in row.items() if k and v not in (None, "")}, None
+
+
+def iter_records(stream, filename: str = ""):
+    """Yield (record, category) pairs from a text or binary stream, format taken from `filename`."""
+    if isinstance(stream, (io.RawIOBase, io.BufferedIOBase)) or "b" in getattr(stream, "mode", ""):
+        stream = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+    name = filename.lower()
+    if name.endswith(".csv"):
+        return _iter_csv(stream)
+    if name.endswith((".jsonl", ".ndjson")):
+        return _iter_json_lines(stream)
+    return _iter_json(stream)
+
+
+# -------------------------------
+# Row normalisation
+# -------------------------------
+def _optional_float(value):
+    if value is None or value == "":
+        return None
+    return float(value)
+
+
+def normalize_worker(record: dict, category: str = None) -> dict:
+    """Map an import row onto the fields /worker/register writes; raises ValueError on bad rows."""
+    if not isinstance(record, dict):
+        raise ValueError("Row is not an object")
+
+    name = str(record.get("name") or "").strip()
+    category = str(record.get("category") or category or "").strip()
+    if not name:
+        raise ValueError("Missing name")
+    if not category:
+        raise ValueError("Missing category")
+
+    try:
+        latitude = _optional_float(record.get("latitude"))
+        longitude = _optional_float(record.get("longitude"))
+        hourly_rate = _optional_float(record.get("hourly_rate")) or 0
+        rating = _optional_float(record.get("rating")) or 0
+    except (TypeError, ValueError):
+        raise ValueError("Non-numeric latitude, longitude, hourly_rate or rating")
+
+    return {
+        "name": name,
+        "phone": str(record.get("phone") or "").strip(),
+        "location": str(record.get("location") or "").strip(),
+        "latitude": latitude,
+        "longitude": longitude,
+        "category": category,
+        "experience": str(record.get("experience") or "").strip(),
+        "hourly_rate": hourly_rate,
+        "rating": rating,
+        "verified": False,
+    }
+
+
+# -------------------------------
+# Import
+# -------------------------------
+def load_phone_index(db) -> set:
+    """Every registered phone number, read in a single projected pass over workers."""
+    phones = set()
+    for doc in db.collection("workers").select(["phone"]).stream():
+        phone = doc.to_dict().get("phone")
+        if phone:
+            phones.add(phone)
+    return phones
+
+
+class ImportReport:
+    def __init__(self):
+        self.lock = threading.Lock()  # BulkWriter callbacks run on its worker threads
+        self.rows = 0
+        self.imported = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors = []
+        self.started = time.perf_counter()
+
+    def error(self, row: int, message: str):
+        with self.lock:
+            self.failed += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({"row": row, "error": message})
+
+    def duplicate(self, row: int):
+        with self.lock:
+            self.duplicates += 1
+            if len(self.errors) < MAX_REPORTED_ERRORS:
+                self.errors.append({"row": row, "error": "Phone number already registered"})
+
+    def to_dict(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "rows": self.rows,
+            "imported": self.imported,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed, 1) if elapsed > 0 else None,
+            "errors": sorted(self.errors, key=lambda e: e["row"]),
+            "errors_truncated": self.failed + self.duplicates > len(self.errors),
+        }
+
+
+def import_workers(db, firestore, stream, filename: str = "", batch_size: int = 500,
+                   dry_run: bool = False) -> dict:
+    """Stream workers from `stream` into Firestore and return an import report."""
+    report = ImportReport()
+    phones = load_phone_index(db)
+    writer = None if dry_run else db.bulk_writer()
+    workers_ref = db.collection("workers")
+    # Writes queued but not yet committed: document path → (row number, phone), and their phones.
+    # A row only counts as imported (and its phone as registered) once BulkWriter reports the commit.
+    in_flight = {}
+    in_flight_phones = set()
+
+    def written(reference, result, bulk_writer):
+        with report.lock:
+            _, phone = in_flight.pop(reference.path)
+            in_flight_phones.discard(phone)
+            if phone:
+                phones.add(phone)
+            report.imported += 1
+
+    def write_failed(failure, bulk_writer) -> bool:
+        if failure.attempts < MAX_WRITE_ATTEMPTS:
+            return True  # retry
+        with report.lock:
+            row_number, phone = in_flight.pop(failure.operation.reference.path)
+            in_flight_phones.discard(phone)
+        report.error(row_number, f"Write failed: {failure.message}")
+        return False
+
+    if writer:
+        writer.on_write_result(written)
+        writer.on_write_error(write_failed)
+
+    def flush(batch: list):
+        # batch: [(row_number, worker_data, aadhaar)]
+        with_aadhaar = [i for i, (_, _, aadhaar) in enumerate(batch) if aadhaar]
+        valid = verhoeff_validate_batch([batch[i][2] for i in with_aadhaar])
+        invalid = {i for i, ok in zip(with_aadhaar, valid) if not ok}
+
+        for i, (row_number, worker_data, aadhaar) in enumerate(batch):
+            if i in invalid:
+                report.error(row_number, "Invalid Aadhaar number (checksum failed)")
+                continue
+            phone = worker_data["phone"]
+            if phone and writer and phone in in_flight_phones:
+                # An earlier row with this phone is still being written; its outcome decides
+                writer.flush()
+            if phone and phone in phones:
+                report.duplicate(row_number)
+                continue
+            if not writer:
+                if phone:
+                    phones.add(phone)
+                report.imported += 1
+                continue
+            ref = workers_ref.document()
+            with report.lock:
+                in_flight[ref.path] = (row_number, phone)
+                if phone:
+                    in_flight_phones.add(phone)
+            writer.create(ref, {**worker_data, "createdAt": firestore.SERVER_TIMESTAMP})
+
+        if writer:
+            writer.flush()
+        print(f"📦 Imported {report.imported}/{report.rows} rows")
+
+    batch = []
+    try:
+        for record, category in iter_records(stream, filename):
+            report.rows += 1
+            try:
+                worker_data = normalize_worker(record, category)
+            except ValueError as e:
+                report.error(report.rows, str(e))
+                continue
+            aadhaar = str(record.get("aadhaar") or record.get("aadhaar_number") or "").replace(" ", "")
+            if aadhaar and len(aadhaar) != 12:
+                report.error(report.rows, "Aadhaar number must be exactly 12 digits")
+                continue
+            batch.append((report.rows, worker_data, aadhaar))
+            if len(batch) >= batch_size:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        report.error(report.rows + 1, f"Could not parse file: {e}")
+    finally:
+        if writer:
+            writer.close()
+
+    return report.to_dict()
+
+
+def main(argv: list) -> int:
+    import argparse
+    from dotenv import load_dotenv
+    from firebase_setup import init_firestore
+
+    parser = argparse.ArgumentParser(description="Bulk import workers into Firestore")
+    parser.add_argument("path", help="CSV, JSON or JSON-lines file (e.g. workers.json)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Validate and dedupe without writing")
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    firestore, db = init_firestore()
+    with open(args.path, "rb") as f:
+        report = import_workers(db, firestore, f, os.path.basename(args.path),
+                                batch_size=args.batch_size, dry_run=args.dry_run)
+    print(json.dumps(report, indent=2))
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
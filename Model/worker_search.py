@@ -0,0 +1,335 @@
+"""
+Semantic worker search.
+
+Every worker is indexed as one MiniLM embedding of its profile text (name,
+category, experience, location and a few review snippets), kept in memory
+next to rating and coordinate arrays. A query is answered in one vectorized
+pass: semantic score, normalized rating and (optionally) distance decay are
+combined into a single ranking score, filtered by category / radius, and
+the top hits are returned.
+
+The index follows Firestore: after an initial bulk load it listens to the
+workers collection and to completed bookings (for review snippets) and
+re-encodes only workers whose profile text actually changed.
+
+Rows are append-only. Readers take an immutable snapshot (row count plus
+an alive mask) and only ever read rows below that count, so writers can
+keep appending into the same buffers without copying them; an update marks
+the old row dead and appends a new one. Buffers grow by doubling and are
+compacted once most rows are dead.
+"""
+
+import os
+import time
+import queue
+import hashlib
+import threading
+
+import numpy as np
+
+import metrics
+
+SEMANTIC_WEIGHT = float(os.getenv("WORKER_SEARCH_SEMANTIC_WEIGHT", "0.7"))
+RATING_WEIGHT = float(os.getenv("WORKER_SEARCH_RATING_WEIGHT", "0.2"))
+DISTANCE_WEIGHT = float(os.getenv("WORKER_SEARCH_DISTANCE_WEIGHT", "0.1"))
+DISTANCE_SCALE_KM = float(os.getenv("WORKER_SEARCH_DISTANCE_SCALE_KM", "10"))
+REVIEW_SNIPPETS = 3
+
+SEARCH_LATENCY = metrics.Histogram(
+    "servus_worker_search_seconds", "Time to rank workers for a /workers/search query (excluding query encoding)")
+INDEXED_WORKERS = metrics.Gauge(
+    "servus_worker_search_indexed", "Workers currently in the semantic search index")
+ENCODED_PROFILES = metrics.Counter(
+    "servus_worker_search_encoded_total", "Worker profiles (re-)encoded for the search index")
+
+
+def profile_text(worker: dict, snippets: list) -> str:
+    parts = [
+        worker.get("name") or "",
+        str(worker.get("category") or "").replace("_", " "),
+        f"{worker['experience']} experience" if worker.get("experience") else "",
+        worker.get("location") or "",
+    ]
+    parts.extend(snippets[:REVIEW_SNIPPETS])
+    return ". ".join(p.strip() for p in parts if p and str(p).strip())
+
+
+def haversine_km(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Vectorized counterpart of app.calculate_distance (NaN where coordinates are missing)."""
+    lat1, lat2 = np.radians(lat), np.radians(lats)
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin(np.radians(lngs - lng) / 2) ** 2)
+    return 6371 * 2 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+
+class _Snapshot:
+    """What a reader sees: the first `size` rows of the shared buffers, and which of them are alive."""
+
+    def __init__(self, size: int, alive: np.ndarray, vectors: np.ndarray, ratings: np.ndarray,
+                 lats: np.ndarray, lngs: np.ndarray, categories: np.ndarray, docs: list):
+        self.size = size
+        self.alive = alive
+        self.vectors = vectors
+        self.ratings = ratings
+        self.lats = lats
+        self.lngs = lngs
+        self.categories = categories
+        self.docs = docs
+
+
+class WorkerSearch:
+    def __init__(self, encode, dim: int = 384, capacity: int = 1024, dtype: str = "float32"):
+        """`encode(texts)` returns a float32 (n, dim) embedding matrix (ml_models.encode / ModelClient.encode)."""
+        self.encode = encode
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.ready = False
+        self._lock = threading.Lock()  # serializes writers
+        self._rows = {}                # worker id → row
+        self._text_hashes = {}         # worker id → hash of the profile text last encoded
+        self._reviews = {}             # worker id → {booking id: snippet}
+        self._workers = {}             # worker id → latest doc
+        self._changes = queue.Queue()
+        self._allocate(capacity)
+        self._size = 0
+        self._snapshot = self._publish(np.zeros(0, dtype=bool))
+        INDEXED_WORKERS.fn = lambda: [({}, int(self._snapshot.alive.sum()))]
+
+    # ---------------------------
+    # Buffers
+    # ---------------------------
+    def _allocate(self, capacity: int):
+        self._vectors = np.zeros((capacity, self.dim), dtype=self.dtype)
+        self._ratings = np.zeros(capacity, dtype=np.float32)
+        self._lats = np.full(capacity, np.nan, dtype=np.float64)
+        self._lngs = np.full(capacity, np.nan, dtype=np.float64)
+        self._categories = np.empty(capacity, dtype=object)
+        self._docs = [None] * capacity
+
+    def _grow(self, needed: int):
+        capacity = len(self._ratings)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        old = (self._vectors, self._ratings, self._lats, self._lngs, self._categories, self._docs)
+        self._allocate(capacity)
+        n = self._size
+        # New buffers: existing snapshots keep referencing the old ones
+        self._vectors[:n], self._ratings[:n], self._lats[:n] = old[0][:n], old[1][:n], old[2][:n]
+        self._lngs[:n], self._categories[:n] = old[3][:n], old[4][:n]
+        self._docs[:n] = old[5][:n]
+
+    def _publish(self, alive: np.ndarray) -> _Snapshot:
+        n = self._size
+        self._snapshot = _Snapshot(n, alive, self._vectors[:n], self._ratings[:n], self._lats[:n], self._lngs[:n],
+                                   self._categories[:n], self._docs)
+        return self._snapshot
+
+    # ---------------------------
+    # Writes
+    # ---------------------------
+    def _apply(self, upserts: dict, removals: set):
+        """Index `upserts` (worker id → doc) and drop `removals`; re-encodes only changed profile text."""
+        with self._lock:
+            alive = np.zeros(self._size, dtype=bool)
+            alive[:len(self._snapshot.alive)] = self._snapshot.alive
+
+            for worker_id in removals:
+                row = self._rows.pop(worker_id, None)
+                self._text_hashes.pop(worker_id, None)
+                self._workers.pop(worker_id, None)
+                if row is not None:
+                    alive[row] = False
+
+            texts, pending, digests = [], [], {}
+            for worker_id, doc in upserts.items():
+                text = profile_text(doc, list(self._reviews.get(worker_id, {}).values()))
+                digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+                if self._text_hashes.get(worker_id) == digest and worker_id in self._rows:
+                    if self._workers.get(worker_id) == doc:
+                        continue  # e.g. a listener replaying its initial snapshot
+                    vector = None  # same text: copy the existing vector into the new row
+                else:
+                    texts.append(text)
+                    digests[worker_id] = digest
+                    vector = len(texts) - 1
+                pending.append((worker_id, doc, vector))
+
+            encoded = self._normalized(self.encode(texts)) if texts else None
+            ENCODED_PROFILES.inc(len(texts))
+            self._text_hashes.update(digests)
+            self._workers.update(upserts)
+
+            self._grow(self._size + len(pending))
+            alive = np.concatenate([alive, np.zeros(len(pending), dtype=bool)])
+            for worker_id, doc, vector in pending:
+                row = self._size
+                old_row = self._rows.get(worker_id)
+                self._vectors[row] = encoded[vector] if vector is not None else self._vectors[old_row]
+                self._ratings[row] = float(doc.get("rating") or 0)
+                self._lats[row] = doc["latitude"] if doc.get("latitude") is not None else np.nan
+                self._lngs[row] = doc["longitude"] if doc.get("longitude") is not None else np.nan
+                self._categories[row] = doc.get("category")
+                self._docs[row] = {**doc, "id": worker_id}
+                if old_row is not None:
+                    alive[old_row] = False
+                alive[row] = True
+                self._rows[worker_id] = row
+                self._size += 1
+
+            self._publish(alive)
+            if self._size > 1024 and alive.sum() < self._size // 2:
+                self._compact()
+
+    def _compact(self):
+        """Rewrite only the live rows into fresh buffers (caller holds the lock)."""
+        snap = self._snapshot
+        live = np.flatnonzero(snap.alive)
+        old = snap
+        self._allocate(max(1024, 2 * len(live)))
+        self._vectors[:len(live)] = old.vectors[live]
+        self._ratings[:len(live)] = old.ratings[live]
+        self._lats[:len(live)] = old.lats[live]
+        self._lngs[:len(live)] = old.lngs[live]
+        self._categories[:len(live)] = old.categories[live]
+        for new_row, old_row in enumerate(live):
+            self._docs[new_row] = old.docs[old_row]
+            self._rows[old.docs[old_row]["id"]] = new_row
+        self._size = len(live)
+        self._publish(np.ones(len(live), dtype=bool))
+
+    def _normalized(self, matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        return matrix / np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+
+    def upsert(self, workers: dict):
+        self._apply(workers, set())
+
+    def remove(self, worker_ids):
+        self._apply({}, set(worker_ids))
+
+    # ---------------------------
+    # Firestore sync
+    # ---------------------------
+    def _add_review(self, booking_id: str, booking: dict) -> str:
+        worker_id = booking.get("workerId")
+        review = (booking.get("review") or "").strip()
+        if not worker_id or not review:
+            return None
+        snippets = self._reviews.setdefault(worker_id, {})
+        if booking_id not in snippets and len(snippets) >= REVIEW_SNIPPETS:
+            return None
+        snippets[booking_id] = review[:200]
+        return worker_id
+
+    def load(self, db, batch_size: int = 512):
+        """Initial bulk index of every worker (and completed-booking review snippets)."""
+        started = time.perf_counter()
+        reviews = (db.collection("bookings").where("status", "==", "completed")
+                   .select(["workerId", "review"]).stream())
+        for doc in reviews:
+            self._add_review(doc.id, doc.to_dict())
+
+        batch = {}
+        for doc in db.collection("workers").stream():
+            batch[doc.id] = doc.to_dict()
+            if len(batch) >= batch_size:
+                self.upsert(batch)
+                batch = {}
+        if batch:
+            self.upsert(batch)
+        self.ready = True
+        print(f"✅ Worker search index ready: {len(self._rows)} workers in {time.perf_counter() - started:.1f}s")
+
+    def watch(self, db, batch_window: float = 0.2, max_batch: int = 512):
+        """Keep the index in sync with Firestore listeners; changes are applied in small batches."""
+
+        def on_workers(_docs, changes, _read_time):
+            for change in changes:
+                kind = "remove" if change.type.name == "REMOVED" else "upsert"
+                self._changes.put((kind, change.document.id, change.document.to_dict()))
+
+        def on_bookings(_docs, changes, _read_time):
+            for change in changes:
+                if change.type.name != "REMOVED":
+                    self._changes.put(("review", change.document.id, change.document.to_dict()))
+
+        def drain():
+            while True:
+                items = [self._changes.get()]
+                deadline = time.monotonic() + batch_window
+                while len(items) < max_batch:
+                    try:
+                        items.append(self._changes.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+                upserts, removals = {}, set()
+                for kind, doc_id, data in items:
+                    if kind == "upsert":
+                        upserts[doc_id] = data
+                        removals.discard(doc_id)
+                    elif kind == "remove":
+                        removals.add(doc_id)
+                        upserts.pop(doc_id, None)
+                    else:
+                        worker_id = self._add_review(doc_id, data)
+                        if worker_id in self._workers and worker_id not in upserts:
+                            upserts[worker_id] = self._workers[worker_id]
+                try:
+                    self._apply(upserts, removals)
+                except Exception as e:
+                    print(f"❌ Worker search sync failed for {len(items)} changes: {e}")
+
+        threading.Thread(target=drain, daemon=True, name="worker-search-sync").start()
+        # Listener initial snapshots replay every doc; unchanged profiles are not re-encoded
+        self._watches = [
+            db.collection("workers").on_snapshot(on_workers),
+            db.collection("bookings").where("status", "==", "completed").on_snapshot(on_bookings),
+        ]
+
+    # ---------------------------
+    # Reads
+    # ---------------------------
+    def search_vector(self, query: np.ndarray, limit: int = 20, lat: float = None, lng: float = None,
+                      radius: float = None, category: str = None) -> list:
+        """Top `limit` workers for a unit-norm query embedding, best first."""
+        started = time.perf_counter()
+        snap = self._snapshot
+        if not snap.size:
+            return []
+
+        semantic = snap.vectors @ query.astype(snap.vectors.dtype, copy=False)
+        score = SEMANTIC_WEIGHT * semantic.astype(np.float32) + RATING_WEIGHT * (snap.ratings / 5.0)
+        mask = snap.alive.copy()
+        if category:
+            mask &= snap.categories == category
+
+        distance = None
+        if lat is not None and lng is not None:
+            distance = haversine_km(lat, lng, snap.lats, snap.lngs)
+            known = ~np.isnan(distance)
+            score += DISTANCE_WEIGHT * np.where(known, np.exp(-np.nan_to_num(distance) / DISTANCE_SCALE_KM), 0.0)
+            if radius is not None:
+                mask &= ~known | (distance <= radius)
+
+        candidates = np.flatnonzero(mask)
+        if len(candidates) > limit:
+            top = np.argpartition(-score[candidates], limit - 1)[:limit]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-score[candidates], kind="stable")]
+
+        results = []
+        for row in candidates:
+            worker = dict(snap.docs[row])
+            worker["score"] = round(float(score[row]), 4)
+            worker["semantic_score"] = round(float(semantic[row]), 4)
+            if distance is not None:
+                d = distance[row]
+                worker["distance_km"] = None if np.isnan(d) else round(float(d), 2)
+            results.append(worker)
+        SEARCH_LATENCY.observe(time.perf_counter() - started)
+        return results
+
+    def search(self, text: str, **kwargs) -> list:
+        return self.search_vector(self._normalized(self.encode([text.lower().strip()]))[0], **kwargs)
@@ -0,0 +1,266 @@
+"""
+In-memory worker cache with a local cold-start snapshot.
+
+The cache holds every worker document plus per-worker job stats (the ones
+/worker/{id}/profile reports). It is filled from the newest local snapshot
+at boot, before Firebase is even initialized, and then kept live by three
+Firestore listeners, each bounded by workers or open work rather than by
+booking history:
+
+    workers             the worker documents
+    worker_analytics    one all-time totals document per worker (see
+                        worker_analytics.py): total, completed, earnings
+    bookings            only open ones (pending / accepted / in_progress),
+                        for the pending and active counts
+
+While the cache is live it is periodically written back to the snapshot.
+
+Snapshot format: gzip-compressed JSON lines. The first line is a header
+
+    {"format": "servus-worker-snapshot", "version": 1, "written_at": <unix time>,
+     "workers": <count>}
+
+followed by one {"id": ..., "worker": {...}, "stats": {...}} line per worker.
+"""
+
+import os
+import gzip
+import json
+import time
+import threading
+
+from fast_response import dumps
+from worker_analytics import ANALYTICS_COLLECTION
+
+SNAPSHOT_FORMAT = "servus-worker-snapshot"
+SNAPSHOT_VERSION = 1
+
+# Open booking status → the stat it counts towards
+_OPEN_STATUSES = {"pending": "pending_jobs", "accepted": "active_jobs", "in_progress": "active_jobs"}
+_TOTAL_FIELDS = ("total_jobs", "completed_jobs", "total_earnings")
+
+
+def _empty_stats() -> dict:
+    return {"total_jobs": 0, "completed_jobs": 0, "pending_jobs": 0, "active_jobs": 0, "total_earnings": 0}
+
+
+def _totals_stats(doc: dict) -> dict:
+    jobs = (doc or {}).get("jobs") or {}
+    return {"total_jobs": jobs.get("created", 0), "completed_jobs": jobs.get("completed", 0),
+            "total_earnings": (doc or {}).get("earnings", 0)}
+
+
+class WorkerCache:
+    def __init__(self, versions=None):
+        self.versions = versions       # versions.VersionTable bumped on every change, or None
+        self.source = "empty"          # "empty" → "snapshot" → "live"
+        self.snapshot_written_at = None
+        self._workers = {}             # worker id → doc
+        self._by_category = {}         # category → set of worker ids
+        self._stats = {}               # worker id → stats
+        self._open = {}                # open booking id → (worker id, stat it counts towards)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._initial = {"workers": threading.Event(), "totals": threading.Event(), "open": threading.Event()}
+
+    # ---------------------------
+    # Reads
+    # ---------------------------
+    @property
+    def has_data(self) -> bool:
+        return self.source != "empty"
+
+    @property
+    def stale(self) -> bool:
+        return self.source != "live"
+
+    def snapshot_age(self):
+        return None if self.snapshot_written_at is None else round(time.time() - self.snapshot_written_at, 1)
+
+    def get(self, worker_id: str):
+        with self._lock:
+            doc = self._workers.get(worker_id)
+            return None if doc is None else {**doc, "id": worker_id}
+
+    def workers(self, category: str = None) -> list:
+        with self._lock:
+            ids = self._by_category.get(category, ()) if category else self._workers.keys()
+            return [{**self._workers[i], "id": i} for i in ids]
+
+    def stats(self, worker_id: str) -> dict:
+        with self._lock:
+            return dict(self._stats.get(worker_id) or _empty_stats())
+
+    def status(self) -> dict:
+        return {"source": self.source, "workers": len(self._workers),
+                "snapshot_age_seconds": self.snapshot_age()}
+
+    # ---------------------------
+    # Mutations (caller holds the lock)
+    # ---------------------------
+    def _bump_worker(self, worker_id: str, *docs):
+        if self.versions is not None:
+            categories = {f"category:{d.get('category')}" for d in docs if d is not None}
+            self.versions.bump(f"worker:{worker_id}", "workers", *categories)
+
+    def _put_worker(self, worker_id: str, doc: dict):
+        old = self._workers.get(worker_id)
+        if old is not None:
+            self._by_category.get(old.get("category"), set()).discard(worker_id)
+        self._workers[worker_id] = doc
+        self._by_category.setdefault(doc.get("category"), set()).add(worker_id)
+        self._bump_worker(worker_id, old, doc)
+
+    def _drop_worker(self, worker_id: str):
+        old = self._workers.pop(worker_id, None)
+        if old is not None:
+            self._by_category.get(old.get("category"), set()).discard(worker_id)
+            self._bump_worker(worker_id, old)
+
+    def _put_totals(self, worker_id: str, doc: dict):
+        self._stats.setdefault(worker_id, _empty_stats()).update(_totals_stats(doc))
+        if self.versions is not None:
+            self.versions.bump(f"jobs:{worker_id}")
+
+    def _put_open_booking(self, booking_id: str, data: dict):
+        """Count an open booking (None: it was closed or deleted) towards its worker's pending/active jobs."""
+        old = self._open.pop(booking_id, None)
+        if old is not None:
+            self._stats.setdefault(old[0], _empty_stats())[old[1]] -= 1
+        worker_id = data.get("workerId") if data else None
+        stat = _OPEN_STATUSES.get(data.get("status")) if data else None
+        if self.versions is not None:
+            # The worker's job list changes on any write to an open booking, and when it closes
+            owners = {old[0] if old else None, worker_id} - {None}
+            self.versions.bump(*(f"jobs:{owner}" for owner in owners))
+        if worker_id and stat:
+            self._open[booking_id] = (worker_id, stat)
+            self._stats.setdefault(worker_id, _empty_stats())[stat] += 1
+
+    # ---------------------------
+    # Live sync
+    # ---------------------------
+    def watch(self, db):
+        """Follow Firestore; the cache switches to "live" once both listeners delivered their first snapshot."""
+
+        def on_workers(_docs, changes, _read_time):
+            with self._lock:
+                if not self._initial["workers"].is_set():
+                    # The first snapshot is the full collection — drop snapshot-only workers that no longer exist
+                    current = {c.document.id for c in changes}
+                    for worker_id in [w for w in self._workers if w not in current]:
+                        self._drop_worker(worker_id)
+                for change in changes:
+                    if change.type.name == "REMOVED":
+                        self._drop_worker(change.document.id)
+                    else:
+                        self._put_worker(change.document.id, change.document.to_dict())
+                self._dirty = True
+            self._mark_initial("workers")
+
+        def on_totals(_docs, changes, _read_time):
+            with self._lock:
+                if not self._initial["totals"].is_set():
+                    # Live totals replace the snapshot's; workers without a totals document have none yet
+                    for stats in self._stats.values():
+                        stats.update(_totals_stats(None))
+                for change in changes:
+                    removed = change.type.name == "REMOVED"
+                    self._put_totals(change.document.id, None if removed else change.document.to_dict())
+                self._dirty = True
+            self._mark_initial("totals")
+
+        def on_open_bookings(_docs, changes, _read_time):
+            with self._lock:
+                if not self._initial["open"].is_set():
+                    # Live open bookings replace the snapshot's pending / active counts
+                    for stats in self._stats.values():
+                        stats.update(pending_jobs=0, active_jobs=0)
+                    self._open = {}
+                for change in changes:
+                    removed = change.type.name == "REMOVED"
+                    self._put_open_booking(change.document.id, None if removed else change.document.to_dict())
+                self._dirty = True
+            self._mark_initial("open")
+
+        open_bookings = db.collection("bookings").where("status", "in", list(_OPEN_STATUSES))
+        self._watches = [
+            db.collection("workers").on_snapshot(on_workers),
+            db.collection(ANALYTICS_COLLECTION).on_snapshot(on_totals),
+            open_bookings.on_snapshot(on_open_bookings),
+        ]
+
+    def _mark_initial(self, name: str):
+        self._initial[name].set()
+        if self.source != "live" and all(e.is_set() for e in self._initial.values()):
+            self.source = "live"
+            print(f"✅ Worker cache live: {len(self._workers)} workers")
+
+    # ---------------------------
+    # Snapshot file
+    # ---------------------------
+    def load(self, path: str) -> bool:
+        """Fill the cache from a snapshot file; False if missing, unreadable or a different version."""
+        if not os.path.exists(path):
+            return False
+        started = time.perf_counter()
+        try:
+            with gzip.open(path, "rb") as f:
+                header = json.loads(f.readline())
+                if header.get("format") != SNAPSHOT_FORMAT or header.get("version") != SNAPSHOT_VERSION:
+                    print(f"⚠️ Ignoring worker snapshot {path}: unsupported format {header}")
+                    return False
+                workers, stats = {}, {}
+                for line in f:
+                    row = json.loads(line)
+                    workers[row["id"]] = row["worker"]
+                    stats[row["id"]] = row["stats"]
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable worker snapshot {path}: {e}")
+            return False
+
+        with self._lock:
+            if self.source == "live":
+                return False
+            for worker_id, doc in workers.items():
+                self._put_worker(worker_id, doc)
+            self._stats = stats
+            self.snapshot_written_at = header.get("written_at")
+            self.source = "snapshot"
+        print(f"✅ Loaded worker snapshot: {len(workers)} workers, {self.snapshot_age():.0f}s old "
+              f"({time.perf_counter() - started:.2f}s)")
+        return True
+
+    def write(self, path: str) -> int:
+        """Write the current cache to `path` atomically; returns the number of workers written."""
+        with self._lock:
+            rows = [(worker_id, doc, self._stats.get(worker_id) or _empty_stats())
+                    for worker_id, doc in self._workers.items()]
+            self._dirty = False
+        written_at = time.time()
+        tmp_path = path + ".tmp"
+        with gzip.open(tmp_path, "wb", compresslevel=5) as f:
+            f.write(dumps({"format": SNAPSHOT_FORMAT, "version": SNAPSHOT_VERSION,
+                           "written_at": written_at, "workers": len(rows)}) + b"\n")
+            for worker_id, doc, stats in rows:
+                f.write(dumps({"id": worker_id, "worker": doc, "stats": stats}) + b"\n")
+        os.replace(tmp_path, path)
+        self.snapshot_written_at = written_at
+        return len(rows)
+
+    def start_writer(self, path: str, interval: float):
+        """Rewrite the snapshot every `interval` seconds while the cache is live and has changed."""
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                if self.source != "live" or not self._dirty:
+                    continue
+                try:
+                    started = time.perf_counter()
+                    count = self.write(path)
+                    print(f"💾 Worker snapshot written: {count} workers in {time.perf_counter() - started:.1f}s")
+                except Exception as e:
+                    print(f"❌ Worker snapshot write failed: {e}")
+
+        threading.Thread(target=loop, daemon=True, name="worker-snapshot").start()
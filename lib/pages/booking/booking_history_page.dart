@@ -958,7 +958,6 @@ class _BookingHistoryPageState extends State<BookingHistoryPage>
           rating: rating,
           review: review,
           paymentId: paymentId,
-          amount: amount,
         );
       },
       onError: (message) {
@@ -978,7 +977,6 @@ class _BookingHistoryPageState extends State<BookingHistoryPage>
     required double rating,
     required String review,
     String? paymentId,
-    int? amount,
   }) async {
     final success = await _firestoreService.confirmCompletionAndRate(
       booking['id'],
@@ -986,7 +984,6 @@ class _BookingHistoryPageState extends State<BookingHistoryPage>
       rating,
       review,
       paymentId: paymentId,
-      amount: amount,
     );
 
     if (!mounted) return;
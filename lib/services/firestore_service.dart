@@ -1,4 +1,7 @@
+import 'dart:convert';
 import 'package:cloud_firestore/cloud_firestore.dart';
+import 'package:http/http.dart' as http;
+import 'api_config.dart';
 
 class FirestoreService {
   final FirebaseFirestore _db = FirebaseFirestore.instance;
@@ -203,41 +206,45 @@ class FirestoreService {
     double rating,
     String? review, {
     String? paymentId,
-    int? amount,
   }) async {
     try {
-      // Update booking with completion and rating
-      final updateData = {
-        'status': 'completed',
-        'rating': rating,
-        'review': review ?? '',
-        'completedAt': FieldValue.serverTimestamp(),
-        'updatedAt': FieldValue.serverTimestamp(),
-      };
-
+      // The payment is recorded on the booking first, so a failed rating
+      // call never loses it; the backend only writes the completion
       if (paymentId != null) {
-        updateData['paymentId'] = paymentId;
-        updateData['paymentStatus'] = 'paid';
-        updateData['paymentCompletedAt'] = FieldValue.serverTimestamp();
-        updateData['totalPrice'] = amount ?? 0;
+        await _db.collection('bookings').doc(bookingId).update({
+          'paymentId': paymentId,
+          'paymentStatus': 'paid',
+          'paymentCompletedAt': FieldValue.serverTimestamp(),
+        });
       }
 
-      await _db.collection('bookings').doc(bookingId).update(updateData);
-
-      // Update worker's aggregate rating
-      await _updateWorkerRating(workerId, rating);
+      // Booking completion, rating and the worker's review rollup are
+      // updated in one backend transaction
+      final response = await http.post(
+        Uri.parse('${ApiConfig().baseUrl}/booking/$bookingId/rate'),
+        headers: {'Content-Type': 'application/json'},
+        body: json.encode({
+          'rating': rating,
+          'review': review ?? '',
+        }),
+      );
+      if (response.statusCode != 200 ||
+          json.decode(response.body)['success'] != true) {
+        print('Error confirming completion: ${response.body}');
+        return false;
+      }
 
       // Notify worker about confirmation + payment
       try {
         final stars = '★' * rating.round() + '☆' * (5 - rating.round());
-        if (paymentId != null && amount != null) {
+        if (paymentId != null) {
           await _db
               .collection('worker_notifications')
               .doc(workerId)
               .collection('notifications')
               .add({
             'title': 'Payment Received 💰',
-            'body': 'Customer paid ₹$amount and rated you $stars',
+            'body': 'Customer paid and rated you $stars',
             'type': 'payment',
             'jobId': bookingId,
             'read': false,
@@ -268,30 +275,6 @@ class FirestoreService {
     }
   }
 
-  // Update worker's aggregate rating
-  Future<void> _updateWorkerRating(String workerId, double newRating) async {
-    try {
-      final workerDoc = await _db.collection('workers').doc(workerId).get();
-      if (workerDoc.exists) {
-        final data = workerDoc.data()!;
-        final currentRating = (data['rating'] ?? 0.0).toDouble();
-        final totalRatings = (data['totalRatings'] ?? 0) as int;
-
-        // Calculate new average rating
-        final newTotalRatings = totalRatings + 1;
-        final newAverageRating =
-            ((currentRating * totalRatings) + newRating) / newTotalRatings;
-
-        await _db.collection('workers').doc(workerId).update({
-          'rating': double.parse(newAverageRating.toStringAsFixed(1)),
-          'totalRatings': newTotalRatings,
-        });
-      }
-    } catch (e) {
-      print('Error updating worker rating: $e');
-    }
-  }
-
   // Get reviews for a worker
   Future<List<Map<String, dynamic>>> getWorkerReviews(String workerId) async {
     try {
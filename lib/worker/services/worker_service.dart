@@ -15,15 +15,38 @@ class WorkerService {
 
   String get currentWorkerId => _currentWorkerId ?? 'demo_worker';
 
+  // Last ETag and body per polled URL; the backend answers 304 while nothing changed
+  static final Map<String, MapEntry<String, String>> _etagCache = {};
+
+  // GET that revalidates with If-None-Match; returns the body, or null on error
+  Future<String?> _getPolled(String url) async {
+    final cached = _etagCache[url];
+    final response = await http.get(
+      Uri.parse(url),
+      headers: cached != null ? {'If-None-Match': cached.key} : null,
+    );
+    if (response.statusCode == 304 && cached != null) {
+      return cached.value;
+    }
+    if (response.statusCode != 200) {
+      return null;
+    }
+    final etag = response.headers['etag'];
+    if (etag != null) {
+      _etagCache[url] = MapEntry(etag, response.body);
+    } else {
+      _etagCache.remove(url);
+    }
+    return response.body;
+  }
+
   // Get worker profile and stats from Firestore via backend
   Future<Map<String, dynamic>> getWorkerProfile() async {
     try {
-      final response = await http.get(
-        Uri.parse('$baseUrl/worker/$currentWorkerId/profile'),
-      );
+      final body = await _getPolled('$baseUrl/worker/$currentWorkerId/profile');
 
-      if (response.statusCode == 200) {
-        final data = json.decode(response.body);
+      if (body != null) {
+        final data = json.decode(body);
         if (data['success'] == true) {
           return {
             'worker': data['worker'] ?? {},
@@ -56,13 +79,12 @@ class WorkerService {
       print('DEBUG: Fetching jobs for workerId: $currentWorkerId');
       print('DEBUG: Request URL: $url');
 
-      final response = await http.get(Uri.parse(url));
+      final body = await _getPolled(url);
 
-      print('DEBUG: Response status: ${response.statusCode}');
-      print('DEBUG: Response body: ${response.body}');
+      print('DEBUG: Response body: $body');
 
-      if (response.statusCode == 200) {
-        final data = json.decode(response.body);
+      if (body != null) {
+        final data = json.decode(body);
         if (data['success'] == true) {
           final List<dynamic> jobs = data['jobs'] ?? [];
           return jobs.map((job) => Map<String, dynamic>.from(job)).toList();
@@ -75,6 +97,35 @@ class WorkerService {
     }
   }
 
+  // Jobs, earnings and ratings per day/week/month between start and end (YYYY-MM-DD, defaults to the last 30 days)
+  Future<Map<String, dynamic>?> getWorkerAnalytics({
+    String granularity = 'day',
+    String? start,
+    String? end,
+  }) async {
+    try {
+      final params = {
+        'granularity': granularity,
+        if (start != null) 'start': start,
+        if (end != null) 'end': end,
+      };
+      final uri = Uri.parse('$baseUrl/worker/$currentWorkerId/analytics')
+          .replace(queryParameters: params);
+      final response = await http.get(uri);
+
+      if (response.statusCode == 200) {
+        final data = json.decode(response.body);
+        if (data['success'] == true) {
+          return Map<String, dynamic>.from(data);
+        }
+      }
+      return null;
+    } catch (e) {
+      print("Error fetching worker analytics: $e");
+      return null;
+    }
+  }
+
   // Get available/pending jobs for the worker
   Future<List<Map<String, dynamic>>> getAvailableJobs() async {
     return getWorkerJobs(status: 'pending');